@@ -1,11 +1,83 @@
-# Import handling with SimpleGUI fallback
+import random
+import math
+import time
+import copy
+
+# The GUI backend is imported by load_backend() when a frame or sprite
+# first needs it, so importing the game logic stays cheap
+simplegui = None
+# Only used to pre-scale sprites and batch blits under SimpleGUICS2Pygame
+pygame = None
+
+def load_backend():
+    """
+    Import the GUI backend on first use: simplegui under CodeSkulptor,
+    else SimpleGUICS2Pygame (with pygame for faster sprite drawing)
+    Returns:
+        the simplegui module, or None when no backend is installed
+    """
+    global simplegui, pygame
+    if simplegui is not None:
+        return simplegui
+    try:
+        import simplegui as backend
+    except ImportError:
+        try:
+            import SimpleGUICS2Pygame.simpleguics2pygame as backend
+        except ImportError:
+            # No GUI backend: only headless games can be created
+            return None
+    try:
+        import pygame as pygame_module
+        pygame = pygame_module
+    except ImportError:
+        pass
+    simplegui = backend
+    return simplegui
+
 try:
-    import simplegui
+    import heapq
 except ImportError:
-    import SimpleGUICS2Pygame.simpleguics2pygame as simplegui
+    # Scheduler falls back to a sorted list
+    heapq = None
 
-import random
-import math
+# LazyModule class
+class LazyModule:
+    """
+    Stand-in for an optional module, imported on first attribute access
+    The real module then replaces it in this file's globals, so later
+    lookups cost nothing extra
+    """
+    def __init__(self, name, alias):
+        self.name, self.alias = name, alias
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self.name)
+        globals()[self.alias] = module
+        return getattr(module, attr)
+
+try:
+    # Array-backed entity storage is optional, and numpy is only imported
+    # once something uses it
+    import importlib
+    import importlib.util
+    np = LazyModule("numpy", "np") if importlib.util.find_spec("numpy") is not None else None
+except ImportError:
+    np = None
+
+try:
+    # Binary game snapshots (not available in CodeSkulptor)
+    import struct
+except ImportError:
+    struct = None
+
+try:
+    # Local asset cache and background loading (not available in CodeSkulptor);
+    # hashlib, pathlib, urllib.request and concurrent.futures load when first used
+    import os
+    import threading
+except ImportError:
+    threading = None
 
 # Canvas size
 WIDTH, HEIGHT = 1200, 800
@@ -15,22 +87,65 @@ class Vector:
     """
     2D Vector class for all position/velocity calculations
     Handles vector math operations and conversions
+    += and -= mutate in place instead of allocating a new Vector
     """
+    __slots__ = ("x", "y")
+
     def __init__(self, x, y): 
         self.x, self.y = x, y
     def __add__(self, other): 
         return Vector(self.x + other.x, self.y + other.y)
     def __sub__(self, other): 
         return Vector(self.x - other.x, self.y - other.y)
+    def __iadd__(self, other):
+        self.x += other.x
+        self.y += other.y
+        return self
+    def __isub__(self, other):
+        self.x -= other.x
+        self.y -= other.y
+        return self
     def __mul__(self, scalar): 
         return Vector(self.x * scalar, self.y * scalar)
     def __truediv__(self, scalar): 
         return Vector(self.x / scalar, self.y / scalar)
+    def distance_sq_to(self, other):
+        return (self.x - other.x) ** 2 + (self.y - other.y) ** 2
     def distance_to(self, other): 
-        return math.sqrt((self.x - other.x) ** 2 + (self.y - other.y) ** 2)
+        return math.sqrt(self.distance_sq_to(other))
     def to_tuple(self): 
         return (self.x, self.y)
 
+# VectorPool class
+class VectorPool:
+    """
+    Free list of Vector objects for short-lived projectiles
+    Released vectors are handed out again by acquire(), so steady-state
+    frames recycle bullets instead of allocating them. A released
+    vector must no longer be referenced anywhere else.
+    """
+    def __init__(self, limit=4096):
+        self.free = []
+        self.limit = limit
+        self.allocated = 0
+
+    def acquire(self, x, y):
+        """Return a Vector set to (x, y), recycled when possible"""
+        if self.free:
+            vector = self.free.pop()
+            vector.x, vector.y = x, y
+            return vector
+        self.allocated += 1
+        return Vector(x, y)
+
+    def release(self, vector):
+        """Return a vector to the pool (beyond the limit it is left to GC)"""
+        if len(self.free) < self.limit:
+            self.free.append(vector)
+
+# Shared pool for player and boss projectiles
+VECTOR_POOL = VectorPool()
+
 # Player class
 class Player:
     """
@@ -44,6 +159,8 @@ class Player:
         self.frame_index = 0
         self.frame_counter = 0
         self.hearts = 3
+        # (dx, dy) of the last move, after clamping to the screen
+        self.step = (0, 0)
 
     def move(self, direction, speed):
         """
@@ -52,14 +169,17 @@ class Player:
             direction: dict {'up','down','left','right'} bools
             speed: movement speed in pixels/frame
         """
-        movement = Vector(0, 0)
-        if direction["up"]: movement.y -= speed
-        if direction["down"]: movement.y += speed
-        if direction["left"]: movement.x -= speed
-        if direction["right"]: movement.x += speed
-        self.pos += movement
+        x, y = self.pos.x, self.pos.y
+        dx = dy = 0
+        if direction["up"]: dy -= speed
+        if direction["down"]: dy += speed
+        if direction["left"]: dx -= speed
+        if direction["right"]: dx += speed
+        self.pos.x += dx
+        self.pos.y += dy
         self.pos.x = max(0, min(WIDTH, self.pos.x))
         self.pos.y = max(0, min(HEIGHT, self.pos.y))
+        self.step = (self.pos.x - x, self.pos.y - y)
 
 # Interaction class
 class Interaction:
@@ -69,8 +189,596 @@ class Interaction:
     """
     @staticmethod
     def check_collision(a, b, distance):
-        return a.distance_to(b) < distance
-    
+        dist_sq = a.distance_sq_to(b)
+        return dist_sq < distance * distance and math.sqrt(dist_sq) < distance
+
+    @staticmethod
+    def check_collision_xy(ax, ay, bx, by, distance):
+        """
+        Squared-distance form of check_collision on raw coordinates
+        The sqrt only runs for candidate hits, so results at the exact
+        boundary round the same way as check_collision
+        """
+        dist_sq = (ax - bx) ** 2 + (ay - by) ** 2
+        return dist_sq < distance * distance and math.sqrt(dist_sq) < distance
+
+    @staticmethod
+    def passes_xy(ax, ay, dx, dy, bx, by, distance):
+        """
+        True when a step from (ax - dx, ay - dy) to (ax, ay) made its
+        closest approach to (bx, by) strictly between its two ends, within
+        distance. The ends are positions some check already looks at, so
+        this only adds the hits a point test would step over.
+        """
+        length_sq = dx * dx + dy * dy
+        if not length_sq:
+            return False
+        # Closest approach, as the fraction of the step back from its end
+        back = ((ax - bx) * dx + (ay - by) * dy) / length_sq
+        if back <= 0 or back >= 1:
+            return False
+        x, y = ax - dx * back - bx, ay - dy * back - by
+        return x * x + y * y < distance * distance
+
+    @staticmethod
+    def swept_xy(ax, ay, dx, dy, bx, by, distance):
+        """
+        check_collision_xy over a's whole step of (dx, dy) to (ax, ay), so
+        a fast mover cannot jump past b between two checks. Every hit the
+        end-position test finds is still found, and rounds the same way.
+        """
+        return (Interaction.check_collision_xy(ax, ay, bx, by, distance)
+                or Interaction.passes_xy(ax, ay, dx, dy, bx, by, distance))
+
+    @staticmethod
+    def contact_time(rx, ry, wx, wy, distance):
+        """
+        Frames until b, at (rx, ry) from a and moving (wx, wy) a frame
+        relative to it, first comes within distance of a; 0 if it already
+        is, infinity if it never will
+        """
+        c = rx * rx + ry * ry - distance * distance
+        if c < 0:
+            return 0.0
+        b = rx * wx + ry * wy
+        disc = b * b - (wx * wx + wy * wy) * c
+        if b >= 0 or disc < 0:
+            return float("inf")
+        return (-b - math.sqrt(disc)) / (wx * wx + wy * wy)
+
+    @staticmethod
+    def swept_pair_xy(ax, ay, adx, ady, bx, by, bdx, bdy, distance):
+        """
+        swept_xy for a and b stepping by (adx, ady) and (bdx, bdy) over the
+        same update, as a's step relative to b
+        """
+        return Interaction.swept_xy(ax, ay, adx - bdx, ady - bdy, bx, by, distance)
+
+# SpatialGrid class
+class SpatialGrid:
+    """
+    Uniform grid over the playfield for broad-phase collision queries
+    Points outside the canvas are clamped into the border cells,
+    so every point is indexed and queries never miss a candidate
+    """
+    def __init__(self, points, cell_size=80):
+        """
+        Bucket point indices by cell
+        Args:
+            points: sequence of objects with x/y attributes
+            cell_size: cell edge length in pixels
+        """
+        self.cell_size = cell_size
+        self.cols = -(-WIDTH // cell_size)
+        self.rows = -(-HEIGHT // cell_size)
+        self.cells = {}
+        for i, p in enumerate(points):
+            key = self._cell(p.x, p.y)
+            if key in self.cells:
+                self.cells[key].append(i)
+            else:
+                self.cells[key] = [i]
+
+    def _col(self, x):
+        return min(max(int(x // self.cell_size), 0), self.cols - 1)
+
+    def _row(self, y):
+        return min(max(int(y // self.cell_size), 0), self.rows - 1)
+
+    def _cell(self, x, y):
+        return self._row(y) * self.cols + self._col(x)
+
+    def query(self, x, y, radius):
+        """Return indices of all points in cells touching the circle, in ascending order"""
+        found = []
+        col_lo, col_hi = self._col(x - radius), self._col(x + radius)
+        for row in range(self._row(y - radius), self._row(y + radius) + 1):
+            base = row * self.cols
+            for col in range(col_lo, col_hi + 1):
+                cell = self.cells.get(base + col)
+                if cell:
+                    found.extend(cell)
+        found.sort()
+        return found
+
+# EntityArrays class
+class EntityArrays:
+    """
+    Struct-of-arrays storage for one entity kind (requires numpy)
+    Contiguous x/y/vx/vy/alive columns plus an integer tag for the
+    sprite or powerup type and the frame each entity was born on;
+    live slots are kept in spawn order
+    """
+    def __init__(self, capacity=64):
+        self.n = 0
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.vx = np.zeros(capacity)
+        self.vy = np.zeros(capacity)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.tag = np.zeros(capacity, dtype=np.int32)
+        self.born = np.zeros(capacity, dtype=np.int64)
+
+    def __len__(self):
+        return self.n
+
+    @classmethod
+    def from_columns(cls, x, y, vx=0.0, vy=0.0, tag=0, born=0):
+        """A store holding the given column arrays (copied in)"""
+        store = cls(max(64, len(x)))
+        store.spawn_many(x, y, vx, vy, tag)
+        store.born[:store.n] = born
+        return store
+
+    def _reserve(self, needed):
+        """Grow every column geometrically to hold needed slots"""
+        capacity = len(self.x)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ("x", "y", "vx", "vy", "alive", "tag", "born"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.n] = old[:self.n]
+            setattr(self, name, new)
+
+    def spawn(self, x, y, vx=0.0, vy=0.0, tag=0, born=0):
+        """Append one entity and return its slot"""
+        self._reserve(self.n + 1)
+        i = self.n
+        self.x[i], self.y[i], self.vx[i], self.vy[i] = x, y, vx, vy
+        self.alive[i], self.tag[i], self.born[i] = True, tag, born
+        self.n += 1
+        return i
+
+    def spawn_many(self, x, y, vx, vy, tag=0, born=0):
+        """Append a batch of entities from equal-length arrays"""
+        count = len(x)
+        self._reserve(self.n + count)
+        end = self.n + count
+        self.x[self.n:end], self.y[self.n:end] = x, y
+        self.vx[self.n:end], self.vy[self.n:end] = vx, vy
+        self.alive[self.n:end], self.tag[self.n:end] = True, tag
+        self.born[self.n:end] = born
+        self.n = end
+
+    def clear(self):
+        self.n = 0
+
+    def advance(self):
+        """Move every live entity by its velocity"""
+        n = self.n
+        self.x[:n] += self.vx[:n]
+        self.y[:n] += self.vy[:n]
+
+    def compact(self):
+        """Drop dead slots in one pass, preserving spawn order"""
+        n = self.n
+        keep = self.alive[:n]
+        count = int(np.count_nonzero(keep))
+        if count == n:
+            return
+        for name in ("x", "y", "vx", "vy", "tag", "born"):
+            col = getattr(self, name)
+            col[:count] = col[:n][keep]
+        self.alive[:count] = True
+        self.n = count
+
+    def near(self, x, y, distance):
+        """
+        Ascending slots of live entities that may lie within distance of (x, y)
+        The bound is slightly loose; confirm hits with Interaction.check_collision_xy
+        """
+        n = self.n
+        dist_sq = (self.x[:n] - x) ** 2 + (self.y[:n] - y) ** 2
+        return np.flatnonzero(self.alive[:n] & (dist_sq < distance * distance * (1 + 1e-9)))
+
+# Lifetime class
+class Lifetime:
+    """Culling rules for one entity kind"""
+    def __init__(self, margin=0, max_age=None, cap=None):
+        """
+        Args:
+            margin: pixels an entity may travel past any screen edge
+                    before it is culled (None turns bounds culling off)
+            max_age: frames an entity may live (None for no limit)
+            cap: most entities of the kind kept alive; the oldest are
+                 dropped first (None for no cap)
+        """
+        self.margin = margin
+        self.max_age = max_age
+        self.cap = cap
+
+def release_boss_bullet(bullet):
+    VECTOR_POOL.release(bullet["pos"])
+    VECTOR_POOL.release(bullet["vel"])
+
+# LifetimeManager class
+class LifetimeManager:
+    """
+    Central culling for every entity list: four-edge bounds with a
+    margin, maximum age and population caps, per kind, with counters of
+    live and culled entities. Lists stay in spawn order, so the oldest
+    entities are always at the front.
+    """
+    KINDS = ("bullets", "enemies", "boss_bullets", "powerups")
+    # Position of, and pooled-vector release for, one list entry per kind
+    POSITION = {"bullets": lambda bullet: bullet,
+                "enemies": lambda enemy: enemy[0],
+                "boss_bullets": lambda bullet: bullet["pos"],
+                "powerups": lambda power: power["pos"]}
+    RELEASE = {"bullets": VECTOR_POOL.release, "boss_bullets": release_boss_bullet}
+
+    def __init__(self, rules=None):
+        """
+        Args:
+            rules: {kind: Lifetime} overriding the default of culling
+                   at the screen edges with no age limit or cap
+        """
+        self.rules = {kind: Lifetime() for kind in self.KINDS}
+        self.rules.update(rules or {})
+        self.now = 0
+        # kind -> {id(entity): (entity, birth frame)}, only for kinds with a max_age
+        self.born = {kind: {} for kind in self.KINDS}
+        self.live = dict.fromkeys(self.KINDS, 0)
+        self.culled = {kind: {"bounds": 0, "age": 0, "cap": 0} for kind in self.KINDS}
+
+    def spawned(self, kind, entity, born=None):
+        """Note the frame a list entity was born on (used by max_age)"""
+        if self.rules[kind].max_age is not None:
+            self.born[kind][id(entity)] = (entity, self.now if born is None else born)
+
+    def birth(self, kind, entity):
+        """Frame a list entity was born on (now when it is not tracked)"""
+        entry = self.born[kind].get(id(entity))
+        return entry[1] if entry is not None and entry[0] is entity else self.now
+
+    def cull(self, kind, entities):
+        """
+        Apply kind's rules to a list of entities
+        Args:
+            kind: one of KINDS
+            entities: the list, in spawn order
+        Returns:
+            a new list of the survivors, in the same order
+        """
+        rule, culled = self.rules[kind], self.culled[kind]
+        release = self.RELEASE.get(kind)
+        kept = entities
+        if rule.margin is not None:
+            position = self.POSITION[kind]
+            low_x, high_x = -rule.margin, WIDTH + rule.margin
+            low_y, high_y = -rule.margin, HEIGHT + rule.margin
+            kept = []
+            for entity in entities:
+                pos = position(entity)
+                if pos.x < low_x or pos.x > high_x or pos.y < low_y or pos.y > high_y:
+                    if release:
+                        release(entity)
+                else:
+                    kept.append(entity)
+            culled["bounds"] += len(entities) - len(kept)
+
+        if rule.max_age is not None:
+            born, now = self.born[kind], self.now
+            oldest = now - rule.max_age
+            young, alive = [], {}
+            for entity in kept:
+                entry = born.get(id(entity))
+                if entry is None or entry[0] is not entity:
+                    # Added without spawned(): count from the first cull
+                    entry = (entity, now)
+                if entry[1] <= oldest:
+                    if release:
+                        release(entity)
+                else:
+                    young.append(entity)
+                    alive[id(entity)] = entry
+            culled["age"] += len(kept) - len(young)
+            kept, self.born[kind] = young, alive
+
+        if rule.cap is not None and len(kept) > rule.cap:
+            excess = len(kept) - rule.cap
+            if release:
+                for entity in kept[:excess]:
+                    release(entity)
+            kept = kept[excess:]
+            culled["cap"] += excess
+
+        self.live[kind] = len(kept)
+        return kept
+
+    def cull_store(self, kind, store):
+        """cull() for an EntityArrays store, in place"""
+        rule, culled = self.rules[kind], self.culled[kind]
+        n = store.n
+        x, y, alive = store.x[:n], store.y[:n], store.alive[:n]
+        if rule.margin is not None:
+            margin = rule.margin
+            alive &= (x >= -margin) & (x <= WIDTH + margin) & (y >= -margin) & (y <= HEIGHT + margin)
+            culled["bounds"] += n - int(np.count_nonzero(alive))
+        if rule.max_age is not None:
+            before = int(np.count_nonzero(alive))
+            alive &= store.born[:n] > self.now - rule.max_age
+            culled["age"] += before - int(np.count_nonzero(alive))
+        if rule.cap is not None:
+            excess = int(np.count_nonzero(alive)) - rule.cap
+            if excess > 0:
+                alive[np.flatnonzero(alive)[:excess]] = False
+                culled["cap"] += excess
+        store.compact()
+        self.live[kind] = store.n
+
+    def stats(self):
+        """Live and culled counts per kind"""
+        return {"live": dict(self.live),
+                "culled": {kind: dict(counts) for kind, counts in self.culled.items()}}
+
+# Difficulty class
+class Difficulty:
+    """
+    Balance parameters for waves, powerups and bosses
+    The defaults are the shipped game. Override any of them by keyword,
+    e.g. Difficulty(boss_health_per_wave=4), for balance experiments
+    """
+    DEFAULTS = {
+        "enemy_speed": 1,                # starting enemy fall speed
+        "enemy_speed_growth": 1.1,       # speed multiplier per wave and per boss kill
+        "enemy_spawn_rate": 100,         # frames between enemy spawns
+        "powerup_rate": 500,             # frames between powerup spawns
+        "powertime": 600,                # frames a powerup lasts
+        "kills_per_wave": 10,
+        "boss_every": 5,                 # a boss arrives every Nth wave
+        "boss_health": {"tank": 25, "shooter": 20, "evader": 20},
+        "boss_health_per_wave": 3,
+        "boss_speed": {"tank": 1, "shooter": 2, "evader": 2},
+        "boss_speed_per_wave": 0.1,
+        "boss_speed_cap": 5,
+        "boss_fire_delay": {"tank": 90, "shooter": 60, "evader": 90},
+        "boss_fire_delay_per_wave": 2,
+        "boss_fire_delay_min": 20,
+    }
+
+    def __init__(self, **overrides):
+        for name, value in self.DEFAULTS.items():
+            setattr(self, name, copy.copy(value))
+        for name, value in overrides.items():
+            if name not in self.DEFAULTS:
+                raise TypeError("unknown difficulty parameter '%s'" % name)
+            setattr(self, name, value)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.DEFAULTS}
+
+    def boss_health_at(self, boss_type, wave):
+        return self.boss_health[boss_type] + (wave - 1) * self.boss_health_per_wave
+
+    def boss_speed_at(self, boss_type, wave):
+        return min(self.boss_speed[boss_type] + wave * self.boss_speed_per_wave, self.boss_speed_cap)
+
+    def boss_fire_delay_at(self, boss_type, wave):
+        return max(self.boss_fire_delay[boss_type] - wave * self.boss_fire_delay_per_wave,
+                   self.boss_fire_delay_min)
+
+DEFAULT_DIFFICULTY = Difficulty()
+
+# Scheduler class
+class Scheduler:
+    """
+    Frame-keyed event queue (a min-heap of [frame, phase, seq, callback, args])
+    Callbacks run once their frame comes up, in phase order within a
+    frame, so per-frame countdowns and modulo checks become one
+    comparison against the earliest event
+    """
+    # Phase of a frame that has fully run
+    LAST = 1 << 30
+
+    def __init__(self, frame=0):
+        self.reset(frame)
+
+    def reset(self, frame=0):
+        """Drop every event and mark frame as already run"""
+        self.heap = []
+        self.seq = 0
+        self.frame, self.phase = frame, self.LAST
+
+    def __len__(self):
+        return sum(1 for event in self.heap if event[3] is not None)
+
+    def at(self, frame, phase, callback, *args):
+        """
+        Schedule callback(*args); returns the event, for cancel()
+        Args:
+            frame: frame number the event is due on
+            phase: order among events due on the same frame
+        """
+        event = [frame, phase, self.seq, callback, args]
+        self.seq += 1
+        if heapq:
+            heapq.heappush(self.heap, event)
+        else:
+            self.heap.append(event)
+            self.heap.sort()
+        return event
+
+    def cancel(self, event):
+        """Cancel a pending event (None and spent events are ignored)"""
+        if event is not None:
+            event[3] = None
+
+    def next_multiple(self, period, phase):
+        """First frame divisible by period whose phase has not run yet"""
+        frame = -(-self.frame // period) * period
+        if frame == self.frame and phase <= self.phase:
+            frame += period
+        return frame
+
+    def next_frame(self):
+        """Frame of the earliest pending event, or None"""
+        heap = self.heap
+        while heap and heap[0][3] is None:
+            heapq.heappop(heap) if heapq else heap.pop(0)
+        return heap[0][0] if heap else None
+
+    def run(self, frame, phase=0):
+        """Run every event due up to and including (frame, phase)"""
+        heap = self.heap
+        while heap and (heap[0][0] < frame or heap[0][0] == frame and heap[0][1] <= phase):
+            event = heapq.heappop(heap) if heapq else heap.pop(0)
+            callback = event[3]
+            if callback is not None:
+                event[3] = None
+                self.frame, self.phase = event[0], event[1]
+                callback(*event[4])
+        self.frame, self.phase = frame, phase
+
+# Pattern class
+class Pattern:
+    """
+    Declarative boss bullet pattern
+    Velocity tables are computed once, when the pattern is defined, so a
+    burst only copies a table into the projectile store. kind is one of:
+    - "radial": count shots evenly round the arc, starting at angle
+    - "spread": one shot per entry of dx, all falling at speed
+    - "aimed": count shots fanned over arc degrees, centred on the target
+    - "spiral": a radial ring turned a further turn degrees every burst
+    """
+    def __init__(self, kind, count=1, speed=5, angle=0, arc=360, dx=(), turn=0, offset=(0, 0)):
+        """
+        Args:
+            offset: (x, y) of the muzzle relative to the boss centre
+        """
+        self.kind, self.speed, self.offset = kind, speed, offset
+        if kind == "spread":
+            self.tables = [tuple((step, speed) for step in dx)]
+        elif kind == "aimed":
+            # Fan rotations around the aim direction, as (cos, sin)
+            self.fan = [(math.cos(rad), math.sin(rad))
+                        for rad in [math.radians(a) for a in self.angles(count, -arc / 2, arc)]]
+            self.tables = []
+        else:
+            turns = 1
+            while kind == "spiral" and turn and turns * turn % 360:
+                turns += 1
+            self.tables = [self.ring(count, speed, angle + k * turn, arc) for k in range(turns)]
+        # numpy copies of the tables, made by the first columns() call
+        self.columns_cache = None
+        # Bound on any shot's |dx| + |dy| per tick (an aimed one at 45 degrees is the worst)
+        if kind == "aimed":
+            self.reach = speed * math.sqrt(2)
+        else:
+            self.reach = max([abs(dx) + abs(dy) for table in self.tables for dx, dy in table] or [0])
+
+    @staticmethod
+    def angles(count, start, arc):
+        """Degrees of count shots over arc (a full circle leaves no gap at the end)"""
+        if arc % 360 == 0:
+            return [start + i * arc / count for i in range(count)]
+        return [start + i * arc / max(count - 1, 1) for i in range(count)]
+
+    @classmethod
+    def ring(cls, count, speed, start, arc):
+        shots = []
+        for angle in cls.angles(count, start, arc):
+            rad = math.radians(angle)
+            shots.append((math.cos(rad) * speed, math.sin(rad) * speed))
+        return tuple(shots)
+
+    @staticmethod
+    def split(table):
+        return (np.array([dx for dx, _ in table], dtype=float),
+                np.array([dy for _, dy in table], dtype=float))
+
+    def velocities(self, burst=0, x=0, y=0, target=None):
+        """
+        (dx, dy) of every shot in one burst
+        Args:
+            burst: how many bursts of this attack came before (spirals turn)
+            x, y: muzzle position, for aimed patterns
+            target: (x, y) aimed patterns fire at (straight down when None)
+        """
+        if self.kind != "aimed":
+            return self.tables[burst % len(self.tables)]
+        aim_x, aim_y = 0, 1
+        if target is not None:
+            dist = math.sqrt((target[0] - x) ** 2 + (target[1] - y) ** 2)
+            if dist > 0:
+                aim_x, aim_y = (target[0] - x) / dist, (target[1] - y) / dist
+        speed = self.speed
+        return tuple(((aim_x * c - aim_y * s) * speed, (aim_x * s + aim_y * c) * speed)
+                     for c, s in self.fan)
+
+    def columns(self, burst=0, x=0, y=0, target=None):
+        """velocities() as (dx, dy) numpy arrays, shared for fixed tables"""
+        if self.kind != "aimed":
+            if self.columns_cache is None:
+                self.columns_cache = [self.split(table) for table in self.tables]
+            return self.columns_cache[burst % len(self.tables)]
+        return self.split(self.velocities(burst, x, y, target))
+
+# Bullet patterns by name
+PATTERNS = {
+    "ring": Pattern("radial", count=12, speed=5),
+    "spread": Pattern("spread", dx=(-2, 0, 2), speed=5, offset=(0, 50)),
+    "fan": Pattern("aimed", count=5, arc=60, speed=6, offset=(0, 50)),
+    "spiral": Pattern("spiral", count=8, speed=4, turn=15),
+}
+
+# Boss types: HUD name, attacks as (pattern, period in ticks, or None
+# for the wave-scaled fire_delay) and an optional teleport period
+BOSS_TYPES = {
+    "tank": {"name": "FIREWALL.EXE", "attacks": [("ring", 180)]},
+    "shooter": {"name": "PACKET STORM", "attacks": [("spread", None)]},
+    "evader": {"name": "GLITCH WRAITH", "attacks": [], "teleport": 240},
+}
+
+# Game.update phases, in the order a frame reaches them
+PHASE_POPUP, PHASE_TIMERS, PHASE_SPAWN_ENEMY, PHASE_SPAWN_POWERUP, PHASE_SHOOT = range(5)
+
+# Recurring events and countdowns kept on the game's Scheduler
+RECURRING = {"enemy": PHASE_SPAWN_ENEMY, "powerup": PHASE_SPAWN_POWERUP, "shoot": PHASE_SHOOT}
+COUNTDOWNS = {"popup": PHASE_POPUP, "rapid": PHASE_TIMERS, "slow": PHASE_TIMERS, "shield": PHASE_TIMERS}
+
+def rescheduling(attr, name):
+    """Attribute that re-arms the recurring event name when assigned"""
+    private = "_" + attr
+    def get(game):
+        return getattr(game, private)
+    def set(game, value):
+        setattr(game, private, value)
+        game.repeat(name)
+    return property(get, set)
+
+def countdown(name):
+    """Frames-left attribute backed by a scheduled expiry event"""
+    def get(game):
+        event = game.events.get(name)
+        return event[0] - game.frames if event is not None else 0
+    def set(game, frames):
+        game.set_countdown(name, frames)
+    return property(get, set)
+
 # Boss class
 class Boss:
     """
@@ -79,24 +787,31 @@ class Boss:
     - Shooter: Rapid triple-shot attacks  
     - Evader: Dodges player bullets
     """
-    def __init__(self, boss_type, image, wave):
+    def __init__(self, boss_type, image, wave, rng=None, difficulty=None, lifetimes=None):
         """
         Initialize boss with wave-scaled stats
         Args:
             boss_type: 'tank', 'shooter', or 'evader'
             image: sprite image
             wave: current wave for difficulty scaling
+            rng: random source for teleports and dodges (the game's
+                 RNG; the global random module when None)
+            difficulty: Difficulty with the scaling parameters
+                        (DEFAULT_DIFFICULTY when None)
+            lifetimes: LifetimeManager culling the boss's projectiles
+                       (the game's; a private one when None)
         """
+        self.rng = rng or random
+        self.lifetimes = lifetimes or LifetimeManager()
+        difficulty = difficulty or DEFAULT_DIFFICULTY
         self.pos = Vector(WIDTH // 2, -100)
         self.size = Vector(150, 150)
         self.image = image
         
         # Wave-scaled stats
-        base_health = 25 if boss_type == "tank" else 20
-        self.health = base_health + (wave - 1) * 3 
-
-        base_speed = 1 if boss_type == "tank" else 2
-        self.speed = min(base_speed + wave * 0.1, 5) 
+        self.health = difficulty.boss_health_at(boss_type, wave)
+        self.max_health = self.health
+        self.speed = difficulty.boss_speed_at(boss_type, wave)
         
         # Combat systems
         self.boss_type = boss_type
@@ -104,25 +819,42 @@ class Boss:
         self.direction = 1
         self.bullets = []
 
-        base_delay = 90 if boss_type != "shooter" else 60
-        self.fire_delay = max(base_delay - wave * 2, 20)
+        self.fire_delay = difficulty.boss_fire_delay_at(boss_type, wave)
 
         self.fire_timer = 0
         self.pattern_timer = 0
 
-        self.name = {
-            "tank": "FIREWALL.EXE",
-            "shooter": "PACKET STORM",
-            "evader": "GLITCH WRAITH"
-        }[boss_type]
+        self.target = None
+        # The boss's (dx, dy) over the last update (dodges and teleports are jumps, not steps)
+        self.step = (0, 0)
+
+        # Attacks and teleports are due on pattern_timer ticks
+        spec = BOSS_TYPES[boss_type]
+        # Farthest any of its projectiles moves in a tick, as |dx| + |dy|
+        self.reach = max([PATTERNS[pattern].reach for pattern, _ in spec["attacks"]] or [0])
+        self.schedule = Scheduler()
+        for pattern, period in spec["attacks"]:
+            self.schedule.at(period or self.fire_delay, 0, self.attack, PATTERNS[pattern], period, 0)
+        if spec.get("teleport"):
+            self.schedule.at(spec["teleport"], 0, self.teleport, spec["teleport"])
+
+        self.name = spec["name"]
 
-    def update(self):
-        """Update boss position, attacks, and patterns"""
+    def update(self, player_bullets=(), target=None):
+        """
+        Update boss position, attacks, and patterns
+        Args:
+            player_bullets: player projectiles the evader tries to dodge
+            target: player position that aimed patterns fire at
+        """
+        self.target = target
+        x, y = self.pos.x, self.pos.y
         # Entry animation
         if not self.entered_screen:
             self.pos.y += self.speed
             if self.pos.y >= 150:
                 self.entered_screen = True
+            self.step = (0, self.pos.y - y)
             return
         
         # Horizontal movement with bouncing
@@ -130,69 +862,885 @@ class Boss:
         if self.pos.x < 100 or self.pos.x > WIDTH - 100:
             self.direction *= -1
         
+        self.step = (self.pos.x - x, self.pos.y - y)
+
         # Type-specific behaviors
         if self.boss_type == "evader":
-            for bullet in GAME.bullets:
-                if abs(bullet.y - self.pos.y) < 150 and abs(bullet.x - self.pos.x) < 60:
-                    self.pos.x += random.choice([-20, 20])
-                    break
+            self.dodge(player_bullets)
 
         self.fire_timer += 1
         self.pattern_timer += 1
+        self.schedule.run(self.pattern_timer)
 
-        if self.boss_type == "tank":
-            if self.pattern_timer % 180 == 0:
-                for angle in range(0, 360, 30):
-                    rad = math.radians(angle)
-                    dx = math.cos(rad) * 5
-                    dy = math.sin(rad) * 5
-                    self.bullets.append({"pos": Vector(self.pos.x, self.pos.y), "vel": Vector(dx, dy)})
-
-        elif self.boss_type == "shooter":
-            if self.fire_timer >= self.fire_delay:
-                self.fire_timer = 0
-                for dx in [-2, 0, 2]:
-                    self.bullets.append({"pos": Vector(self.pos.x, self.pos.y + 50), "vel": Vector(dx, 5)})
-
-        elif self.boss_type == "evader":
-            if self.pattern_timer % 240 == 0:
-                self.pos.x = random.randint(100, WIDTH - 100)
-                self.pos.y = 150 + random.randint(-50, 50)
-
-        for bullet in self.bullets[:]:
+        self.advance_bullets()
+
+    def attack(self, pattern, period, burst):
+        """
+        Fire one burst of a pattern and schedule the next
+        Args:
+            period: ticks between bursts; None uses fire_delay and
+                    restarts fire_timer
+            burst: bursts of this attack fired so far
+        """
+        if period is None:
+            self.fire_timer = 0
+        self.fire_pattern(pattern, burst)
+        self.schedule.at(self.pattern_timer + (period or self.fire_delay), 0,
+                         self.attack, pattern, period, burst + 1)
+
+    def teleport(self, period):
+        """Jump to a random spot every period ticks"""
+        self.pos.x = self.rng.randint(100, WIDTH - 100)
+        self.pos.y = 150 + self.rng.randint(-50, 50)
+        self.step = (0, 0)
+        self.schedule.at(self.pattern_timer + period, 0, self.teleport, period)
+
+    def dodge(self, player_bullets):
+        """Sidestep when a player bullet is lined up with the boss"""
+        for bullet in player_bullets:
+            if abs(bullet.y - self.pos.y) < 150 and abs(bullet.x - self.pos.x) < 60:
+                self.pos.x += self.rng.choice([-20, 20])
+                self.step = (0, 0)
+                break
+
+    def fire(self, x, y, dx, dy):
+        """Spawn one boss projectile"""
+        bullet = {"pos": VECTOR_POOL.acquire(x, y), "vel": VECTOR_POOL.acquire(dx, dy)}
+        self.bullets.append(bullet)
+        self.lifetimes.spawned("boss_bullets", bullet)
+
+    def fire_pattern(self, pattern, burst=0):
+        """Spawn a whole burst of pattern from the boss's muzzle"""
+        x, y = self.pos.x + pattern.offset[0], self.pos.y + pattern.offset[1]
+        acquire = VECTOR_POOL.acquire
+        shots = [{"pos": acquire(x, y), "vel": acquire(dx, dy)}
+                 for dx, dy in pattern.velocities(burst, x, y, self.target)]
+        self.bullets.extend(shots)
+        for bullet in shots:
+            self.lifetimes.spawned("boss_bullets", bullet)
+
+    def advance_bullets(self):
+        """Move boss projectiles and cull those that left the screen"""
+        for bullet in self.bullets:
             bullet["pos"] += bullet["vel"]
-            if bullet["pos"].y > HEIGHT or bullet["pos"].x < 0 or bullet["pos"].x > WIDTH:
-                self.bullets.remove(bullet)
+        self.bullets = self.lifetimes.cull("boss_bullets", self.bullets)
 
-    def draw(self, canvas):
-        """Draw boss sprite and health bar"""
+    def bullet_count(self):
+        return len(self.bullets)
+
+    def bullet_positions(self, back=0.0):
+        """
+        (x, y) of every boss projectile
+        Args:
+            back: fraction of a tick to step each one back along its velocity
+        """
+        if back:
+            return [(b["pos"].x - b["vel"].x * back, b["pos"].y - b["vel"].y * back) for b in self.bullets]
+        return [bullet["pos"].to_tuple() for bullet in self.bullets]
+
+    def bullet_columns(self):
+        """Projectile x, y, vx, vy and birth frame lists, for snapshots"""
+        bullets, birth = self.bullets, self.lifetimes.birth
+        return ([b["pos"].x for b in bullets], [b["pos"].y for b in bullets],
+                [b["vel"].x for b in bullets], [b["vel"].y for b in bullets],
+                [birth("boss_bullets", b) for b in bullets])
+
+    def restore_bullets(self, columns):
+        """Replace the projectiles with bullet_columns() output"""
+        self.lifetimes.born["boss_bullets"] = {}
+        self.bullets = []
+        for x, y, dx, dy, born in zip(*[plain(column) for column in columns]):
+            bullet = {"pos": Vector(x, y), "vel": Vector(dx, dy)}
+            self.bullets.append(bullet)
+            self.lifetimes.spawned("boss_bullets", bullet, born)
+
+    def attacks(self):
+        """Pending (tick, attack index or -1 for a teleport, burst) events"""
+        spec = BOSS_TYPES[self.boss_type]
+        pending = []
+        for event in sorted(self.schedule.heap):
+            callback, args = event[3], event[4]
+            if callback is None:
+                continue
+            if callback == self.teleport:
+                pending.append((event[0], -1, 0))
+            else:
+                pattern, period, burst = args
+                index = [(PATTERNS[name], every) for name, every in spec["attacks"]].index((pattern, period))
+                pending.append((event[0], index, burst))
+        return pending
+
+    def restore_attacks(self, pending):
+        """Reschedule attacks() output on the boss's clock"""
+        spec = BOSS_TYPES[self.boss_type]
+        self.schedule.reset(self.pattern_timer)
+        for tick, index, burst in pending:
+            if index < 0:
+                self.schedule.at(tick, 0, self.teleport, spec["teleport"])
+            else:
+                name, period = spec["attacks"][index]
+                self.schedule.at(tick, 0, self.attack, PATTERNS[name], period, burst)
+
+    def render(self, frame, pos=None, back=0.0, boxes=False, cap=None):
+        """
+        Queue boss sprite, projectiles and health bar on a RenderList
+        Args:
+            pos: (x, y) to draw the boss at (its position when None)
+            back: fraction of a tick to draw projectiles behind
+            boxes: draw projectiles as filled squares instead of circles
+            cap: most projectiles to draw (all when None)
+        """
+        pos = pos or self.pos.to_tuple()
         # Boss sprite
-        canvas.draw_image(self.image,
-            (self.image.get_width() / 2, self.image.get_height() / 2),
-            (self.image.get_width(), self.image.get_height()),
-            self.pos.to_tuple(), self.size.to_tuple())
+        frame.sprite(LAYER_BOSS, self.image, pos, self.size.to_tuple())
         
         # Projectiles
-        for bullet in self.bullets:
-            canvas.draw_circle(bullet["pos"].to_tuple(), 7, 1, "Red", "Red")
+        if boxes:
+            for bullet in self.bullet_positions(back)[:cap]:
+                frame.box(LAYER_BOSS_BULLETS, bullet, 12, "Red")
+        else:
+            for bullet in self.bullet_positions(back)[:cap]:
+                frame.circle(LAYER_BOSS_BULLETS, bullet, 7, 1, "Red", "Red")
         
         # Health bar
         bar_width = 200
         bar_height = 20
-        bar_x = self.pos.x - bar_width / 2
-        bar_y = self.pos.y - self.size.y / 2 - 30
-        max_health = 25 if self.boss_type == "tank" else 20
-        health_ratio = self.health / max_health
+        bar_x = pos[0] - bar_width / 2
+        bar_y = pos[1] - self.size.y / 2 - 30
+        health_ratio = self.health / self.max_health
         
         # Background bar
-        canvas.draw_polygon([(bar_x, bar_y), (bar_x + bar_width, bar_y),
-                            (bar_x + bar_width, bar_y + bar_height), (bar_x, bar_y + bar_height)], 1, "White", "Gray")
+        frame.rect(LAYER_BOSS_BAR, bar_x, bar_y, bar_width, bar_height, 1, "White", "Gray")
         
         # Health fill
-        canvas.draw_polygon([(bar_x, bar_y), (bar_x + bar_width * health_ratio, bar_y),
-                            (bar_x + bar_width * health_ratio, bar_y + bar_height), (bar_x, bar_y + bar_height)], 1, "Red", "Red")
+        frame.rect(LAYER_BOSS_BAR, bar_x, bar_y, bar_width * health_ratio, bar_height, 1, "Red", "Red")
+
+# FixedClock class
+class FixedClock:
+    """
+    Fixed-timestep simulation clock
+    Each call to ticks() turns the wall time since the last call into
+    whole update ticks, so the game runs at tick_rate whatever rate the
+    draw handler is called at. The leftover fraction of a tick is kept
+    as alpha for render interpolation. A backlog beyond max_ticks is
+    dropped, so an overloaded machine slows the game down instead of
+    falling further behind every frame.
+    """
+    def __init__(self, tick_rate=60, max_ticks=5, clock=None):
+        self.dt = 1.0 / tick_rate
+        self.max_ticks = max_ticks
+        self.clock = clock or getattr(time, "perf_counter", time.time)
+        self.last = None
+        self.accumulator = 0.0
+        self.alpha = 1.0
+        self.behind = False
+        self.rendered = True
+        # Ticks lost to the catch-up bound, and render frames skipped
+        self.dropped = self.skipped = 0
+
+    def ticks(self):
+        """Number of update ticks due since the previous call"""
+        now = self.clock()
+        if self.last is None:
+            self.last = now
+            return 1
+        self.accumulator += now - self.last
+        self.last = now
+        due = int(self.accumulator / self.dt)
+        if due > self.max_ticks:
+            self.dropped += due - self.max_ticks
+            self.accumulator -= (due - self.max_ticks) * self.dt
+            due = self.max_ticks
+        self.accumulator -= due * self.dt
+        self.alpha = self.accumulator / self.dt
+        self.behind = due > 1
+        return due
+
+    def render_due(self):
+        """
+        False for every other frame while catching up, so building a
+        frame never costs more than one frame's worth of ticks in a row
+        """
+        self.rendered = not (self.behind and self.rendered)
+        if not self.rendered:
+            self.skipped += 1
+        return self.rendered
+
+# Render quality levels, each adding one saving to those before it
+QUALITY_FULL = 0
+QUALITY_BOX_BULLETS = 1    # boss projectiles as filled squares, not circles
+QUALITY_NO_BACKGROUND = 2  # skip the full-screen background image
+QUALITY_SLOW_HUD = 3       # rebuild HUD text at most every HUD_REFRESH ticks
+QUALITY_CAPPED = 4         # draw at most SPRITE_CAP enemies, bullets and projectiles
+QUALITY_NAMES = ["full", "box_bullets", "no_background", "slow_hud", "capped"]
+HUD_REFRESH = 15
+SPRITE_CAP = 150
+
+# QualityGovernor class
+class QualityGovernor:
+    """
+    Steps render quality down while frames run over budget, and back up
+    once there is headroom again
+    Each draw handler's time is folded into a moving average. Staying
+    over budget for degrade_after frames drops one level; staying under
+    restore_below of the budget for the longer restore_after frames
+    raises one. For settle frames after a change no step is taken, so
+    the average can show the effect of the last one first.
+    """
+    def __init__(self, budget=1.0 / 60, degrade_after=10, restore_below=0.6, restore_after=120,
+                 settle=30, smoothing=0.1, history=32, clock=None):
+        self.budget = budget
+        self.degrade_after = degrade_after
+        self.restore_below = restore_below
+        self.restore_after = restore_after
+        self.settle = settle
+        self.smoothing = smoothing
+        self.history = history
+        self.clock = clock or getattr(time, "perf_counter", time.time)
+        self.reset()
+
+    def reset(self):
+        """Back to full quality, forgetting every measurement"""
+        self.level = QUALITY_FULL
+        self.average = 0.0
+        self.start = None
+        self.frames = 0
+        self.over = self.under = self.wait = 0
+        self.frames_at = [0] * len(QUALITY_NAMES)
+        # (frame, from level, to level, average ms), most recent last
+        self.transitions = []
+
+    def begin_frame(self):
+        self.start = self.clock()
+
+    def end_frame(self):
+        """Charge the time since begin_frame(); returns the level to draw at next"""
+        if self.start is not None:
+            self.measure(self.clock() - self.start)
+            self.start = None
+        return self.level
+
+    def measure(self, seconds):
+        """Fold one frame time into the average and step the level if due"""
+        self.frames += 1
+        self.frames_at[self.level] += 1
+        if self.frames == 1:
+            self.average = seconds
+        else:
+            self.average += (seconds - self.average) * self.smoothing
+        if self.wait:
+            self.wait -= 1
+            return
+        self.over = self.over + 1 if self.average > self.budget else 0
+        self.under = self.under + 1 if self.average < self.budget * self.restore_below else 0
+        if self.over >= self.degrade_after and self.level < QUALITY_CAPPED:
+            self.change(self.level + 1)
+        elif self.under >= self.restore_after and self.level > QUALITY_FULL:
+            self.change(self.level - 1)
+
+    def change(self, level):
+        self.transitions.append((self.frames, self.level, level, self.average * 1000))
+        del self.transitions[:-self.history]
+        self.level = level
+        self.over = self.under = 0
+        self.wait = self.settle
+
+    def stats(self):
+        """Current level, average frame time, time spent per level and recent transitions"""
+        return {
+            "level": self.level,
+            "name": QUALITY_NAMES[self.level],
+            "frame_ms": self.average * 1000,
+            "budget_ms": self.budget * 1000,
+            "frames": self.frames,
+            "frames_at": dict(zip(QUALITY_NAMES, self.frames_at)),
+            "transitions": [{"frame": frame, "from": QUALITY_NAMES[before], "to": QUALITY_NAMES[after],
+                             "frame_ms": ms} for frame, before, after, ms in self.transitions],
+        }
+
+# FrameProfiler class
+class FrameProfiler:
+    """
+    Per-phase frame timings in a fixed-size ring buffer
+    Code marks the end of each named phase with lap(name); the time
+    since the previous lap is charged to that phase. Entity counts are
+    stored with every frame. While disabled, lap/begin_frame/end_frame
+    are bound to no-ops, so instrumented code pays one empty call.
+    """
+    COUNTS = ("bullets", "enemies", "powerups", "boss_bullets")
+
+    def __init__(self, capacity=600, clock=None):
+        self.capacity = capacity
+        self.clock = clock or getattr(time, "perf_counter", time.time)
+        self.reset()
+        self.disable()
+
+    def reset(self):
+        """Drop every recorded frame"""
+        self.head = 0
+        self.recorded = 0
+        self.starts = [0.0] * self.capacity
+        self.totals = [0.0] * self.capacity
+        self.phases = {}
+        self.counts = {name: [0] * self.capacity for name in self.COUNTS}
+        self.last = 0.0
+
+    def enable(self):
+        self.enabled = True
+        self.begin_frame, self.lap, self.end_frame = self._begin_frame, self._lap, self._end_frame
+
+    def disable(self):
+        self.enabled = False
+        self.begin_frame = self.end_frame = self._skip
+        self.lap = self._skip
+
+    def toggle(self):
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+
+    def _skip(self, *args):
+        pass
+
+    def _begin_frame(self):
+        head = self.head
+        for times in self.phases.values():
+            times[head] = 0.0
+        self.last = self.starts[head] = self.clock()
+
+    def _lap(self, phase):
+        now = self.clock()
+        times = self.phases.get(phase)
+        if times is None:
+            times = self.phases[phase] = [0.0] * self.capacity
+        times[self.head] += now - self.last
+        self.last = now
+
+    def _end_frame(self, game=None):
+        head = self.head
+        self.totals[head] = self.clock() - self.starts[head]
+        if game is not None:
+            for name, count in game.entity_counts().items():
+                self.counts[name][head] = count
+        self.head = (head + 1) % self.capacity
+        self.recorded = min(self.recorded + 1, self.capacity)
+
+    def slots(self):
+        """Ring indices of the recorded frames, oldest first"""
+        start = (self.head - self.recorded) % self.capacity
+        return [(start + i) % self.capacity for i in range(self.recorded)]
+
+    @staticmethod
+    def percentile(values, fraction):
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def summary(self):
+        """{phase: (p50, p99)} in milliseconds; the whole frame is reported as 'frame'"""
+        slots = self.slots()
+        result = {}
+        for phase, times in [("frame", self.totals)] + sorted(self.phases.items()):
+            values = [times[i] * 1000 for i in slots]
+            result[phase] = (self.percentile(values, 0.5), self.percentile(values, 0.99))
+        return result
+
+    def summary_lines(self):
+        """Overlay text, one phase per line"""
+        return tuple("%-22s p50 %6.2f  p99 %6.2f ms" % (phase, p50, p99)
+                     for phase, (p50, p99) in self.summary().items())
+
+    def trace_events(self, pid=1, tid=1):
+        """Recorded frames as Chrome trace-event dicts (times in microseconds)"""
+        events = []
+        order = list(self.phases)
+        for i in self.slots():
+            start = self.starts[i] * 1e6
+            events.append({"name": "frame", "ph": "X", "pid": pid, "tid": tid,
+                           "ts": start, "dur": self.totals[i] * 1e6})
+            offset = start
+            # Laps are sequential, so each phase starts where the previous one ended
+            for phase in order:
+                duration = self.phases[phase][i] * 1e6
+                if duration:
+                    events.append({"name": phase, "ph": "X", "pid": pid, "tid": tid,
+                                   "ts": offset, "dur": duration})
+                    offset += duration
+            events.append({"name": "entities", "ph": "C", "pid": pid, "ts": start,
+                           "args": {name: self.counts[name][i] for name in self.COUNTS}})
+        return events
+
+    def export_chrome_trace(self, path):
+        """Write the ring buffer as a chrome://tracing / Perfetto JSON file"""
+        import json
+        with open(path, "w") as out:
+            json.dump({"traceEvents": self.trace_events(), "displayTimeUnit": "ms"}, out)
+
+# Sprite sources, by asset name
+ASSET_URLS = {
+    "background": "https://i.postimg.cc/sDQ6rvVd/FDE305-EE-FE9-E-4238-8-C89-6-C1-C522-C7-E09.png",
+    "player": "https://i.postimg.cc/8zrqTJX8/FEEFEE13-2510-4598-897-F-A63-B40230-C05.png",
+    "slow_clock": "https://i.postimg.cc/Y2sXHQ34/clock-e.png",
+    "shield": "https://i.postimg.cc/65FVwnMy/SHIELDTRAN.png",
+    "rapid": "https://i.postimg.cc/2SpWgm5W/BULLETTRAN.png",
+    "enemy_0": "https://i.postimg.cc/PJ7HSyJB/7-DBB1-F73-01-EF-4194-A354-161-C218-C98-A3.png",
+    "enemy_1": "https://i.postimg.cc/PJJhb9XW/429-B7-BDA-D325-487-A-BFC4-E6-B979588972.png",
+    "enemy_2": "https://i.postimg.cc/qvjLSF4h/1-C4348-EC-C578-4747-B20-D-75-F6-FD192-FDE.png",
+    "enemy_3": "https://i.postimg.cc/5NJyryXk/C75-FC200-F2-D3-4158-9759-2-CC825-E710-E9.png",
+    "boss_tank": "https://i.postimg.cc/FKMN04Jb/image.png",
+    "boss_shooter": "https://i.postimg.cc/mrHGL56P/image.png",
+    "boss_evader": "https://i.postimg.cc/7L6fKw6p/image.png",
+}
+
+# LazyImage class
+class LazyImage:
+    """
+    Handle to a sprite that may still be loading
+    Reports a width/height of 0 until the backend image arrives,
+    matching how simplegui reports images that have not loaded yet
+    """
+    def __init__(self, name):
+        self.name = name
+        self.image = None
+        self.error = None
+
+    def get_width(self):
+        return self.image.get_width() if self.image is not None else 0
+
+    def get_height(self):
+        return self.image.get_height() if self.image is not None else 0
 
+# AssetManager class
+class AssetManager:
+    """
+    Sprite loader with an on-disk content cache and parallel prefetch
+    Each asset resolves from the cache directory first, then from the
+    bundled local directory (<name>.png), then from its URL; fetched
+    bytes are written back to the cache. warm() loads everything on a
+    thread pool and fills LazyImage handles as images arrive, so the
+    menu can draw immediately. Without threads or a filesystem (as in
+    CodeSkulptor) images are requested straight from their URLs.
+    """
+    def __init__(self, urls=None, cache_dir=None, local_dir=None, loader=None, workers=8):
+        """
+        Args:
+            urls: asset name -> URL (defaults to ASSET_URLS)
+            cache_dir: content cache directory (~/.cache/cyber-attack)
+            local_dir: bundled sprite directory (assets/ next to this file)
+            loader: backend image loader taking a URL (simplegui.load_image)
+            workers: thread pool size for warm()
+        """
+        self.urls = dict(ASSET_URLS if urls is None else urls)
+        if loader is None:
+            backend = load_backend()
+            if backend is None:
+                raise ImportError("loading sprites needs simplegui or SimpleGUICS2Pygame; "
+                                  "use Game(headless=True) without one")
+            loader = backend.load_image
+        self.loader = loader
+        self.workers = workers
+        self.handles = {}
+        self.sources = {}
+        self.timings = {}
+        self.started = self.finished = None
+        self.pool = None
+        if threading is not None:
+            self.cache_dir = cache_dir or os.path.join(os.path.expanduser("~"), ".cache", "cyber-attack")
+            self.local_dir = local_dir or os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+            self.lock = threading.Lock()
+
+    def image(self, name):
+        """Return the (possibly still empty) handle for an asset"""
+        if name not in self.handles:
+            self.handles[name] = LazyImage(name)
+        return self.handles[name]
+
+    def cache_path(self, name):
+        import hashlib
+        url = self.urls[name]
+        digest = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, digest + os.path.splitext(url)[1])
+
+    def fetch(self, name):
+        """Make sure the asset is in the cache; returns (path, source)"""
+        path = self.cache_path(name)
+        if os.path.exists(path):
+            return path, "cache"
+        local = os.path.join(self.local_dir, name + ".png")
+        if os.path.exists(local):
+            with open(local, "rb") as source:
+                data = source.read()
+            origin = "local"
+        else:
+            import urllib.request
+            with urllib.request.urlopen(self.urls[name], timeout=10) as response:
+                data = response.read()
+            origin = "url"
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Write then rename, so a crash never leaves a truncated cache entry
+        partial = "%s.%d.part" % (path, threading.get_ident())
+        with open(partial, "wb") as out:
+            out.write(data)
+        os.replace(partial, path)
+        return path, origin
+
+    def load(self, name):
+        """Fetch and decode one asset into its handle (runs on a worker)"""
+        import pathlib
+        handle = self.image(name)
+        start = time.perf_counter()
+        try:
+            path, origin = self.fetch(name)
+            handle.image = self.loader(pathlib.Path(path).as_uri())
+        except Exception as exc:
+            # Offline and uncached: the sprite stays blank instead of crashing
+            handle.error, origin = exc, "failed"
+        with self.lock:
+            self.sources[name] = origin
+            self.timings[name] = time.perf_counter() - start
+            if len(self.timings) == len(self.handles):
+                self.finished = time.perf_counter()
+        return handle
+
+    def warm(self):
+        """Start loading every requested asset in the background"""
+        if threading is None:
+            for name, handle in self.handles.items():
+                handle.image = self.loader(self.urls[name])
+            return
+        from concurrent.futures import ThreadPoolExecutor
+        self.started = time.perf_counter()
+        self.finished = None
+        self.pool = ThreadPoolExecutor(max_workers=self.workers)
+        for name in list(self.handles):
+            self.pool.submit(self.load, name)
+        self.pool.shutdown(wait=False)
+
+    def wait(self):
+        """Block until warm() has finished (returns immediately if never started)"""
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+
+    def ready(self):
+        return all(handle.image is not None or handle.error is not None
+                   for handle in self.handles.values())
+
+    def stats(self):
+        """Startup report: where each asset came from and how long loading took"""
+        counts = {"cache": 0, "local": 0, "url": 0, "failed": 0}
+        for origin in self.sources.values():
+            counts[origin] += 1
+        elapsed = None
+        if self.started is not None and self.finished is not None:
+            elapsed = self.finished - self.started
+        return {"sources": counts, "elapsed": elapsed, "per_asset": dict(self.timings)}
+
+# Input bits: held keys, one byte per frame in an InputRecording, and one-off events
+INPUT_UP, INPUT_DOWN, INPUT_LEFT, INPUT_RIGHT = 1, 2, 4, 8
+INPUT_PAUSE, INPUT_RESTART, INPUT_MENU, INPUT_START = 16, 32, 64, 128
+
+def write_varint(out, value):
+    """Append a non-negative int to a bytearray, 7 bits per byte"""
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def read_varint(data, i):
+    """Decode a varint at data[i]; returns (value, next index)"""
+    value = shift = 0
+    while True:
+        byte = data[i]
+        i += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, i
+        shift += 7
+
+# InputRecording class
+class InputRecording:
+    """
+    Per-frame held-key bitmasks of one session, stored as (mask, run
+    length) pairs, and its one-off events as (frame, event) pairs in the
+    order they happened. Several events can land before one frame, and
+    their order matters (pause then restart is not restart then pause).
+    Held keys change rarely, so a minute of play is a few hundred bytes.
+    Binary layout: MAGIC, version byte, zigzag varint seed, varint run
+    count, one mask byte and varint length per run, then varint event
+    count and per event a varint frame delta and an event byte.
+    """
+    MAGIC = b"CAIR"
+    VERSION = 2
 
+    def __init__(self, seed):
+        """
+        Args:
+            seed: seed of the recorded game's RNG
+        """
+        self.seed = seed
+        self.runs = []
+        self.events = []
+        self.frames = 0
+
+    def __len__(self):
+        return self.frames
+
+    def event(self, event):
+        """Note a one-off input for the frame being captured next"""
+        self.events.append((self.frames, event))
+
+    def capture(self, game):
+        """Record the input that game.update() is about to see"""
+        self.append(game.input_mask())
+
+    def append(self, mask, count=1):
+        if self.runs and self.runs[-1][0] == mask:
+            self.runs[-1][1] += count
+        else:
+            self.runs.append([mask, count])
+        self.frames += count
+
+    def inputs(self):
+        """(events, mask) of every frame, in order; events in the order they happened"""
+        events, e = self.events, 0
+        frame = 0
+        for mask, count in self.runs:
+            for _ in range(count):
+                due = []
+                while e < len(events) and events[e][0] == frame:
+                    due.append(events[e][1])
+                    e += 1
+                yield due, mask
+                frame += 1
+
+    def to_bytes(self):
+        out = bytearray(self.MAGIC)
+        out.append(self.VERSION)
+        write_varint(out, self.seed * 2 if self.seed >= 0 else -self.seed * 2 - 1)
+        write_varint(out, len(self.runs))
+        for mask, count in self.runs:
+            out.append(mask)
+            write_varint(out, count)
+        write_varint(out, len(self.events))
+        last = 0
+        for frame, event in self.events:
+            write_varint(out, frame - last)
+            out.append(event)
+            last = frame
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if data[:4] != cls.MAGIC or data[4] != cls.VERSION:
+            raise ValueError("not an input recording (version %d)" % cls.VERSION)
+        seed, i = read_varint(data, 5)
+        recording = cls(seed // 2 if seed % 2 == 0 else -(seed + 1) // 2)
+        n_runs, i = read_varint(data, i)
+        for _ in range(n_runs):
+            mask = data[i]
+            count, i = read_varint(data, i + 1)
+            recording.append(mask, count)
+        n_events, i = read_varint(data, i)
+        frame = 0
+        for _ in range(n_events):
+            delta, i = read_varint(data, i)
+            frame += delta
+            recording.events.append((frame, data[i]))
+            i += 1
+        return recording
+
+    def save(self, path):
+        with open(path, "wb") as out:
+            out.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as source:
+            return cls.from_bytes(source.read())
+
+def plain(column):
+    """Python values of a snapshot column (numpy views are converted)"""
+    return column.tolist() if hasattr(column, "tolist") else column
+
+# Snapshot class
+class Snapshot:
+    """
+    Binary save state of everything Game.update depends on
+    Layout (little-endian): MAGIC, version byte, numbers (a count, an
+    int64/float64 type code for each, then the values), flags, popup
+    text, held keys, RNG state, live and culled counts, the boss and its
+    pending attacks, then each entity kind's count and float64/int64
+    columns. Columns are written and read through views of the buffer,
+    so array-backed games copy each column once. Needs the struct module
+    (not in CodeSkulptor).
+    """
+    MAGIC = b"CASS"
+    VERSION = 2
+    NUMBERS = ("frames", "score", "high_score", "kills", "wave", "speed", "fire_rate",
+               "enemy_speed", "enemy_spawn_rate", "powerup_rate", "powertime",
+               "wave_popup_timer", "rapid_timer", "slow_timer", "shield_timer")
+    FLAGS = ("game_over", "paused", "in_boss_fight", "rapid_active", "slow_active", "shield_active")
+    BOSS_NUMBERS = ("health", "max_health", "speed", "fire_delay", "fire_timer", "pattern_timer", "direction")
+    BOSS_NAMES = ("tank", "shooter", "evader")
+    # Entity columns per kind: "d" float64 or "q" int64
+    COLUMNS = (("bullets", "ddq"), ("enemies", "ddqq"), ("powerups", "ddqq"),
+               ("boss_bullets", "ddddq"))
+    DTYPES = {"d": "<f8", "q": "<i8"}
+
+    def __init__(self, data=None):
+        self.parts = []
+        self.view = memoryview(data) if data is not None else None
+        self.offset = 0
+
+    # Writing
+    def put(self, fmt, *values):
+        self.parts.append(("<" + fmt, values))
+
+    def put_numbers(self, values):
+        """ints and floats, each kept as its own type: count, type codes, values"""
+        codes = "".join("d" if isinstance(value, float) else "q" for value in values)
+        self.put("B%ds%s" % (len(codes), codes), len(codes), codes.encode("ascii"), *values)
+
+    def put_column(self, code, column):
+        self.parts.append(("<%d%s" % (len(column), code), column))
+
+    def to_bytes(self):
+        """Pack every part into one preallocated bytearray"""
+        sizes = [struct.calcsize(fmt) for fmt, _ in self.parts]
+        out = bytearray(sum(sizes))
+        offset = 0
+        for (fmt, values), size in zip(self.parts, sizes):
+            if np is not None and isinstance(values, np.ndarray):
+                np.frombuffer(out, self.DTYPES[fmt[-1]], len(values), offset)[:] = values
+            else:
+                struct.pack_into(fmt, out, offset, *values)
+            offset += size
+        return out
+
+    # Reading
+    def take(self, fmt):
+        fmt = "<" + fmt
+        values = struct.unpack_from(fmt, self.view, self.offset)
+        self.offset += struct.calcsize(fmt)
+        return values
+
+    def take_numbers(self):
+        count, = self.take("B")
+        codes, = self.take("%ds" % count)
+        return self.take(codes.decode("ascii"))
+
+    def take_column(self, code, n):
+        """n values as a view of the buffer (a tuple without numpy)"""
+        if np is not None:
+            column = np.frombuffer(self.view, self.DTYPES[code], n, self.offset)
+            self.offset += 8 * n
+            return column
+        return self.take("%d%s" % (n, code))
+
+    @classmethod
+    def capture(cls, game):
+        """Serialize game; returns a bytearray"""
+        out = cls()
+        out.put("4sB", cls.MAGIC, cls.VERSION)
+        player = game.player
+        out.put_numbers([getattr(game, name) for name in cls.NUMBERS]
+                        + [player.pos.x, player.pos.y, player.hearts])
+        flags = sum(1 << i for i, name in enumerate(cls.FLAGS) if getattr(game, name))
+        text = game.wave_popup_text.encode("utf-8")
+        out.put("BBBH%ds" % len(text), flags, game.state == "playing", game.input_mask(),
+                len(text), text)
+
+        version, words, gauss = game.rng.getstate()
+        out.put("B%dIBd" % len(words), version, *(list(words) + [gauss is not None, gauss or 0.0]))
+
+        lifetimes = game.lifetimes
+        out.put("q", lifetimes.now)
+        for kind in lifetimes.KINDS:
+            counts = lifetimes.culled[kind]
+            out.put("qqqq", lifetimes.live[kind], counts["bounds"], counts["age"], counts["cap"])
+
+        boss = game.boss
+        out.put("b", cls.BOSS_NAMES.index(boss.boss_type) if boss else -1)
+        if boss:
+            out.put("B", boss.entered_screen)
+            out.put_numbers([getattr(boss, name) for name in cls.BOSS_NUMBERS] + [boss.pos.x, boss.pos.y])
+            pending = boss.attacks()
+            out.put("q", len(pending))
+            for event in pending:
+                out.put("qqq", *event)
+
+        columns = game.snapshot_columns()
+        columns["boss_bullets"] = boss.bullet_columns() if boss else ([],) * 5
+        for kind, codes in cls.COLUMNS:
+            out.put("q", len(columns[kind][0]))
+            for code, column in zip(codes, columns[kind]):
+                out.put_column(code, column)
+        return out.to_bytes()
+
+    @classmethod
+    def apply(cls, game, data):
+        """Overwrite game's simulation state with a captured snapshot"""
+        source = cls(data)
+        magic, version = source.take("4sB")
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError("not a game snapshot (version %d)" % cls.VERSION)
+        values = source.take_numbers()
+        numbers = dict(zip(cls.NUMBERS, values))
+        x, y, hearts = values[len(cls.NUMBERS):]
+        flags, playing, mask, length = source.take("BBBH")
+        text, = source.take("%ds" % length)
+
+        game.player = Player()
+        game.player.pos = Vector(x, y)
+        game.player.hearts = hearts
+        game.state = "playing" if playing else "welcome"
+        game.wave_popup_text = text.decode("utf-8")
+        game.move_direction = {"up": bool(mask & INPUT_UP), "down": bool(mask & INPUT_DOWN),
+                               "left": bool(mask & INPUT_LEFT), "right": bool(mask & INPUT_RIGHT)}
+        for i, name in enumerate(cls.FLAGS):
+            setattr(game, name, bool(flags & (1 << i)))
+        for name in cls.NUMBERS[:11]:
+            setattr(game, name, numbers[name])
+        # Recurring events follow from the frame and rates, countdowns from what was left
+        game.arm_schedule()
+        for name in cls.NUMBERS[11:]:
+            setattr(game, name, numbers[name])
+
+        version, = source.take("B")
+        state = source.take("625IBd")
+        game.rng.setstate((version, tuple(state[:625]), state[626] if state[625] else None))
+
+        lifetimes = game.lifetimes
+        lifetimes.now, = source.take("q")
+        for kind in lifetimes.KINDS:
+            live, bounds, age, cap = source.take("qqqq")
+            lifetimes.live[kind] = live
+            lifetimes.culled[kind] = {"bounds": bounds, "age": age, "cap": cap}
+
+        boss_index, = source.take("b")
+        game.boss = None
+        if boss_index >= 0:
+            boss_type = cls.BOSS_NAMES[boss_index]
+            boss = game.boss_class(boss_type, game.boss_images[boss_type], game.wave, game.rng,
+                                   game.difficulty, lifetimes)
+            boss.entered_screen = bool(source.take("B")[0])
+            values = source.take_numbers()
+            for name, value in zip(cls.BOSS_NUMBERS, values):
+                setattr(boss, name, value)
+            boss.pos = Vector(*values[len(cls.BOSS_NUMBERS):])
+            count, = source.take("q")
+            boss.restore_attacks([source.take("qqq") for _ in range(count)])
+            game.boss = boss
+
+        columns = {}
+        for kind, codes in cls.COLUMNS:
+            n, = source.take("q")
+            columns[kind] = [source.take_column(code, n) for code in codes]
+        if game.boss:
+            game.boss.restore_bullets(columns["boss_bullets"])
+        game.restore_columns(columns)
 
 # Game class
 class Game:
@@ -205,8 +1753,55 @@ class Game:
     - Collision handling
     - Rendering pipeline
     """
-    def __init__(self):
-        """Initialize all game systems and load assets"""
+    boss_class = Boss
+    # Pixels added to each radius when checking that a coast() is quiet,
+    # well over the drift between stepped and extrapolated positions
+    CONTACT_SLACK = 1.0
+
+    # Spawn periods and powerup timers live on self.schedule
+    schedule = None
+    enemy_spawn_rate = rescheduling("enemy_spawn_rate", "enemy")
+    powerup_rate = rescheduling("powerup_rate", "powerup")
+    fire_rate = rescheduling("fire_rate", "shoot")
+    rapid_active = rescheduling("rapid_active", "shoot")
+    wave_popup_timer = countdown("popup")
+    rapid_timer = countdown("rapid")
+    slow_timer = countdown("slow")
+    shield_timer = countdown("shield")
+
+    def __init__(self, headless=False, assets=None, seed=None, difficulty=None, lifetimes=None):
+        """
+        Initialize all game systems and load assets
+        Args:
+            headless: skip the GUI backend and image loading entirely,
+                      so the game can be stepped without a canvas
+            assets: AssetManager to load sprites from (a default one
+                    is created when None)
+            seed: seed for the game's RNG (a random one when None);
+                  the same seed and inputs replay the same game
+            difficulty: Difficulty with the balance parameters (the
+                        shipped defaults when None)
+            lifetimes: LifetimeManager with culling rules and caps for
+                       each entity kind (edge culling only when None)
+        """
+        self.headless = headless
+        self.difficulty = difficulty = difficulty or Difficulty()
+        self.assets = assets
+        self.profiler = FrameProfiler()
+        self.recorder = None
+        self.spectator = None
+        self.lifetimes = lifetimes or LifetimeManager()
+        self.events = {}
+
+        # Every spawn and boss decision draws from this RNG.
+        # CodeSkulptor's random module has no Random class.
+        self.seed = seed if seed is not None else random.randrange(1 << 30)
+        if hasattr(random, "Random"):
+            self.rng = random.Random(self.seed)
+        else:
+            random.seed(self.seed)
+            self.rng = random
+
         # Game state tracking
         self.state = "welcome"
         self.game_over = False
@@ -221,39 +1816,45 @@ class Game:
         self.wave_popup_timer = 0
         self.wave_popup_text = ""
 
-        self.powerup_rate, self.powertime = 500, 600
+        self.powerup_rate, self.powertime = difficulty.powerup_rate, difficulty.powertime
         self.powertype = ["Shield", "Rapid Fire", "Slow time"]
         self.rapid_active = self.slow_active = self.shield_active = False
         self.rapid_timer = self.slow_timer = self.shield_timer = 0
 
-        self.enemy_speed, self.enemy_spawn_rate = 1, 100
-
-        # Load images
-        self.background_img = simplegui.load_image("https://i.postimg.cc/sDQ6rvVd/FDE305-EE-FE9-E-4238-8-C89-6-C1-C522-C7-E09.png")
-        self.player_img = simplegui.load_image("https://i.postimg.cc/8zrqTJX8/FEEFEE13-2510-4598-897-F-A63-B40230-C05.png")
-        self.slow_clock_img = simplegui.load_image("https://i.postimg.cc/Y2sXHQ34/clock-e.png")
-        self.shield_img = simplegui.load_image("https://i.postimg.cc/65FVwnMy/SHIELDTRAN.png")
-        self.rapid_img = simplegui.load_image("https://i.postimg.cc/2SpWgm5W/BULLETTRAN.png")
-        
-        self.enemy_images = [
-            simplegui.load_image(url) for url in [
-                "https://i.postimg.cc/PJ7HSyJB/7-DBB1-F73-01-EF-4194-A354-161-C218-C98-A3.png",
-                "https://i.postimg.cc/PJJhb9XW/429-B7-BDA-D325-487-A-BFC4-E6-B979588972.png",
-                "https://i.postimg.cc/qvjLSF4h/1-C4348-EC-C578-4747-B20-D-75-F6-FD192-FDE.png",
-                "https://i.postimg.cc/5NJyryXk/C75-FC200-F2-D3-4158-9759-2-CC825-E710-E9.png"
-            ]
-        ]
+        self.enemy_speed, self.enemy_spawn_rate = difficulty.enemy_speed, difficulty.enemy_spawn_rate
 
         self.start_button_pos = (WIDTH // 2 - 100, HEIGHT // 2 + 20)
         self.start_button_size = (200, 50)
         
         self.boss = None
         self.in_boss_fight = False
-        self.boss_images = {
-            "tank": simplegui.load_image("https://i.postimg.cc/FKMN04Jb/image.png"),
-            "shooter": simplegui.load_image("https://i.postimg.cc/mrHGL56P/image.png"),
-            "evader": simplegui.load_image("https://i.postimg.cc/7L6fKw6p/image.png")
-        }
+
+        self.schedule = Scheduler()
+        self.arm_schedule()
+
+        if headless:
+            self.background_img = self.player_img = None
+            self.slow_clock_img = self.shield_img = self.rapid_img = None
+            # Keep one slot per sprite so rng.choice draws stay identical
+            self.enemy_images = [None] * 4
+            self.boss_images = {"tank": None, "shooter": None, "evader": None}
+        else:
+            if self.assets is None:
+                self.assets = AssetManager()
+            self.load_images()
+
+    def load_images(self):
+        """Request every sprite from the asset manager and start warming them"""
+        assets = self.assets
+        self.background_img = assets.image("background")
+        self.player_img = assets.image("player")
+        self.slow_clock_img = assets.image("slow_clock")
+        self.shield_img = assets.image("shield")
+        self.rapid_img = assets.image("rapid")
+        self.enemy_images = [assets.image("enemy_%d" % i) for i in range(4)]
+        self.boss_images = {boss_type: assets.image("boss_" + boss_type)
+                            for boss_type in ("tank", "shooter", "evader")}
+        assets.warm()
 
     def start_game(self):
         """Transition from menu to gameplay state"""
@@ -264,7 +1865,7 @@ class Game:
         """Reset all game systems for a new game"""
         self.bullets, self.enemies, self.powerups = [], [], []
         self.score = self.kills = self.wave = self.frames = 0
-        self.speed, self.fire_rate, self.enemy_speed = 5, 12, 1
+        self.speed, self.fire_rate, self.enemy_speed = 5, 12, self.difficulty.enemy_speed
         self.player = Player()
         self.game_over = False
         self.paused = False
@@ -272,24 +1873,101 @@ class Game:
         self.rapid_timer = self.slow_timer = self.shield_timer = 0
         self.wave_popup_timer = 0
         self.move_direction = {"up": False, "down": False, "left": False, "right": False} 
+        self.arm_schedule()
+
+    def arm_schedule(self):
+        """Cancel every pending event and schedule the recurring ones afresh"""
+        self.schedule.reset(self.frames)
+        self.events = {}
+        for name in RECURRING:
+            self.repeat(name)
+
+    def repeat(self, name):
+        """(Re)schedule a recurring event on the next frame its period divides"""
+        if self.schedule is None:
+            return
+        if name == "enemy":
+            period = self._enemy_spawn_rate
+        elif name == "powerup":
+            period = self._powerup_rate
+        else:
+            period = 4 if self._rapid_active else self._fire_rate
+        phase = RECURRING[name]
+        self.schedule.cancel(self.events.get(name))
+        self.events[name] = self.schedule.at(self.schedule.next_multiple(period, phase),
+                                             phase, self.recur, name)
+
+    def recur(self, name):
+        """Recurring event: spawn an enemy or powerup, or shoot"""
+        if name == "enemy":
+            if not self.in_boss_fight:
+                self.spawn_enemy()
+        elif name == "powerup":
+            self.spawn_powerup()
+        else:
+            self.shoot()
+        self.repeat(name)
+
+    def set_countdown(self, name, frames):
+        """Schedule the popup or a powerup to end frames from now (0 cancels)"""
+        if self.schedule is None:
+            return
+        self.schedule.cancel(self.events.get(name))
+        self.events[name] = None
+        if frames > 0:
+            self.events[name] = self.schedule.at(self.frames + frames, COUNTDOWNS[name],
+                                                 self.expire, name)
+
+    def expire(self, name):
+        """Countdown event: hide the popup or end a powerup"""
+        self.events[name] = None
+        if name != "popup":
+            setattr(self, name + "_active", False)
+
+    def fall_speed(self):
+        """Enemy fall in pixels per frame, halved while slow time is active"""
+        return self.enemy_speed * 0.5 if self.slow_active else self.enemy_speed
 
     def shoot(self):
         """Fire a new player projectile"""
         bullet_x = self.player.pos.x
         bullet_y = self.player.pos.y - self.player.size.y / 2
-        self.bullets.append(Vector(bullet_x, bullet_y))
+        bullet = VECTOR_POOL.acquire(bullet_x, bullet_y)
+        self.bullets.append(bullet)
+        self.lifetimes.spawned("bullets", bullet)
 
     def spawn_enemy(self):
         """Create a new enemy at random top position"""
-        img = random.choice(self.enemy_images)
-        self.enemies.append((Vector(random.randint(0, WIDTH), 0), img))
+        img = self.rng.choice(self.enemy_images)
+        enemy = (Vector(self.rng.randint(0, WIDTH), 0), img)
+        self.enemies.append(enemy)
+        self.lifetimes.spawned("enemies", enemy)
 
     def spawn_powerup(self):
         """Create a random power-up at random position"""
-        pos = Vector(random.randint(50, WIDTH - 50), random.randint(50, HEIGHT - 50))
-        self.powerups.append({"type": random.choice(self.powertype), "pos": pos})
+        pos = Vector(self.rng.randint(50, WIDTH - 50), self.rng.randint(50, HEIGHT - 50))
+        power = {"type": self.rng.choice(self.powertype), "pos": pos}
+        self.powerups.append(power)
+        self.lifetimes.spawned("powerups", power)
 
-    def update(self):
+    def update(self, stride=1):
+        """
+        Advance the game by stride frames, exactly as stride calls to
+        tick() would. Stretches where quiet_frames() shows no collision
+        test could pass are coasted through without running the tests.
+        Args:
+            stride: frames to advance
+        """
+        while stride > 0:
+            frames = self.quiet_frames(stride) if stride > 1 else 0
+            if frames:
+                self.coast(frames)
+            else:
+                frames = 1
+                self.tick()
+            stride -= frames
+
+    def tick(self):
         """
         Main game update loop called every frame:
         1. Handle game state
@@ -303,228 +1981,1417 @@ class Game:
             return
 
         # Handle wave popup timer (no longer pauses the game)
-        if self.wave_popup_timer > 0:
-            self.wave_popup_timer -= 1
+        self.schedule.run(self.frames + 1, PHASE_POPUP)
 
         # Don't return early if paused - we want the wave popup to show during "paused" state
         if self.paused and self.wave_popup_timer <= 0:
             return
 
         self.frames += 1
+        self.lifetimes.now = self.frames
+        lap = self.profiler.lap
+        lap("update:state")
         
         # Boss logic
         if self.in_boss_fight and self.boss:
-            self.boss.update()
-            for bullet in self.bullets[:]:
-                if Interaction.check_collision(bullet, self.boss.pos, 80):
-                    self.bullets.remove(bullet)
-                    self.boss.health -= 1
-                    
-
-                    if self.boss.health <= 0:
-                        self.boss = None
-                        self.in_boss_fight = False
-                        self.enemy_speed *= 1.1
-                        break
-            if self.boss:
-                for bullet in self.boss.bullets[:]:
-                    if Interaction.check_collision(bullet["pos"], self.player.pos, 30):
-                        if not self.shield_active:
-                            self.player.hearts -= 1
-                        self.boss.bullets.remove(bullet)
-                        if self.player.hearts <= 0:
-                            self.game_over = True
-                            break
-        if self.rapid_active: self.rapid_timer -= 1; self.rapid_active &= self.rapid_timer > 0
-        if self.slow_active: self.slow_timer -= 1; self.slow_active &= self.slow_timer > 0
-        if self.shield_active: self.shield_timer -= 1; self.shield_active &= self.shield_timer > 0
+            self.update_boss()
+            lap("update:boss")
+        self.schedule.run(self.frames, PHASE_TIMERS)
 
         self.player.move(self.move_direction, self.speed)
-
-        for bullet in self.bullets[:]:
-            bullet.y -= 7
-            if bullet.y < 0:
-                self.bullets.remove(bullet)
+        if self.in_boss_fight and self.boss:
+            self.collide_player_step()
+        lap("update:player_move")
+        self.advance_bullets()
+        if self.in_boss_fight and self.boss:
+            self.collide_bullet_step()
+        lap("update:bullet_advance")
 
         # Enemy logic
-        current_enemy_speed = self.enemy_speed * 0.5 if self.slow_active else self.enemy_speed
-        for enemy in self.enemies[:]:
-            pos, _ = enemy
-            pos.y += current_enemy_speed
-            if pos.y > HEIGHT:
-                self.enemies.remove(enemy)
-
-        for enemy in self.enemies[:]:
-            pos, _ = enemy
-            for bullet in self.bullets[:]:
-                if Interaction.check_collision(pos, bullet, 30):
-                    self.enemies.remove(enemy)
-                    self.bullets.remove(bullet)
-                    self.score += 1
-                    self.kills += 1
-
-                    if self.kills % 10 == 0:
-                        self.wave += 1
-                        self.wave_popup_text = f"WAVE {self.wave}"
-                        self.wave_popup_timer = 60
-
-                        if self.wave % 5 == 0:
-                            self.in_boss_fight = True
-                            boss_type = random.choice(["tank", "shooter", "evader"])
-                            self.boss = Boss(boss_type, self.boss_images[boss_type], self.wave)
-
-                            
-                        else:
-                            self.enemy_speed *= 1.1
-
-                    if self.score > self.high_score:
-                        self.high_score = self.score
-                    break
+        fall = self.fall_speed()
+        self.advance_enemies(fall)
+        lap("update:enemy_advance")
 
-
-        for enemy in self.enemies[:]:
-            pos, _ = enemy
-            if Interaction.check_collision(pos, self.player.pos, 50):
-                if not self.shield_active:
-                    self.player.hearts -= 1
-                self.enemies.remove(enemy)
-                if self.player.hearts <= 0:
-                    self.game_over = True
-                    break
+        self.collide_bullets_enemies(fall)
+        self.collide_enemies_player(fall)
+        lap("update:collisions")
         
         # Powerup logic
-        for power in self.powerups[:]:
-            if Interaction.check_collision(self.player.pos, power["pos"], 30):
+        self.collect_powerups()
+        self.cull_powerups()
+        lap("update:powerups")
+
+        # Enemy and powerup spawns, then shooting
+        self.schedule.run(self.frames, PHASE_SHOOT)
+        lap("update:spawn")
+
+    def quiet_frames(self, limit):
+        """
+        Frames, up to limit, that coast() can cover: no event comes due,
+        no boss is out, the screen edge does not stop the player and no
+        collision test could pass
+        Args:
+            limit: most frames wanted
+        """
+        if self.game_over or self.state != "playing" or self.paused:
+            return 0
+        if self.in_boss_fight or self.boss:
+            return 0
+        due = self.schedule.next_frame()
+        if due is not None:
+            limit = min(limit, due - 1 - self.frames)
+        # The player's velocity, as Player.move applies it; an axis held
+        # against the edge stays put, any other stops short of it
+        direction, speed = self.move_direction, self.speed
+        velocity = []
+        for p, d, edge in ((self.player.pos.x, (direction["right"] - direction["left"]) * speed, WIDTH),
+                           (self.player.pos.y, (direction["down"] - direction["up"]) * speed, HEIGHT)):
+            if d > 0 and p >= edge or d < 0 and p <= 0:
+                d = 0
+            elif d > 0:
+                limit = min(limit, int((edge - p) // d))
+            elif d < 0:
+                limit = min(limit, int(p // -d))
+            velocity.append(d)
+        if limit < 1:
+            return 0
+        return self.contact_frames(velocity[0], velocity[1], limit)
+
+    def contact_frames(self, vx, vy, limit):
+        """
+        Whole frames, up to limit, before a player bullet could come
+        within reach of an enemy, or the player within reach of an enemy
+        or a powerup, with everything holding its course
+        Args:
+            vx, vy: the player's velocity in pixels per frame
+            limit: most frames wanted
+        """
+        contact, slack = Interaction.contact_time, self.CONTACT_SLACK
+        player = self.player.pos
+        fall = self.fall_speed()
+        soonest = limit
+        enemies = [pos for pos, _ in self.enemies]
+        if enemies:
+            grid = SpatialGrid(enemies)
+            # Enemies close on each bullet from above at 7 + fall a frame
+            closing = 7 + fall
+            half = closing * limit / 2
+            for bullet in self.bullets:
+                for e in grid.query(bullet.x, bullet.y - half, half + 30 + slack):
+                    pos = enemies[e]
+                    soonest = min(soonest, contact(pos.x - bullet.x, pos.y - bullet.y,
+                                                   0, closing, 30 + slack))
+            for e in grid.query(player.x, player.y, 50 + slack + (abs(vx) + abs(vy) + fall) * limit):
+                pos = enemies[e]
+                soonest = min(soonest, contact(pos.x - player.x, pos.y - player.y,
+                                               -vx, fall - vy, 50 + slack))
+        if self.powerups:
+            grid = SpatialGrid([power["pos"] for power in self.powerups])
+            for i in grid.query(player.x, player.y, 30 + slack + (abs(vx) + abs(vy)) * limit):
+                pos = self.powerups[i]["pos"]
+                soonest = min(soonest, contact(pos.x - player.x, pos.y - player.y, -vx, -vy, 30 + slack))
+        return int(soonest)
+
+    def coast(self, frames):
+        """
+        Run frames quiet frames (see quiet_frames): the moves and culls
+        of tick(), without collision tests that could not pass
+        Args:
+            frames: number of frames to run
+        """
+        fall = self.fall_speed()
+        for _ in range(frames):
+            self.frames += 1
+            self.lifetimes.now = self.frames
+            self.player.move(self.move_direction, self.speed)
+            self.advance_bullets()
+            self.advance_enemies(fall)
+            self.cull_powerups()
+        self.schedule.frame, self.schedule.phase = self.frames, Scheduler.LAST
+        self.profiler.lap("update:coast")
+
+    def update_boss(self):
+        """Run the boss and resolve hits in both directions"""
+        self.boss.update(self.bullets, self.player.pos.to_tuple())
+        self.collide_bullets_boss()
+        if self.boss:
+            self.collide_boss_bullets_player()
+
+    def advance_bullets(self):
+        """Move player bullets up and cull those past the top edge"""
+        for bullet in self.bullets:
+            bullet.y -= 7
+        self.bullets = self.lifetimes.cull("bullets", self.bullets)
+
+    def advance_enemies(self, speed):
+        """Move enemies down and cull those past the bottom edge"""
+        for pos, _ in self.enemies:
+            pos.y += speed
+        self.enemies = self.lifetimes.cull("enemies", self.enemies)
+
+    def cull_powerups(self):
+        """Expire powerups by age or cap (they never move off screen)"""
+        self.powerups = self.lifetimes.cull("powerups", self.powerups)
+
+    def register_kill(self):
+        """Count an enemy kill and advance waves / start boss fights"""
+        self.score += 1
+        self.kills += 1
+
+        difficulty = self.difficulty
+        if self.kills % difficulty.kills_per_wave == 0:
+            self.wave += 1
+            self.wave_popup_text = f"WAVE {self.wave}"
+            self.wave_popup_timer = 60
+
+            if self.wave % difficulty.boss_every == 0:
+                self.in_boss_fight = True
+                boss_type = self.rng.choice(["tank", "shooter", "evader"])
+                self.boss = self.boss_class(boss_type, self.boss_images[boss_type], self.wave,
+                                            self.rng, difficulty, self.lifetimes)
+            else:
+                self.enemy_speed *= difficulty.enemy_speed_growth
+
+        if self.score > self.high_score:
+            self.high_score = self.score
+
+    def damage_player(self):
+        """Apply one hit to the player; returns True once the game is over"""
+        if not self.shield_active:
+            self.player.hearts -= 1
+        if self.player.hearts <= 0:
+            self.game_over = True
+        return self.game_over
+
+    def collide_bullets_boss(self):
+        """Player bullets the boss touched during its step"""
+        boss = self.boss
+        dx, dy = boss.step
+        bullets = self.bullets
+        grid = SpatialGrid(bullets)
+        self.damage_boss([i for i in grid.query(boss.pos.x, boss.pos.y, 80 + abs(dx) + abs(dy))
+                          if Interaction.swept_xy(boss.pos.x, boss.pos.y, dx, dy,
+                                                  bullets[i].x, bullets[i].y, 80)])
+
+    def collide_bullet_step(self):
+        """
+        Player bullets whose climb this update carried them clean through
+        the boss (those that stopped inside it are hit by the boss's next
+        step, as before)
+        """
+        x, y = self.boss.pos.x, self.boss.pos.y
+        climb = 7
+        self.damage_boss([i for i, bullet in enumerate(self.bullets)
+                          if bullet.y < y < bullet.y + climb + 80
+                          and Interaction.passes_xy(bullet.x, bullet.y, 0, -climb, x, y, 80)
+                          and not Interaction.check_collision_xy(bullet.x, bullet.y, x, y, 80)])
+
+    def damage_boss(self, hits):
+        """Take hits (bullet indices, in firing order) off the boss until it dies"""
+        boss = self.boss
+        hit = set()
+        for i in hits:
+            hit.add(i)
+            VECTOR_POOL.release(self.bullets[i])
+            boss.health -= 1
+            if boss.health <= 0:
+                self.boss = None
+                self.in_boss_fight = False
+                self.enemy_speed *= self.difficulty.enemy_speed_growth
+                break
+        if hit:
+            self.bullets = [b for i, b in enumerate(self.bullets) if i not in hit]
+
+    def collide_boss_bullets_player(self):
+        """Boss projectiles that touched the player during their step"""
+        boss = self.boss
+        bullets = boss.bullets
+        player = self.player.pos
+        grid = SpatialGrid([b["pos"] for b in bullets])
+        hits = []
+        for i in grid.query(player.x, player.y, 30 + boss.reach):
+            pos, vel = bullets[i]["pos"], bullets[i]["vel"]
+            if Interaction.swept_xy(pos.x, pos.y, vel.x, vel.y, player.x, player.y, 30):
+                hits.append(i)
+        self.hit_by_boss_bullets(hits)
+
+    def collide_player_step(self):
+        """
+        Boss projectiles the player's move carried it clean through (one
+        it stopped inside hits on the projectile's next step, as before)
+        """
+        dx, dy = self.player.step
+        if not (dx or dy):
+            return
+        player = self.player.pos
+        reach = 30 + abs(dx) + abs(dy)
+        hits = []
+        for i, bullet in enumerate(self.boss.bullets):
+            pos = bullet["pos"]
+            if (abs(pos.x - player.x) < reach and abs(pos.y - player.y) < reach
+                    and Interaction.passes_xy(player.x, player.y, dx, dy, pos.x, pos.y, 30)
+                    and not Interaction.check_collision_xy(player.x, player.y, pos.x, pos.y, 30)):
+                hits.append(i)
+        self.hit_by_boss_bullets(hits)
+
+    def hit_by_boss_bullets(self, hits):
+        """Remove boss projectiles (indices, in firing order) hitting the player, until it dies"""
+        bullets = self.boss.bullets
+        hit = set()
+        for i in hits:
+            hit.add(i)
+            VECTOR_POOL.release(bullets[i]["pos"])
+            VECTOR_POOL.release(bullets[i]["vel"])
+            if self.damage_player():
+                break
+        if hit:
+            self.boss.bullets = [b for i, b in enumerate(bullets) if i not in hit]
+
+    def collide_bullets_enemies(self, fall):
+        """
+        Each enemy, in spawn order, is destroyed by the earliest-fired
+        bullet still alive that came within 30px over the update
+        Args:
+            fall: how far enemies fell this update
+        """
+        if not self.enemies or not self.bullets:
+            return
+        grid = SpatialGrid(self.bullets)
+        bullets = self.bullets
+        climb = 7
+        reach = 30 + climb + fall
+        used = set()
+        killed = set()
+        for e, (pos, _) in enumerate(self.enemies):
+            for i in grid.query(pos.x, pos.y, reach):
+                if i in used:
+                    continue
+                bullet = bullets[i]
+                if Interaction.swept_pair_xy(bullet.x, bullet.y, 0, -climb, pos.x, pos.y, 0, fall, 30):
+                    used.add(i)
+                    VECTOR_POOL.release(bullet)
+                    killed.add(e)
+                    self.register_kill()
+                    break
+        if killed:
+            self.enemies = [en for e, en in enumerate(self.enemies) if e not in killed]
+            self.bullets = [b for i, b in enumerate(bullets) if i not in used]
+
+    def collide_enemies_player(self, fall):
+        """
+        Enemies ramming the player are destroyed and cost a heart
+        Args:
+            fall: how far enemies fell this update
+        """
+        player = self.player.pos
+        dx, dy = self.player.step
+        grid = SpatialGrid([pos for pos, _ in self.enemies])
+        hit = set()
+        for e in grid.query(player.x, player.y, 50 + abs(dx) + abs(dy) + fall):
+            pos = self.enemies[e][0]
+            if Interaction.swept_pair_xy(player.x, player.y, dx, dy, pos.x, pos.y, 0, fall, 50):
+                hit.add(e)
+                if self.damage_player():
+                    break
+        if hit:
+            self.enemies = [en for e, en in enumerate(self.enemies) if e not in hit]
+
+    def collect_powerups(self):
+        """Activate and remove every powerup the player touched during its move"""
+        player = self.player.pos
+        dx, dy = self.player.step
+        grid = SpatialGrid([power["pos"] for power in self.powerups])
+        taken = set()
+        for i in grid.query(player.x, player.y, 30 + abs(dx) + abs(dy)):
+            power = self.powerups[i]
+            if Interaction.swept_xy(player.x, player.y, dx, dy, power["pos"].x, power["pos"].y, 30):
                 if power["type"] == "Shield":
                     self.shield_active, self.shield_timer = True, self.powertime
                 elif power["type"] == "Rapid Fire":
                     self.rapid_active, self.rapid_timer = True, self.powertime
                 elif power["type"] == "Slow time":
                     self.slow_active, self.slow_timer = True, self.powertime
-                self.powerups.remove(power)
+                taken.add(i)
+        if taken:
+            self.powerups = [p for i, p in enumerate(self.powerups) if i not in taken]
+
+    def lifetime_stats(self):
+        """Live and culled entity counters from the lifetime manager"""
+        return self.lifetimes.stats()
+
+    def entity_counts(self):
+        """Live entities per kind, for profiling and stats"""
+        return {"bullets": len(self.bullets), "enemies": len(self.enemies),
+                "powerups": len(self.powerups),
+                "boss_bullets": self.boss.bullet_count() if self.boss else 0}
+
+    def bullet_positions(self):
+        """(x, y) of every player bullet"""
+        return [bullet.to_tuple() for bullet in self.bullets]
+
+    def enemy_sprites(self):
+        """((x, y), image) of every enemy"""
+        return [(pos.to_tuple(), img) for pos, img in self.enemies]
+
+    def input_mask(self):
+        """Held movement keys as INPUT_* bits"""
+        move = self.move_direction
+        return ((move["up"] and INPUT_UP) | (move["down"] and INPUT_DOWN)
+                | (move["left"] and INPUT_LEFT) | (move["right"] and INPUT_RIGHT))
+
+    def input_event(self, event):
+        """
+        Apply a one-off input and log it to the recorder, if any
+        Args:
+            event: INPUT_PAUSE, INPUT_RESTART, INPUT_MENU or INPUT_START
+        """
+        if event == INPUT_START:
+            self.start_game()
+        elif event == INPUT_RESTART:
+            self.restart()
+        elif event == INPUT_MENU:
+            self.restart()
+            self.state = "welcome"
+        elif event == INPUT_PAUSE:
+            self.paused = not self.paused
+        if self.recorder is not None:
+            self.recorder.event(event)
+
+    def apply_input(self, mask, events=()):
+        """
+        Replay one recorded frame of input: its events in the order they
+        happened, then held keys
+        """
+        for event in events:
+            self.input_event(event)
+        self.move_direction = {"up": bool(mask & INPUT_UP), "down": bool(mask & INPUT_DOWN),
+                               "left": bool(mask & INPUT_LEFT), "right": bool(mask & INPUT_RIGHT)}
 
-        if not self.in_boss_fight:
-            if self.frames % self.enemy_spawn_rate == 0:
-                self.spawn_enemy()
-        if self.frames % self.powerup_rate == 0:
-            self.spawn_powerup()
-        if self.frames % (4 if self.rapid_active else self.fire_rate) == 0:
-            self.shoot()
+    def replay(self, recording):
+        """
+        Feed a recording back in at full speed (start from a fresh game
+        created with recording.seed for a bit-identical run)
+        Args:
+            recording: InputRecording captured from a live session
+        """
+        for events, mask in recording.inputs():
+            self.apply_input(mask, events)
+            self.profiler.begin_frame()
+            self.update()
+            self.profiler.end_frame(self)
+
+    def step(self, n_frames=1, inputs=None, stride=1):
+        """
+        Advance the simulation headlessly, as fast as the CPU allows
+        Args:
+            n_frames: number of update ticks to run
+            inputs: optional move_direction dict applied before stepping,
+                    or a sequence of such dicts consumed one per frame
+            stride: frames each update advances (see update)
+        """
+        if isinstance(inputs, dict):
+            self.move_direction.update(inputs)
+            inputs = None
+        for i in range(n_frames):
+            if inputs is not None and i < len(inputs):
+                self.move_direction.update(inputs[i])
+            self.profiler.begin_frame()
+            self.update(stride)
+            self.profiler.end_frame(self)
+
+    def snapshot(self):
+        """Binary snapshot of the simulation state (see Snapshot)"""
+        return Snapshot.capture(self)
+
+    def restore(self, data):
+        """
+        Return to a snapshot() taken from a game of the same class
+        Args:
+            data: bytes-like snapshot; it is read in place, not copied
+        """
+        Snapshot.apply(self, data)
+
+    def snapshot_columns(self):
+        """{kind: column lists} of the player bullets, enemies and powerups"""
+        birth = self.lifetimes.birth
+        bullets, enemies, powerups = self.bullets, self.enemies, self.powerups
+        images = self.enemy_images
+        return {
+            "bullets": ([b.x for b in bullets], [b.y for b in bullets],
+                        [birth("bullets", b) for b in bullets]),
+            "enemies": ([pos.x for pos, _ in enemies], [pos.y for pos, _ in enemies],
+                        [images.index(img) if img in images else 0 for _, img in enemies],
+                        [birth("enemies", e) for e in enemies]),
+            "powerups": ([p["pos"].x for p in powerups], [p["pos"].y for p in powerups],
+                         [self.powertype.index(p["type"]) for p in powerups],
+                         [birth("powerups", p) for p in powerups]),
+        }
+
+    def restore_columns(self, columns):
+        """Rebuild the entity lists from snapshot_columns() output"""
+        lifetimes = self.lifetimes
+        for kind in ("bullets", "enemies", "powerups"):
+            lifetimes.born[kind] = {}
+        self.bullets = []
+        for x, y, born in zip(*[plain(c) for c in columns["bullets"]]):
+            bullet = VECTOR_POOL.acquire(x, y)
+            self.bullets.append(bullet)
+            lifetimes.spawned("bullets", bullet, born)
+        self.enemies = []
+        for x, y, tag, born in zip(*[plain(c) for c in columns["enemies"]]):
+            enemy = (Vector(x, y), self.enemy_images[tag])
+            self.enemies.append(enemy)
+            lifetimes.spawned("enemies", enemy, born)
+        self.powerups = []
+        for x, y, tag, born in zip(*[plain(c) for c in columns["powerups"]]):
+            power = {"type": self.powertype[tag], "pos": Vector(x, y)}
+            self.powerups.append(power)
+            lifetimes.spawned("powerups", power, born)
+
+    def idle(self):
+        """
+        True when the next update would only advance the frame count:
+        nothing on screen moves, no key is held and no powerup is under
+        the player, so only scheduled events can change the game
+        """
+        if self.game_over or self.state != "playing" or self.paused:
+            return False
+        if self.bullets or self.enemies or (self.in_boss_fight and self.boss):
+            return False
+        if any(self.move_direction.values()):
+            return False
+        player = self.player.pos
+        return not any(Interaction.check_collision_xy(player.x, player.y, power["pos"].x,
+                                                      power["pos"].y, 30)
+                       for power in self.powerups)
+
+    def skip_idle(self, limit):
+        """
+        Jump an idle game straight to the frame before its next event
+        Args:
+            limit: most frames to skip
+        Returns the number of frames skipped
+        """
+        due = self.schedule.next_frame()
+        if due is None or not self.idle():
+            return 0
+        skipped = max(0, min(due - 1 - self.frames, limit))
+        self.frames += skipped
+        self.schedule.frame, self.schedule.phase = self.frames, Scheduler.LAST
+        return skipped
+
+    def fast_forward(self, n_frames, stride=1):
+        """
+        Advance n_frames headlessly like step(), jumping over idle stretches
+        Args:
+            n_frames: number of frames to cover
+            stride: most frames each update advances (see update)
+        """
+        left = n_frames
+        while left > 0:
+            left -= self.skip_idle(left)
+            if left > 0:
+                frames = min(stride, left)
+                self.step(1, stride=frames)
+                left -= frames
 
-# Game instance
-GAME = Game()
 
-def draw(canvas):
-    GAME.update()
+# ArrayBoss class
+class ArrayBoss(Boss):
+    """
+    Boss whose projectiles live in an EntityArrays store, so bursts
+    move, cull and collide as whole arrays
+    """
+    @property
+    def bullets(self):
+        """Projectiles as {"pos", "vel"} dicts (a fresh copy, for drawing)"""
+        s = self.bullet_store
+        n = s.n
+        return [{"pos": Vector(x, y), "vel": Vector(vx, vy)}
+                for x, y, vx, vy in zip(s.x[:n].tolist(), s.y[:n].tolist(),
+                                        s.vx[:n].tolist(), s.vy[:n].tolist())]
+
+    @bullets.setter
+    def bullets(self, bullets):
+        self.bullet_store = EntityArrays()
+        for bullet in bullets:
+            self.fire(bullet["pos"].x, bullet["pos"].y, bullet["vel"].x, bullet["vel"].y)
+
+    def bullet_count(self):
+        return self.bullet_store.n
+
+    def bullet_positions(self, back=0.0):
+        s = self.bullet_store
+        n = s.n
+        if back:
+            return list(zip((s.x[:n] - s.vx[:n] * back).tolist(), (s.y[:n] - s.vy[:n] * back).tolist()))
+        return list(zip(s.x[:n].tolist(), s.y[:n].tolist()))
+
+    def dodge(self, player_bullets):
+        """Sidestep when any bullet in the player's store is lined up"""
+        n = player_bullets.n
+        lined_up = (np.abs(player_bullets.y[:n] - self.pos.y) < 150) & (np.abs(player_bullets.x[:n] - self.pos.x) < 60)
+        if lined_up.any():
+            self.pos.x += self.rng.choice([-20, 20])
+            self.step = (0, 0)
+
+    def fire(self, x, y, dx, dy):
+        self.bullet_store.spawn(x, y, dx, dy, born=self.lifetimes.now)
+
+    def bullet_columns(self):
+        s = self.bullet_store
+        return s.x[:s.n], s.y[:s.n], s.vx[:s.n], s.vy[:s.n], s.born[:s.n]
+
+    def restore_bullets(self, columns):
+        self.bullet_store = EntityArrays.from_columns(*columns)
+
+    def fire_pattern(self, pattern, burst=0):
+        x, y = self.pos.x + pattern.offset[0], self.pos.y + pattern.offset[1]
+        vx, vy = pattern.columns(burst, x, y, self.target)
+        count = len(vx)
+        self.bullet_store.spawn_many(np.full(count, float(x)), np.full(count, float(y)), vx, vy,
+                                     born=self.lifetimes.now)
+
+    def advance_bullets(self):
+        self.bullet_store.advance()
+        self.lifetimes.cull_store("boss_bullets", self.bullet_store)
+
+# ArrayGame class
+class ArrayGame(Game):
+    """
+    Game with bullets, enemies and powerups held in EntityArrays stores
+    Movement, culling and broad-phase collision run as numpy operations;
+    hits are confirmed and applied in the same order as Game, so both
+    classes produce identical games. The bullets/enemies/powerups
+    attributes remain readable as lists for the draw handler.
+    """
+    boss_class = ArrayBoss
+
+    def __init__(self, headless=False, assets=None, seed=None, difficulty=None, lifetimes=None):
+        if np is None:
+            raise ImportError("ArrayGame requires numpy")
+        Game.__init__(self, headless, assets, seed, difficulty, lifetimes)
+
+    @property
+    def bullets(self):
+        s = self.bullet_store
+        return [Vector(x, y) for x, y in zip(s.x[:s.n].tolist(), s.y[:s.n].tolist())]
+
+    @bullets.setter
+    def bullets(self, bullets):
+        self.bullet_store = EntityArrays(256)
+        for bullet in bullets:
+            self.bullet_store.spawn(bullet.x, bullet.y, 0, -7)
+
+    @property
+    def enemies(self):
+        s = self.enemy_store
+        return [(Vector(x, y), self.enemy_images[tag])
+                for x, y, tag in zip(s.x[:s.n].tolist(), s.y[:s.n].tolist(), s.tag[:s.n].tolist())]
+
+    @enemies.setter
+    def enemies(self, enemies):
+        self.enemy_store = EntityArrays(256)
+        for pos, img in enemies:
+            tag = self.enemy_images.index(img) if img in self.enemy_images else 0
+            self.enemy_store.spawn(pos.x, pos.y, tag=tag)
+
+    @property
+    def powerups(self):
+        s = self.powerup_store
+        return [{"type": self.powertype[tag], "pos": Vector(x, y)}
+                for x, y, tag in zip(s.x[:s.n].tolist(), s.y[:s.n].tolist(), s.tag[:s.n].tolist())]
+
+    @powerups.setter
+    def powerups(self, powerups):
+        self.powerup_store = EntityArrays(16)
+        for power in powerups:
+            self.powerup_store.spawn(power["pos"].x, power["pos"].y, tag=self.powertype.index(power["type"]))
+
+    def bullet_positions(self):
+        s = self.bullet_store
+        return list(zip(s.x[:s.n].tolist(), s.y[:s.n].tolist()))
+
+    def entity_counts(self):
+        return {"bullets": self.bullet_store.n, "enemies": self.enemy_store.n,
+                "powerups": self.powerup_store.n,
+                "boss_bullets": self.boss.bullet_count() if self.boss else 0}
+
+    def snapshot_columns(self):
+        b, e, p = self.bullet_store, self.enemy_store, self.powerup_store
+        return {"bullets": (b.x[:b.n], b.y[:b.n], b.born[:b.n]),
+                "enemies": (e.x[:e.n], e.y[:e.n], e.tag[:e.n], e.born[:e.n]),
+                "powerups": (p.x[:p.n], p.y[:p.n], p.tag[:p.n], p.born[:p.n])}
+
+    def restore_columns(self, columns):
+        x, y, born = columns["bullets"]
+        self.bullet_store = EntityArrays.from_columns(x, y, 0, -7, born=born)
+        x, y, tag, born = columns["enemies"]
+        self.enemy_store = EntityArrays.from_columns(x, y, tag=tag, born=born)
+        x, y, tag, born = columns["powerups"]
+        self.powerup_store = EntityArrays.from_columns(x, y, tag=tag, born=born)
+
+    def enemy_sprites(self):
+        s = self.enemy_store
+        images = self.enemy_images
+        return [((x, y), images[tag])
+                for x, y, tag in zip(s.x[:s.n].tolist(), s.y[:s.n].tolist(), s.tag[:s.n].tolist())]
+
+    def shoot(self):
+        self.bullet_store.spawn(self.player.pos.x, self.player.pos.y - self.player.size.y / 2, 0, -7,
+                                born=self.lifetimes.now)
+
+    def spawn_enemy(self):
+        # Same draws from random as Game.spawn_enemy, keeping the sprite index
+        tag = self.rng.choice(range(len(self.enemy_images)))
+        self.enemy_store.spawn(self.rng.randint(0, WIDTH), 0, tag=tag, born=self.lifetimes.now)
+
+    def spawn_powerup(self):
+        x, y = self.rng.randint(50, WIDTH - 50), self.rng.randint(50, HEIGHT - 50)
+        tag = self.powertype.index(self.rng.choice(self.powertype))
+        self.powerup_store.spawn(x, y, tag=tag, born=self.lifetimes.now)
+
+    def update_boss(self):
+        self.boss.update(self.bullet_store, self.player.pos.to_tuple())
+        self.collide_bullets_boss()
+        if self.boss:
+            self.collide_boss_bullets_player()
+
+    def advance_bullets(self):
+        self.bullet_store.advance()
+        self.lifetimes.cull_store("bullets", self.bullet_store)
+
+    def advance_enemies(self, speed):
+        s = self.enemy_store
+        s.y[:s.n] += speed
+        self.lifetimes.cull_store("enemies", s)
+
+    def cull_powerups(self):
+        self.lifetimes.cull_store("powerups", self.powerup_store)
+
+    def collide_bullets_boss(self):
+        s, boss = self.bullet_store, self.boss
+        x, y = boss.pos.x, boss.pos.y
+        dx, dy = boss.step
+        self.damage_boss([i for i in s.near(x, y, 80 + abs(dx) + abs(dy)).tolist()
+                          if Interaction.swept_xy(x, y, dx, dy, float(s.x[i]), float(s.y[i]), 80)])
+
+    def collide_bullet_step(self):
+        s = self.bullet_store
+        x, y = self.boss.pos.x, self.boss.pos.y
+        climb = 7
+        bx, by = s.x[:s.n], s.y[:s.n]
+        candidates = np.flatnonzero((by < y) & (y < by + climb + 80) & (np.abs(bx - x) < 80))
+        self.damage_boss([i for i in candidates.tolist()
+                          if Interaction.passes_xy(float(bx[i]), float(by[i]), 0, -climb, x, y, 80)
+                          and not Interaction.check_collision_xy(float(bx[i]), float(by[i]), x, y, 80)])
+
+    def damage_boss(self, hits):
+        s, boss = self.bullet_store, self.boss
+        for i in hits:
+            s.alive[i] = False
+            boss.health -= 1
+            if boss.health <= 0:
+                self.boss = None
+                self.in_boss_fight = False
+                self.enemy_speed *= self.difficulty.enemy_speed_growth
+                break
+        s.compact()
+
+    def collide_boss_bullets_player(self):
+        boss, player = self.boss, self.player.pos
+        s = boss.bullet_store
+        self.hit_by_boss_bullets([
+            i for i in s.near(player.x, player.y, 30 + boss.reach).tolist()
+            if Interaction.swept_xy(float(s.x[i]), float(s.y[i]), float(s.vx[i]), float(s.vy[i]),
+                                    player.x, player.y, 30)])
+
+    def collide_player_step(self):
+        dx, dy = self.player.step
+        if not (dx or dy):
+            return
+        s, player = self.boss.bullet_store, self.player.pos
+        self.hit_by_boss_bullets([
+            i for i in s.near(player.x, player.y, 30 + abs(dx) + abs(dy)).tolist()
+            if Interaction.passes_xy(player.x, player.y, dx, dy, float(s.x[i]), float(s.y[i]), 30)
+            and not Interaction.check_collision_xy(player.x, player.y, float(s.x[i]), float(s.y[i]), 30)])
+
+    def hit_by_boss_bullets(self, hits):
+        s = self.boss.bullet_store
+        for i in hits:
+            s.alive[i] = False
+            if self.damage_player():
+                break
+        s.compact()
+
+    def collide_bullets_enemies(self, fall, block=256):
+        """
+        Enemy x bullet tests in blocks of enemies; only rows with a
+        candidate drop into the ordered first-bullet-wins resolution.
+        Both kinds move straight up or down, so over an update the
+        vertical gap of a pair sweeps [dy - fall - climb, dy] at a fixed
+        horizontal gap, and its nearest point is one clip per pair.
+        """
+        es, bs = self.enemy_store, self.bullet_store
+        if not es.n or not bs.n:
+            return
+        limit = 30 * 30 * (1 + 1e-9)
+        climb = 7
+        bx, by = bs.x[:bs.n], bs.y[:bs.n]
+        for start in range(0, es.n, block):
+            stop = min(start + block, es.n)
+            gap_y = es.y[start:stop, None] - by
+            gap_y = np.maximum(gap_y - (fall + climb), np.minimum(gap_y, 0))
+            close = (es.x[start:stop, None] - bx) ** 2 + gap_y ** 2 < limit
+            for row in np.flatnonzero(close.any(axis=1)).tolist():
+                e = start + row
+                ex, ey = float(es.x[e]), float(es.y[e])
+                for i in np.flatnonzero(close[row] & bs.alive[:bs.n]).tolist():
+                    if Interaction.swept_pair_xy(float(bx[i]), float(by[i]), 0, -climb, ex, ey, 0, fall, 30):
+                        bs.alive[i] = False
+                        es.alive[e] = False
+                        self.register_kill()
+                        break
+        es.compact()
+        bs.compact()
+
+    def collide_enemies_player(self, fall):
+        s, player = self.enemy_store, self.player.pos
+        dx, dy = self.player.step
+        for e in s.near(player.x, player.y, 50 + abs(dx) + abs(dy) + fall).tolist():
+            if Interaction.swept_pair_xy(player.x, player.y, dx, dy, float(s.x[e]), float(s.y[e]), 0, fall, 50):
+                s.alive[e] = False
+                if self.damage_player():
+                    break
+        s.compact()
+
+    def collect_powerups(self):
+        s, player = self.powerup_store, self.player.pos
+        dx, dy = self.player.step
+        for i in s.near(player.x, player.y, 30 + abs(dx) + abs(dy)).tolist():
+            if Interaction.swept_xy(player.x, player.y, dx, dy, float(s.x[i]), float(s.y[i]), 30):
+                power_type = self.powertype[int(s.tag[i])]
+                if power_type == "Shield":
+                    self.shield_active, self.shield_timer = True, self.powertime
+                elif power_type == "Rapid Fire":
+                    self.rapid_active, self.rapid_timer = True, self.powertime
+                elif power_type == "Slow time":
+                    self.slow_active, self.slow_timer = True, self.powertime
+                s.alive[i] = False
+        s.compact()
+
+    def contact_frames(self, vx, vy, limit):
+        slack = self.CONTACT_SLACK
+        player = self.player.pos
+        fall = self.fall_speed()
+        es, bs, ps = self.enemy_store, self.bullet_store, self.powerup_store
+        ex, ey = es.x[:es.n], es.y[:es.n]
+        return int(min(limit,
+                       self.first_contact(ex[:, None] - bs.x[:bs.n], ey[:, None] - bs.y[:bs.n],
+                                          0, 7 + fall, 30 + slack),
+                       self.first_contact(ex - player.x, ey - player.y, -vx, fall - vy, 50 + slack),
+                       self.first_contact(ps.x[:ps.n] - player.x, ps.y[:ps.n] - player.y,
+                                          -vx, -vy, 30 + slack)))
+
+    @staticmethod
+    def first_contact(rx, ry, wx, wy, distance):
+        """Interaction.contact_time over arrays of offsets, the soonest of them"""
+        if not rx.size:
+            return float("inf")
+        c = rx * rx + ry * ry - distance * distance
+        if (c < 0).any():
+            return 0.0
+        b = rx * wx + ry * wy
+        disc = b * b - (wx * wx + wy * wy) * c
+        closing = (b < 0) & (disc >= 0)
+        if not closing.any():
+            return float("inf")
+        return float(((-b[closing] - np.sqrt(disc[closing])) / (wx * wx + wy * wy)).min())
+
+# SpriteCache class
+class SpriteCache:
+    """
+    Sprites keyed by (image, destination size), built once the source loads
+    Each entry holds the image to draw with its center, source size and
+    destination size tuples, so draws never query image dimensions.
+    Under SimpleGUICS2Pygame the image is scaled once with pygame and
+    then drawn 1:1; other backends keep the source and scale on draw.
+    """
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, img, size):
+        """Return (image, center, source size, dest size), or None while loading"""
+        key = (img, size)
+        entry = self.entries.get(key)
+        if entry is None:
+            source = img.image if isinstance(img, LazyImage) else img
+            if source is None or source.get_width() <= 0:
+                return None
+            entry = self.entries[key] = self.build(source, size)
+        return entry
+
+    def build(self, source, size):
+        scaled = self.prescale(source, size)
+        if scaled is not None:
+            source, size = scaled, (scaled.get_width(), scaled.get_height())
+        width, height = source.get_width(), source.get_height()
+        return (source, (width / 2, height / 2), (width, height), size)
+
+    @staticmethod
+    def prescale(source, size):
+        """Copy of a SimpleGUICS2Pygame image resampled to size, or None"""
+        surface = getattr(source, "_pygame_surface", None)
+        if surface is None or load_backend() is None or pygame is None:
+            return None
+        scaled = copy.copy(source)
+        target = (max(1, int(round(size[0]))), max(1, int(round(size[1]))))
+        try:
+            scaled._pygame_surface = pygame.transform.smoothscale(surface, target)
+        except ValueError:
+            # smoothscale only takes 24/32-bit surfaces
+            scaled._pygame_surface = pygame.transform.scale(surface, target)
+        try:
+            # Match the display format so blits skip per-pixel conversion
+            scaled._pygame_surface = scaled._pygame_surface.convert_alpha()
+        except pygame.error:
+            pass
+        if hasattr(source, "_pygamesurfaces_cached"):
+            # The shallow copy must not share the backend's per-image scale cache
+            scaled._pygamesurfaces_cached = type(source._pygamesurfaces_cached)()
+            scaled._pygamesurfaces_cached_counts = [0, 0]
+        return scaled
+
+    def clear(self):
+        self.entries.clear()
+
+# Shared cache for every sprite draw
+SPRITE_CACHE = SpriteCache()
+
+# Render layers, drawn back to front
+LAYER_BACKGROUND = 0
+LAYER_PLAYER = 1
+LAYER_BULLETS = 2
+LAYER_ENEMIES = 3
+LAYER_POWERUPS = 4
+LAYER_BOSS = 5
+LAYER_BOSS_BULLETS = 6
+LAYER_BOSS_BAR = 7
+LAYER_HUD = 8
+LAYER_INDICATORS = 9
+LAYER_POPUP = 10
+LAYER_OVERLAY = 11
+LAYER_DEBUG = 12
+LAYER_NAMES = ["background", "player", "bullets", "enemies", "powerups", "boss",
+               "boss_bullets", "boss_bar", "hud", "indicators", "popup", "overlay", "debug"]
+
+# RenderList class
+class RenderList:
+    """
+    Retained-mode frame: a flat list of draw commands
+    Commands are (layer, texture, kind, args) tuples. sorted() orders
+    them by layer and then texture, keeping queue order among equals,
+    so a backend can submit runs that share a texture in one batch.
+    """
+    def __init__(self):
+        self.commands = []
+
+    def clear(self):
+        self.commands = []
+
+    def sprite(self, layer, img, pos, size, rotation=0):
+        """Queue a whole image scaled to size; images still loading are skipped"""
+        if img is None:
+            return
+        entry = SPRITE_CACHE.get(img, size)
+        if entry is not None:
+            self.commands.append((layer, id(entry[0]), "sprite", (entry, pos, rotation)))
+
+    def circle(self, layer, pos, radius, line_width, line_color, fill_color=None):
+        style = (radius, line_width, line_color, fill_color)
+        self.commands.append((layer, hash(style), "circle", (pos, style)))
+
+    def box(self, layer, pos, size, color):
+        """Queue a filled size x size square centered on pos"""
+        style = (size, color)
+        self.commands.append((layer, hash(style), "box", (pos, style)))
+
+    def polygon(self, layer, points, line_width, line_color, fill_color=None):
+        self.commands.append((layer, 0, "polygon", (points, line_width, line_color, fill_color)))
+
+    def rect(self, layer, x, y, width, height, line_width, line_color, fill_color=None):
+        points = [(x, y), (x + width, y), (x + width, y + height), (x, y + height)]
+        self.polygon(layer, points, line_width, line_color, fill_color)
+
+    def text(self, layer, text, pos, size, color, font_face=None):
+        args = (text, pos, size, color) if font_face is None else (text, pos, size, color, font_face)
+        self.commands.append((layer, 0, "text", args))
+
+    def cached(self, layer, cached_layer):
+        """Queue a CachedLayer, composited as one unit"""
+        self.commands.append((layer, 0, "cached", cached_layer))
+
+    def sorted(self):
+        return sorted(self.commands, key=lambda command: (command[0], command[1]))
+
+# CachedLayer class
+class CachedLayer:
+    """
+    HUD or overlay layer that is rebuilt only when its inputs change
+    rect is the (x, y, width, height) screen area the layer may cover.
+    PygameBackend keeps the layer pre-rendered on an off-screen surface
+    and composites it with a single blit; SimpleGUIBackend replays the
+    cached commands.
+    """
+    def __init__(self, rect):
+        self.rect = rect
+        self.key = self
+        self.commands = []
+        self.surface = None
+        self.rebuilds = 0
+
+    def refresh(self, key, build, *args):
+        """Re-queue the layer through build(frame, *args) if key changed"""
+        if key != self.key:
+            self.key = key
+            frame = RenderList()
+            build(frame, *args)
+            self.commands = frame.sorted()
+            self.surface = None
+            self.rebuilds += 1
+        return self
+
+def offset_command(command, dx, dy):
+    """Copy of a draw command moved by (dx, dy)"""
+    layer, texture, kind, args = command
+    if kind == "sprite":
+        entry, (x, y), rotation = args
+        args = (entry, (x + dx, y + dy), rotation)
+    elif kind == "circle" or kind == "box":
+        (x, y), style = args
+        args = ((x + dx, y + dy), style)
+    elif kind == "polygon":
+        points, line_width, line_color, fill_color = args
+        args = ([(x + dx, y + dy) for x, y in points], line_width, line_color, fill_color)
+    elif kind == "text":
+        x, y = args[1]
+        args = (args[0], (x + dx, y + dy)) + args[2:]
+    return (layer, texture, kind, args)
+
+# SimpleGUIBackend class
+class SimpleGUIBackend:
+    """Submit a RenderList one simplegui canvas call per command (works everywhere)"""
+    def submit(self, canvas, commands, lap=None):
+        """Draw commands in order; lap, if given, is called as each layer finishes"""
+        layer = None
+        for command in commands:
+            if lap is not None and command[0] != layer:
+                if layer is not None:
+                    lap("render:" + LAYER_NAMES[layer])
+                layer = command[0]
+            self.draw_command(canvas, command)
+        if lap is not None and layer is not None:
+            lap("render:" + LAYER_NAMES[layer])
+
+    @staticmethod
+    def draw_command(canvas, command):
+        kind, args = command[2], command[3]
+        if kind == "sprite":
+            (image, center, source_size, dest_size), pos, rotation = args
+            canvas.draw_image(image, center, source_size, pos, dest_size, rotation)
+        elif kind == "circle":
+            pos, (radius, line_width, line_color, fill_color) = args
+            canvas.draw_circle(pos, radius, line_width, line_color, fill_color)
+        elif kind == "box":
+            (x, y), (size, color) = args
+            half = size / 2
+            canvas.draw_polygon([(x - half, y - half), (x + half, y - half),
+                                 (x + half, y + half), (x - half, y + half)], 1, color, color)
+        elif kind == "polygon":
+            canvas.draw_polygon(*args)
+        elif kind == "text":
+            canvas.draw_text(*args)
+        elif kind == "cached":
+            for cached_command in args.commands:
+                SimpleGUIBackend.draw_command(canvas, cached_command)
+
+# PygameBackend class
+class PygameBackend(SimpleGUIBackend):
+    """
+    Submit a RenderList straight onto a SimpleGUICS2Pygame canvas surface
+    Runs of pre-scaled sprites, circles, boxes and cached layers become
+    a single pygame.Surface.blits call; circles and boxes are pre-drawn
+    once per style and cached layers are rasterized only when they change.
+    Rotated or unscaled sprites, polygons and text go through the
+    canvas as in SimpleGUIBackend.
+    """
+    def __init__(self):
+        self.circles = {}
+        self.boxes = {}
+        self.canvas = None
+
+    @staticmethod
+    def supports(canvas):
+        return (getattr(canvas, "_pygame_surface", None) is not None
+                and load_backend() is not None and pygame is not None)
+
+    # simplegui colour names are CSS ones; pygame's X11 table differs on these
+    CSS_COLORS = {"gray": (128, 128, 128, 255), "grey": (128, 128, 128, 255), "green": (0, 128, 0, 255),
+                  "maroon": (128, 0, 0, 255), "purple": (128, 0, 128, 255), "transparent": (0, 0, 0, 0)}
+
+    @classmethod
+    def color(cls, name):
+        """pygame.Color for a simplegui colour name, #rrggbb, rgb(...) or rgba(...)"""
+        if name.startswith("rgb"):
+            values = [value.strip() for value in name[name.index("(") + 1:name.rindex(")")].split(",")]
+            alpha = round(float(values[3]) * 255) if len(values) > 3 else 255
+            return pygame.Color(int(values[0]), int(values[1]), int(values[2]), alpha)
+        return pygame.Color(*cls.CSS_COLORS.get(name.lower(), (name,)))
+
+    def circle_surface(self, style):
+        """Pre-draw a circle the way SimpleGUICS2Pygame's draw_circle does"""
+        surface = self.circles.get(style)
+        if surface is None:
+            radius, line_width, line_color, fill_color = style
+            line_width = 1 if line_width <= 1 else int(round(line_width))
+            radius = int(round(radius)) + int(round(line_width // 2))
+            surface = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+            color = self.color(line_color)
+            fill = None if fill_color is None else self.color(fill_color)
+            if fill is not None:
+                pygame.draw.circle(surface, fill, (radius, radius), radius, 0)
+            if color != fill:
+                pygame.draw.circle(surface, color, (radius, radius), radius, min(line_width, radius))
+            try:
+                surface = surface.convert_alpha()
+            except pygame.error:
+                pass
+            self.circles[style] = surface
+        return surface
+
+    def box_surface(self, style):
+        """Opaque filled square, so its blit needs no alpha blending"""
+        surface = self.boxes.get(style)
+        if surface is None:
+            size, color = style
+            size = max(1, int(round(size)))
+            surface = pygame.Surface((size, size))
+            surface.fill(self.color(color))
+            try:
+                surface = surface.convert()
+            except pygame.error:
+                pass
+            self.boxes[style] = surface
+        return surface
+
+    def layer_surface(self, canvas, cached):
+        """Rasterize a CachedLayer onto a transparent surface of its rect"""
+        if cached.surface is None:
+            x, y, width, height = cached.rect
+            # A canvas of the same backend class, drawing into our surface
+            offscreen = type(canvas)(None, width, height)
+            offscreen._pygame_surface = pygame.Surface((width, height), pygame.SRCALPHA)
+            for command in cached.commands:
+                self.draw_command(offscreen, offset_command(command, -x, -y))
+            cached.surface = offscreen._pygame_surface
+        return cached.surface
+
+    def blit_for(self, command):
+        """(surface, top-left) for a command that can be blitted directly, else None"""
+        kind, args = command[2], command[3]
+        if kind == "sprite":
+            (image, _, source_size, dest_size), pos, rotation = args
+            surface = getattr(image, "_pygame_surface", None)
+            if surface is None or rotation or source_size != dest_size:
+                return None
+        elif kind == "circle":
+            pos, style = args
+            surface = self.circle_surface(style)
+        elif kind == "box":
+            pos, style = args
+            surface = self.box_surface(style)
+        elif kind == "cached":
+            return (self.layer_surface(self.canvas, args), args.rect[:2])
+        else:
+            return None
+        return (surface, (int(round(pos[0] - surface.get_width() / 2)),
+                          int(round(pos[1] - surface.get_height() / 2))))
+
+    def submit(self, canvas, commands, lap=None):
+        self.canvas = canvas
+        target = canvas._pygame_surface
+        batch = []
+        layer = None
+        for command in commands:
+            if lap is not None and command[0] != layer:
+                # Profiling: flush per layer so each one is timed on its own
+                if batch:
+                    target.blits(batch, False)
+                    batch = []
+                if layer is not None:
+                    lap("render:" + LAYER_NAMES[layer])
+                layer = command[0]
+            blit = self.blit_for(command)
+            if blit is not None:
+                batch.append(blit)
+                continue
+            if batch:
+                target.blits(batch, False)
+                batch = []
+            self.draw_command(canvas, command)
+        if batch:
+            target.blits(batch, False)
+        if lap is not None and layer is not None:
+            lap("render:" + LAYER_NAMES[layer])
+
+# Renderer class
+class Renderer:
+    """
+    Owns the per-frame RenderList, the cached HUD/overlay layers and
+    the backend picked for the canvas
+    """
+    def __init__(self):
+        self.frame = RenderList()
+        self.backend = None
+        self.last_commands = []
+        self.previous = None
+        self.layers = {
+            "welcome": CachedLayer((0, 0, WIDTH, HEIGHT)),
+            "stats": CachedLayer((0, 0, 685, 60)),
+            "boss_hud": CachedLayer((WIDTH // 2 - 160, 0, 320, 90)),
+            "help": CachedLayer((685, 5, 510, 50)),
+            "indicators": CachedLayer((0, 85, 420, 120)),
+            "popup": CachedLayer((0, HEIGHT // 2 - 70, WIDTH, 90)),
+            "overlay": CachedLayer((0, 0, WIDTH, HEIGHT)),
+            "profiler": CachedLayer((0, HEIGHT - 330, 520, 330)),
+        }
+
+    def present(self, canvas, profiler=None):
+        """Submit and clear the queued frame, timing each layer if profiling"""
+        if self.backend is None:
+            self.backend = PygameBackend() if PygameBackend.supports(canvas) else SimpleGUIBackend()
+        lap = profiler.lap if profiler is not None and profiler.enabled else None
+        self.last_commands = self.frame.sorted()
+        self.backend.submit(canvas, self.last_commands, lap)
+        self.frame.clear()
+
+    def present_again(self, canvas):
+        """Resubmit the last frame, for draw calls that skip building one"""
+        self.backend.submit(canvas, self.last_commands)
+
+    def remember(self, game):
+        """Note where the player and boss are before an update tick"""
+        boss = game.boss
+        self.previous = (game.frames, game.player, game.player.pos.to_tuple(),
+                         boss, boss.pos.to_tuple() if boss else None)
+
+RENDERER = Renderer()
+CLOCK = FixedClock()
+GOVERNOR = QualityGovernor()
+
+def is_loaded(img):
+    return img is not None and img.get_width() > 0
+
+def render_welcome(frame, game):
+    frame.text(LAYER_HUD, "CYBER ATTACK", (WIDTH/2 - 250, HEIGHT/2 - 100), 64, "Cyan")
+    frame.text(LAYER_HUD, "Click the button to start", (WIDTH/2 - 200, HEIGHT/2 - 50), 36, "White")
+    x, y = game.start_button_pos
+    w, h = game.start_button_size
+    frame.rect(LAYER_HUD, x, y, w, h, 2, "White", "Gray")
+    frame.text(LAYER_HUD, "START", (x + 45, y + 35), 30, "Black")
+
+def render_stats(frame, wave, kills, hearts):
+    frame.rect(LAYER_HUD, 10, 10, 370, 40, 2, "Blue", "Blue")
+    frame.text(LAYER_HUD, f"Wave: {wave} | Kills: {kills} | Hearts: {hearts}", (20, 40), 24, "White")
+
+def render_boss_hud(frame, name, max_health, health):
+    frame.text(LAYER_HUD, f"Boss: {name}", (WIDTH / 2 - 150, 40), 28, "Cyan")
+    hud_bar_width = 300
+    hud_bar_height = 20
+    hud_bar_x = WIDTH / 2 - hud_bar_width / 2
+    hud_bar_y = 60
+    health_ratio = health / max_health
+    frame.rect(LAYER_HUD, hud_bar_x, hud_bar_y, hud_bar_width, hud_bar_height, 1, "White", "Gray")
+    frame.rect(LAYER_HUD, hud_bar_x, hud_bar_y, hud_bar_width * health_ratio, hud_bar_height, 1, "Red", "Red")
+
+def render_help(frame):
+    frame.rect(LAYER_HUD, 690, 10, 500, 40, 2, "White", "Black")
+    frame.text(LAYER_HUD, "Press R to Restart | Press P to Pause/Resume", (700, 35), 24, "White")
+
+def render_indicators(frame, game):
+    y_offset = 110
+    if game.shield_active:
+        frame.text(LAYER_INDICATORS, "Shield Active", (60, y_offset), 24, "Yellow")
+        frame.sprite(LAYER_INDICATORS, game.shield_img, (30, y_offset), (30, 30))
+        y_offset += 30
+
+    if game.rapid_active:
+        frame.text(LAYER_INDICATORS, "Rapid Fire Active", (60, y_offset), 24, "Yellow")
+        frame.sprite(LAYER_INDICATORS, game.rapid_img, (30, y_offset), (30, 30))
+        y_offset += 30
+
+    if game.slow_active:
+        frame.text(LAYER_INDICATORS, "Slow Time Active", (60, y_offset), 24, "Yellow")
+        frame.sprite(LAYER_INDICATORS, game.slow_clock_img, (30, y_offset), (40, 30))
+
+def render_popup(frame, text):
+    frame.text(LAYER_POPUP, text, (WIDTH // 2 - 100, HEIGHT // 2), 60, "Orange")
+
+def render_overlay(frame, paused, game_over):
+    # Paused screen
+    if paused:
+        frame.rect(LAYER_OVERLAY, 0, 0, WIDTH, HEIGHT, 1, "Black", "rgba(0, 0, 0, 0.5)")
+        frame.text(LAYER_OVERLAY, "PAUSED", (WIDTH / 2 - 80, HEIGHT / 2), 50, "White")
+        frame.text(LAYER_OVERLAY, "Press M to Return to Menu", (WIDTH / 2 - 200, HEIGHT / 2 + 110), 30, "White")
+
+    # Game over screen
+    if game_over:
+        frame.rect(LAYER_OVERLAY, 0, 0, WIDTH, HEIGHT, 1, "Black", "rgba(0, 0, 0, 0.7)")
+        frame.text(LAYER_OVERLAY, "GAME OVER", (WIDTH / 2 - 150, HEIGHT / 2), 50, "Red")
+        frame.text(LAYER_OVERLAY, "Press R to Restart", (WIDTH / 2 - 170, HEIGHT / 2 + 60), 30, "White")
+        frame.text(LAYER_OVERLAY, "Press M to Return to Menu", (WIDTH / 2 - 200, HEIGHT / 2 + 110), 30, "White")
+
+def render_profiler(frame, lines):
+    frame.rect(LAYER_DEBUG, 10, HEIGHT - 20 - 18 * len(lines), 500, 18 * len(lines) + 10, 1, "Black", "rgba(0, 0, 0, 0.6)")
+    for i, line in enumerate(lines):
+        frame.text(LAYER_DEBUG, line, (18, HEIGHT - 16 - 18 * (len(lines) - 1 - i)), 14, "Lime", "monospace")
+
+def refresh_every(layer, tick, every, key, build, *args, urgent=0):
+    """
+    CachedLayer.refresh, only on every every-th tick once the layer has
+    been built; a change in the first urgent values of key shows at once
+    """
+    if layer.key is layer or tick % every == 0 or key[:urgent] != layer.key[:urgent]:
+        layer.refresh(key, build, *args)
+    return layer
+
+def lerp(before, after, alpha):
+    return (before[0] + (after[0] - before[0]) * alpha, before[1] + (after[1] - before[1]) * alpha)
 
+def render_game(game, frame, layers, alpha=1.0, previous=None, quality=QUALITY_FULL):
+    """
+    Queue everything visible in game onto frame
+    HUD and overlays go through the CachedLayer objects in layers and
+    are only rebuilt when the values they show change
+    Args:
+        alpha: how far between the last two ticks to draw moving things
+               (1.0 draws the latest tick as is)
+        previous: Renderer.remember() output from before the last tick
+        quality: QUALITY_* level, from QualityGovernor
+    """
+    # Interpolate only across a tick that advanced the game
+    if previous is None or previous[0] != game.frames - 1:
+        alpha = 1.0
+    back = 1.0 - alpha
+    cap = SPRITE_CAP if quality >= QUALITY_CAPPED else None
+    hud_every = HUD_REFRESH if quality >= QUALITY_SLOW_HUD else 1
     # Background
-    bg_center = (GAME.background_img.get_width() / 2, GAME.background_img.get_height() / 2)
-    bg_size = (GAME.background_img.get_width(), GAME.background_img.get_height())
-    if GAME.background_img.get_width() > 0:
-        canvas.draw_image(GAME.background_img, bg_center, bg_size, (WIDTH / 2, HEIGHT / 2), (WIDTH, HEIGHT))
+    if quality < QUALITY_NO_BACKGROUND:
+        frame.sprite(LAYER_BACKGROUND, game.background_img, (WIDTH / 2, HEIGHT / 2), (WIDTH, HEIGHT))
 
     # Welcome screen
-    if GAME.state == "welcome":
-        canvas.draw_text("CYBER ATTACK", (WIDTH/2 - 250, HEIGHT/2 - 100), 64, "Cyan")
-        canvas.draw_text("Click the button to start", (WIDTH/2 - 200, HEIGHT/2 - 50), 36, "White")
-        x, y = GAME.start_button_pos
-        w, h = GAME.start_button_size
-        canvas.draw_polygon([(x, y), (x + w, y), (x + w, y + h), (x, y + h)], 2, "White", "Gray")
-        canvas.draw_text("START", (x + 45, y + 35), 30, "Black")
+    if game.state == "welcome":
+        key = (game.start_button_pos, game.start_button_size)
+        frame.cached(LAYER_HUD, layers["welcome"].refresh(key, render_welcome, game))
         return
 
     # Player
-    image_width = GAME.player_img.get_width()
-    image_height = GAME.player_img.get_height()
-    image_center = (image_width / 2, image_height / 2)
-    canvas.draw_image(GAME.player_img, image_center, (image_width, image_height), GAME.player.pos.to_tuple(), (100, 100), 0)
+    pos = game.player.pos.to_tuple()
+    if back and previous[1] is game.player:
+        pos = lerp(previous[2], pos, alpha)
+    frame.sprite(LAYER_PLAYER, game.player_img, pos, (100, 100), 0)
 
-    # Bullets
-    for bullet in GAME.bullets:
-        canvas.draw_circle(bullet.to_tuple(), 5, 1, "White", "White")
+    # Bullets, drawn back along their 7 px/tick climb
+    for x, y in game.bullet_positions()[:cap]:
+        frame.circle(LAYER_BULLETS, (x, y + 7 * back), 5, 1, "White", "White")
 
     # Enemies
-    for pos, img in GAME.enemies:
-        canvas.draw_image(img, (img.get_width() / 2, img.get_height() / 2), (img.get_width(), img.get_height()), pos.to_tuple(), (50, 50))
+    step = game.fall_speed() * back
+    for (x, y), img in game.enemy_sprites()[:cap]:
+        frame.sprite(LAYER_ENEMIES, img, (x, y - step), (50, 50))
 
     # Powerups
-    for power in GAME.powerups:
+    for power in game.powerups:
         pos = power["pos"].to_tuple()
         if power["type"] == "Shield":
-            canvas.draw_image(GAME.shield_img, (GAME.shield_img.get_width()/2, GAME.shield_img.get_height()/2), (GAME.shield_img.get_width(), GAME.shield_img.get_height()), pos, (40, 40))
+            frame.sprite(LAYER_POWERUPS, game.shield_img, pos, (40, 40))
         elif power["type"] == "Rapid Fire":
-            canvas.draw_image(GAME.rapid_img, (GAME.rapid_img.get_width()/2, GAME.rapid_img.get_height()/2), (GAME.rapid_img.get_width(), GAME.rapid_img.get_height()), pos, (40, 40))
+            frame.sprite(LAYER_POWERUPS, game.rapid_img, pos, (40, 40))
         elif power["type"] == "Slow time":
-            canvas.draw_image(GAME.slow_clock_img, (GAME.slow_clock_img.get_width()/2, GAME.slow_clock_img.get_height()/2), (GAME.slow_clock_img.get_width(), GAME.slow_clock_img.get_height()), pos, (50, 37.5))
+            frame.sprite(LAYER_POWERUPS, game.slow_clock_img, pos, (50, 37.5))
 
     # Boss
-    if GAME.boss:
-        GAME.boss.draw(canvas)
+    if game.boss:
+        pos = game.boss.pos.to_tuple()
+        if back and previous[3] is game.boss:
+            pos = lerp(previous[4], pos, alpha)
+        game.boss.render(frame, pos, back, quality >= QUALITY_BOX_BULLETS, cap)
 
     # UI Elements
-    canvas.draw_polygon([(10, 10), (380, 10), (380, 50), (10, 50)], 2, "Blue", "Blue")
-    canvas.draw_text(f"Wave: {GAME.wave} | Kills: {GAME.kills} | Hearts: {GAME.player.hearts}", (20, 40), 24, "White")
+    # Hearts and game over are never held back (frames stop at game over)
+    key = (game.player.hearts, game.game_over, game.wave, game.kills)
+    frame.cached(LAYER_HUD, refresh_every(layers["stats"], game.frames, hud_every, key, render_stats,
+                                          game.wave, game.kills, game.player.hearts, urgent=2))
 
     # Boss HUD
-    if GAME.boss:
-        boss = GAME.boss
-        canvas.draw_text(f"Boss: {boss.name}", (WIDTH / 2 - 150, 40), 28, "Cyan")
-        hud_bar_width = 300
-        hud_bar_height = 20
-        hud_bar_x = WIDTH / 2 - hud_bar_width / 2
-        hud_bar_y = 60
-        max_health = 25 if boss.boss_type == "tank" else 20
-        health_ratio = boss.health / max_health
-        canvas.draw_polygon([
-            (hud_bar_x, hud_bar_y),
-            (hud_bar_x + hud_bar_width, hud_bar_y),
-            (hud_bar_x + hud_bar_width, hud_bar_y + hud_bar_height),
-            (hud_bar_x, hud_bar_y + hud_bar_height)
-        ], 1, "White", "Gray")
-        canvas.draw_polygon([
-            (hud_bar_x, hud_bar_y),
-            (hud_bar_x + hud_bar_width * health_ratio, hud_bar_y),
-            (hud_bar_x + hud_bar_width * health_ratio, hud_bar_y + hud_bar_height),
-            (hud_bar_x, hud_bar_y + hud_bar_height)
-        ], 1, "Red", "Red")
-
-    canvas.draw_polygon([(690, 10), (1190, 10), (1190, 50), (690, 50)], 2, "White", "Black")
-    canvas.draw_text("Press R to Restart | Press P to Pause/Resume", (700, 35), 24, "White")
-
-    # Powerup indicators
-    y_offset = 110
-    if GAME.shield_active:
-        canvas.draw_text("Shield Active", (60, y_offset), 24, "Yellow")
-        canvas.draw_image(GAME.shield_img, (GAME.shield_img.get_width()/2, GAME.shield_img.get_height()/2), (GAME.shield_img.get_width(), GAME.shield_img.get_height()), (30, y_offset), (30, 30))
-        y_offset += 30
+    if game.boss:
+        boss = game.boss
+        key = (boss.name, boss.max_health, boss.health)
+        frame.cached(LAYER_HUD, refresh_every(layers["boss_hud"], game.frames, hud_every,
+                                              key, render_boss_hud, *key))
 
-    if GAME.rapid_active:
-        canvas.draw_text("Rapid Fire Active", (60, y_offset), 24, "Yellow")
-        canvas.draw_image(GAME.rapid_img, (GAME.rapid_img.get_width()/2, GAME.rapid_img.get_height()/2), (GAME.rapid_img.get_width(), GAME.rapid_img.get_height()), (30, y_offset), (30, 30))
-        y_offset += 30
+    frame.cached(LAYER_HUD, layers["help"].refresh(None, render_help))
 
-    if GAME.slow_active:
-        canvas.draw_text("Slow Time Active", (60, y_offset), 24, "Yellow")
-        canvas.draw_image(GAME.slow_clock_img, (GAME.slow_clock_img.get_width()/2, GAME.slow_clock_img.get_height()/2), (GAME.slow_clock_img.get_width(), GAME.slow_clock_img.get_height()), (30, y_offset), (40, 30))
+    # Powerup indicators
+    if game.shield_active or game.rapid_active or game.slow_active:
+        key = (game.shield_active, game.rapid_active, game.slow_active,
+               is_loaded(game.shield_img), is_loaded(game.rapid_img), is_loaded(game.slow_clock_img))
+        frame.cached(LAYER_INDICATORS, layers["indicators"].refresh(key, render_indicators, game))
 
     # Wave popup
-    if GAME.wave_popup_timer > 0:
-        canvas.draw_text(GAME.wave_popup_text, (WIDTH // 2 - 100, HEIGHT // 2), 60, "Orange")
-
-    # Paused screen
-    if GAME.paused and GAME.wave_popup_timer <= 0:
-        canvas.draw_polygon([(0, 0), (WIDTH, 0), (WIDTH, HEIGHT), (0, HEIGHT)], 1, "Black", "rgba(0, 0, 0, 0.5)")
-        canvas.draw_text("PAUSED", (WIDTH / 2 - 80, HEIGHT / 2), 50, "White")
-        canvas.draw_text("Press M to Return to Menu", (WIDTH / 2 - 200, HEIGHT / 2 + 110), 30, "White")
+    if game.wave_popup_timer > 0:
+        frame.cached(LAYER_POPUP, layers["popup"].refresh(game.wave_popup_text, render_popup, game.wave_popup_text))
+
+    # Paused and game over screens
+    paused = game.paused and game.wave_popup_timer <= 0
+    if paused or game.game_over:
+        key = (paused, game.game_over)
+        frame.cached(LAYER_OVERLAY, layers["overlay"].refresh(key, render_overlay, *key))
+
+    # Profiler overlay, refreshed twice a second so it stays readable
+    profiler = game.profiler
+    if profiler.enabled and profiler.recorded:
+        layer = layers["profiler"]
+        if layer.key is layer or profiler.head % 30 == 0:
+            lines = profiler.summary_lines()[:17]
+            layer.refresh(lines, render_profiler, lines)
+        frame.cached(LAYER_DEBUG, layer)
 
-    # Game over screen
-    if GAME.game_over:
-        canvas.draw_polygon([(0, 0), (WIDTH, 0), (WIDTH, HEIGHT), (0, HEIGHT)], 1, "Black", "rgba(0, 0, 0, 0.7)")
-        canvas.draw_text("GAME OVER", (WIDTH / 2 - 150, HEIGHT / 2), 50, "Red")
-        canvas.draw_text("Press R to Restart", (WIDTH / 2 - 170, HEIGHT / 2 + 60), 30, "White")
-        canvas.draw_text("Press M to Return to Menu", (WIDTH / 2 - 200, HEIGHT / 2 + 110), 30, "White")
+def draw(canvas):
+    profiler = GAME.profiler
+    profiler.begin_frame()
+    GOVERNOR.begin_frame()
+    # As many fixed ticks as the time since the last draw calls for
+    for _ in range(CLOCK.ticks()):
+        if GAME.recorder is not None:
+            GAME.recorder.capture(GAME)
+        RENDERER.remember(GAME)
+        GAME.update()
+        if GAME.spectator is not None:
+            GAME.spectator.publish(GAME)
+    if CLOCK.render_due() or not RENDERER.last_commands:
+        render_game(GAME, RENDERER.frame, RENDERER.layers, CLOCK.alpha, RENDERER.previous, GOVERNOR.level)
+        profiler.lap("render:build")
+        RENDERER.present(canvas, profiler)
+    else:
+        RENDERER.present_again(canvas)
+    GOVERNOR.end_frame()
+    profiler.end_frame(GAME)
 
 def keydown(key):
+    if key == simplegui.KEY_MAP['o']:
+        # Frame-phase profiler and its overlay
+        GAME.profiler.toggle()
     if GAME.state == "playing":
         if key == simplegui.KEY_MAP['w']: GAME.move_direction["up"] = True
         if key == simplegui.KEY_MAP['s']: GAME.move_direction["down"] = True
@@ -533,7 +3400,7 @@ def keydown(key):
         if key == simplegui.KEY_MAP['p']:
             # Only toggle pause if we're not showing a wave popup
             if GAME.wave_popup_timer <= 0:
-                GAME.paused = not GAME.paused
+                GAME.input_event(INPUT_PAUSE)
 
 def keyup(key):
     if GAME.state == "playing":
@@ -542,22 +3409,55 @@ def keyup(key):
         if key == simplegui.KEY_MAP['a']: GAME.move_direction["left"] = False
         if key == simplegui.KEY_MAP['d']: GAME.move_direction["right"] = False
         if key == simplegui.KEY_MAP['r']:
-            GAME.restart()
+            GAME.input_event(INPUT_RESTART)
         if key == simplegui.KEY_MAP['m']:
-            GAME.restart()
-            GAME.state = "welcome"
+            GAME.input_event(INPUT_MENU)
 
 def click(pos):
     if GAME.state == "welcome":
         x, y = GAME.start_button_pos
         w, h = GAME.start_button_size
         if x <= pos[0] <= x + w and y <= pos[1] <= y + h:
-            GAME.start_game()
+            GAME.input_event(INPUT_START)
+
+def main(arrays=None):
+    """
+    Play in a GUI frame. Importing this file only defines the game; the
+    backend, GAME (and its sprite loads) and the frame start here.
+    Args:
+        arrays: play on ArrayGame (needs numpy); when None, whether
+                --arrays was passed on the command line
+    """
+    global GAME
+    if load_backend() is None:
+        raise SystemExit("Cyber Attack needs simplegui or SimpleGUICS2Pygame (pip install SimpleGUICS2Pygame)")
+    if arrays is None:
+        try:
+            import sys
+            arrays = "--arrays" in sys.argv[1:]
+        except (ImportError, AttributeError):
+            arrays = False
+    if arrays and np is None:
+        raise SystemExit("--arrays needs numpy")
+    GAME = ArrayGame() if arrays else Game()
+    # CYBER_ATTACK_RECORD=path saves the session's inputs on exit (replay.py plays them back)
+    record_path = os.environ.get("CYBER_ATTACK_RECORD") if threading is not None else None
+    if record_path:
+        GAME.recorder = InputRecording(GAME.seed)
+    # CYBER_ATTACK_SPECTATE=host:port streams every frame to remote viewers (see spectator.py)
+    spectate = os.environ.get("CYBER_ATTACK_SPECTATE") if threading is not None else None
+    if spectate:
+        import spectator
+        GAME.spectator = spectator.SpectatorServer.start_thread(spectate)
+    frame = simplegui.create_frame("Cyber Attack", WIDTH, HEIGHT)
+    frame.set_draw_handler(draw)
+    frame.set_keydown_handler(keydown)
+    frame.set_keyup_handler(keyup)
+    frame.set_mouseclick_handler(click)
+    frame.start()
+    if record_path:
+        GAME.recorder.save(record_path)
 
 # Run game
-frame = simplegui.create_frame("Cyber Attack", WIDTH, HEIGHT)
-frame.set_draw_handler(draw)
-frame.set_keydown_handler(keydown)
-frame.set_keyup_handler(keyup)
-frame.set_mouseclick_handler(click)
-frame.start()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,330 @@
+"""
+Stress benchmarks for Game.update and the render path
+
+Each scenario sets up a headless game, runs warm-up frames, then times
+every frame. The report gives frames/sec, per-frame latency
+percentiles and peak traced memory. Results can be written as JSON and
+compared against an earlier run; a scenario that regresses past the
+threshold makes the run exit with status 1.
+
+--startup instead times start-up in fresh processes: importing the
+game, loading the GUI backend, creating a headless game, and starting
+a worker pool with spawn and from the forkserver template.
+
+    python benchmark.py --output before.json
+    python benchmark.py --baseline before.json --threshold 0.15
+    python benchmark.py --startup
+"""
+import argparse
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import game_module
+
+ca = game_module.load()
+
+
+# NullImage class
+class NullImage:
+    """Stand-in sprite with a size, so sprite draw paths run headlessly"""
+    def __init__(self, width, height):
+        self.width, self.height = width, height
+
+    def get_width(self):
+        return self.width
+
+    def get_height(self):
+        return self.height
+
+
+# NullCanvas class
+class NullCanvas:
+    """Canvas that accepts every simplegui draw call and does nothing"""
+    def draw_image(self, *args):
+        pass
+
+    def draw_circle(self, *args):
+        pass
+
+    def draw_polygon(self, *args):
+        pass
+
+    def draw_text(self, *args):
+        pass
+
+
+def give_sprites(game):
+    """Attach NullImages in place of the sprites a headless game lacks"""
+    game.background_img = NullImage(1200, 800)
+    game.player_img = NullImage(300, 300)
+    game.slow_clock_img = NullImage(64, 48)
+    game.shield_img = game.rapid_img = NullImage(64, 64)
+    game.enemy_images = [NullImage(80, 80) for _ in range(4)]
+    game.boss_images = {boss_type: NullImage(200, 200) for boss_type in ("tank", "shooter", "evader")}
+
+
+def new_game(game_cls, seed):
+    game = game_cls(headless=True, seed=seed)
+    give_sprites(game)
+    game.start_game()
+    # Scenarios measure throughput, so the player never dies
+    game.player.hearts = 10 ** 9
+    return game
+
+
+def enemies_1000(game):
+    """
+    1,000 slow enemies spread over the screen, plus one more spawned
+    every frame; few fall off the bottom, so the count is not held at
+    1,000 but climbs to about 1,500 (1,050 to 1,530 over a default run)
+    """
+    for _ in range(1000):
+        game.spawn_enemy()
+    # Reassign the list so array-backed games pick up the new positions
+    enemies = game.enemies
+    for pos, _ in enemies:
+        pos.y = game.rng.uniform(0, ca.HEIGHT - 1)
+    game.enemies = enemies
+    game.enemy_speed = 0.05
+    game.enemy_spawn_rate = 1
+
+
+def rapid_fire(game):
+    """Rapid fire held for the whole run against a dense wave"""
+    game.rapid_active, game.rapid_timer = True, 10 ** 9
+    game.enemy_spawn_rate = 5
+
+
+def boss_wave_50(boss_type):
+    def setup(game):
+        game.wave = 50
+        game.in_boss_fight = True
+        game.boss = game.boss_class(boss_type, game.boss_images[boss_type], 50, game.rng,
+                                    game.difficulty, game.lifetimes)
+        game.boss.health = 10 ** 9
+        game.boss.pos.y, game.boss.entered_screen = 150, True
+        game.rapid_active, game.rapid_timer = True, 10 ** 9
+    setup.__doc__ = "%s boss at wave 50 under rapid fire" % boss_type
+    return setup
+
+
+def slow_shield(game):
+    """Slow time and shield stacked, with frequent spawns and powerups"""
+    game.slow_active, game.slow_timer = True, 10 ** 9
+    game.shield_active, game.shield_timer = True, 10 ** 9
+    game.enemy_spawn_rate, game.powerup_rate = 3, 60
+
+
+SCENARIOS = {
+    "enemies_1000": enemies_1000,
+    "rapid_fire": rapid_fire,
+    "boss_tank_w50": boss_wave_50("tank"),
+    "boss_shooter_w50": boss_wave_50("shooter"),
+    "boss_evader_w50": boss_wave_50("evader"),
+    "slow_shield": slow_shield,
+}
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_frames(game, frames, render, quality=ca.QUALITY_FULL):
+    """Step the game frames times; returns per-frame seconds"""
+    clock = time.perf_counter
+    moves = ({"left": True, "right": False}, {"left": False, "right": True})
+    canvas = NullCanvas()
+    renderer = ca.Renderer()
+    renderer.backend = ca.SimpleGUIBackend()
+    times = []
+    for i in range(frames):
+        # Sweep left and right so the player keeps meeting new enemies
+        game.move_direction.update(moves[(i // 60) % 2])
+        start = clock()
+        game.update()
+        if render:
+            ca.render_game(game, renderer.frame, renderer.layers, quality=quality)
+            renderer.present(canvas)
+        times.append(clock() - start)
+    return times
+
+
+def run_scenario(name, game_cls, frames, warmup, seed, render, memory, quality=ca.QUALITY_FULL):
+    setup = SCENARIOS[name]
+    game = new_game(game_cls, seed)
+    setup(game)
+    run_frames(game, warmup, render, quality)
+    times = run_frames(game, frames, render, quality)
+    ordered = sorted(times)
+    result = {
+        "frames": frames,
+        "fps": frames / sum(times),
+        "mean_ms": sum(times) / frames * 1000,
+        "p50_ms": percentile(ordered, 0.50) * 1000,
+        "p90_ms": percentile(ordered, 0.90) * 1000,
+        "p99_ms": percentile(ordered, 0.99) * 1000,
+        "max_ms": ordered[-1] * 1000,
+        "entities": game.entity_counts(),
+    }
+    if memory:
+        # Separate pass: tracemalloc would distort the timings above
+        game = new_game(game_cls, seed)
+        setup(game)
+        tracemalloc.start()
+        run_frames(game, warmup + frames, render, quality)
+        result["peak_kb"] = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+    return result
+
+
+# Start-up steps, each timed in a fresh interpreter
+STARTUP = {
+    "import": "import game_module; game_module.load()",
+    "import_backend": "import game_module; game_module.load().load_backend()",
+    "headless_game": "import game_module; game_module.load().Game(headless=True, seed=0).start_game()",
+}
+
+
+def time_startup(code):
+    """Milliseconds code takes in a new interpreter, not counting the interpreter's own start"""
+    timed = "import time\nstart = time.perf_counter()\n%s\nprint((time.perf_counter() - start) * 1000)" % code
+    out = subprocess.check_output([sys.executable, "-c", timed], cwd=os.path.dirname(game_module.GAME_PATH),
+                                  stderr=subprocess.DEVNULL)
+    # The backend may print a banner first; the timing is the last line
+    return float(out.decode().split()[-1])
+
+
+def pool_task(seed):
+    """What a batch worker does first: build a headless game"""
+    return ca.Game(headless=True, seed=seed).frames
+
+
+def time_pool(context, workers):
+    """Milliseconds to start a pool, run one task per worker and shut it down"""
+    start = time.perf_counter()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        list(pool.map(pool_task, range(workers)))
+    return (time.perf_counter() - start) * 1000
+
+
+def run_startup(repeat, workers):
+    """{step: timings summary} for STARTUP and the worker pool start methods"""
+    steps = {name: (lambda code=code: time_startup(code)) for name, code in STARTUP.items()}
+    steps["pool_spawn"] = lambda: time_pool(multiprocessing.get_context("spawn"), workers)
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = game_module.pool_context([__name__])
+        steps["pool_forkserver"] = lambda: time_pool(context, workers)
+    results = {}
+    for name, step in steps.items():
+        # The first run also writes bytecode caches and starts the forkserver
+        step()
+        times = sorted(step() for _ in range(repeat))
+        results[name] = {"runs": repeat, "p50_ms": percentile(times, 0.50),
+                         "min_ms": times[0], "max_ms": times[-1]}
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       cwd=os.path.dirname(game_module.GAME_PATH),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def regressions(results, baseline, threshold):
+    """Scenarios whose fps fell or p99 rose, and start-up steps that slowed, by more than threshold"""
+    failed = []
+    for name, result in results.get("startup", {}).items():
+        before = baseline.get("startup", {}).get(name)
+        if before is not None and result["p50_ms"] > before["p50_ms"] * (1 + threshold):
+            failed.append("%s: p50 %.1f -> %.1f ms" % (name, before["p50_ms"], result["p50_ms"]))
+    for name, result in results["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None:
+            continue
+        if result["fps"] < before["fps"] * (1 - threshold):
+            failed.append("%s: fps %.0f -> %.0f" % (name, before["fps"], result["fps"]))
+        if result["p99_ms"] > before["p99_ms"] * (1 + threshold):
+            failed.append("%s: p99 %.3f -> %.3f ms" % (name, before["p99_ms"], result["p99_ms"]))
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cyber Attack update/render stress benchmarks")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="scenario to run (repeatable; default: all)")
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--warmup", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--render", action="store_true", help="also build and submit each frame to a null canvas")
+    parser.add_argument("--quality", choices=ca.QUALITY_NAMES, default=ca.QUALITY_NAMES[ca.QUALITY_FULL],
+                        help="render quality level for --render (default full)")
+    parser.add_argument("--arrays", action="store_true", help="benchmark ArrayGame (needs numpy)")
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="skip the peak memory pass")
+    parser.add_argument("--startup", action="store_true",
+                        help="time imports, game creation and worker pool start-up instead of the scenarios")
+    parser.add_argument("--repeat", type=int, default=5, help="runs of each --startup step (default 5)")
+    parser.add_argument("--workers", type=int, default=4, help="pool size for --startup (default 4)")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="earlier JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="allowed fractional slowdown before a scenario fails (default 0.15)")
+    args = parser.parse_args(argv)
+
+    game_cls = ca.ArrayGame if args.arrays else ca.Game
+    quality = ca.QUALITY_NAMES.index(args.quality)
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "game": game_cls.__name__,
+            "render": args.render,
+            "quality": args.quality,
+            "frames": args.frames,
+            "seed": args.seed,
+        },
+        "scenarios": {},
+    }
+    if args.startup:
+        results["meta"]["workers"] = args.workers
+        results["startup"] = run_startup(args.repeat, args.workers)
+        print("%-18s %9s %9s %9s" % ("startup", "p50 ms", "min ms", "max ms"))
+        for name, result in results["startup"].items():
+            print("%-18s %9.1f %9.1f %9.1f" % (name, result["p50_ms"], result["min_ms"], result["max_ms"]))
+    scenarios = args.scenario or ([] if args.startup else list(SCENARIOS))
+    if scenarios:
+        print("%-18s %10s %9s %9s %9s %10s" % ("scenario", "fps", "p50 ms", "p99 ms", "max ms", "peak KiB"))
+    for name in scenarios:
+        result = run_scenario(name, game_cls, args.frames, args.warmup, args.seed, args.render, args.memory,
+                              quality)
+        results["scenarios"][name] = result
+        print("%-18s %10.0f %9.3f %9.3f %9.3f %10s" % (
+            name, result["fps"], result["p50_ms"], result["p99_ms"], result["max_ms"],
+            "%.0f" % result["peak_kb"] if "peak_kb" in result else "-"))
+
+    if args.output:
+        with open(args.output, "w") as out:
+            json.dump(results, out, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as source:
+            failed = regressions(results, json.load(source), args.threshold)
+        for line in failed:
+            print("REGRESSION " + line)
+        if failed:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""
+Import helper for tools that drive the game
+"Cyber attack.py" is not a valid module name, so it is loaded by path
+and registered once as the "cyber_attack" module
+"""
+import importlib.util
+import os
+import sys
+
+GAME_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Cyber attack.py")
+MODULE_NAME = "cyber_attack"
+
+
+def load():
+    """Return the game module, importing it on first use"""
+    module = sys.modules.get(MODULE_NAME)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(MODULE_NAME, GAME_PATH)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[MODULE_NAME] = module
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            del sys.modules[MODULE_NAME]
+            raise
+    return module
+
+
+def pool_context(preload=("__main__",)):
+    """
+    multiprocessing context for worker pools whose workers start warm
+    Where the platform has forkserver, every worker is forked from one
+    template process that has already imported preload (by default the
+    running script, which loads the game at import), instead of each
+    worker importing the game again. Elsewhere the default start method
+    is used.
+    Args:
+        preload: module names the template imports once
+    """
+    import multiprocessing
+
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context()
+    names = []
+    for name in preload:
+        if name == "__main__":
+            # The forkserver does not re-run the script as __main__ itself,
+            # so the template imports it by file name (its sys.path is ours)
+            path = getattr(sys.modules["__main__"], "__file__", None)
+            if path is None:
+                continue
+            name = os.path.splitext(os.path.basename(path))[0]
+        names.append(name)
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload(names + [__name__])
+    return context
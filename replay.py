@@ -0,0 +1,74 @@
+"""
+Replay a recorded session headlessly at full speed
+
+Record a session by setting CYBER_ATTACK_RECORD before starting the
+game, then replay it here to reproduce a bug or profile the frames that
+were slow:
+
+    CYBER_ATTACK_RECORD=session.cair python "Cyber attack.py"
+    python replay.py session.cair --trace session-trace.json
+
+Replays are bit-identical: the digest printed at the end is the same
+on every run of the same recording.
+"""
+import argparse
+import hashlib
+import sys
+import time
+
+import game_module
+
+ca = game_module.load()
+
+
+def floats(points):
+    # Game keeps some coordinates as ints where ArrayGame has floats
+    return [(float(x), float(y)) for x, y in points]
+
+
+def state_digest(game):
+    """Short hash over the simulation state that replays must reproduce"""
+    boss = game.boss
+    parts = [game.frames, game.score, game.kills, game.wave, game.state, game.paused,
+             game.player.hearts, game.game_over, floats([game.player.pos.to_tuple()]),
+             floats(game.bullet_positions()), floats(pos for pos, _ in game.enemy_sprites()),
+             [(power["type"], float(power["pos"].x), float(power["pos"].y)) for power in game.powerups],
+             game.rapid_timer, game.slow_timer, game.shield_timer, float(game.enemy_speed)]
+    if boss is not None:
+        parts += [boss.boss_type, boss.health, floats([boss.pos.to_tuple()]), boss.fire_timer,
+                  boss.pattern_timer, floats(boss.bullet_positions())]
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:16]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a Cyber Attack input recording")
+    parser.add_argument("recording", help="file saved via CYBER_ATTACK_RECORD")
+    parser.add_argument("--arrays", action="store_true", help="replay with ArrayGame (needs numpy)")
+    parser.add_argument("--repeat", type=int, default=1, help="replay N times and check every digest matches")
+    parser.add_argument("--trace", help="profile the replay and write a Chrome trace to this path")
+    args = parser.parse_args(argv)
+
+    recording = ca.InputRecording.load(args.recording)
+    game_cls = ca.ArrayGame if args.arrays else ca.Game
+    digests = []
+    for _ in range(args.repeat):
+        game = game_cls(headless=True, seed=recording.seed)
+        if args.trace:
+            game.profiler.enable()
+        start = time.perf_counter()
+        game.replay(recording)
+        elapsed = time.perf_counter() - start
+        digests.append(state_digest(game))
+        print("%d frames in %.3fs (%.0f fps)  wave %d  kills %d  score %d  digest %s" % (
+            len(recording), elapsed, len(recording) / max(elapsed, 1e-9),
+            game.wave, game.kills, game.score, digests[-1]))
+    if args.trace:
+        game.profiler.export_chrome_trace(args.trace)
+    if len(set(digests)) > 1:
+        print("MISMATCH: replays diverged")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
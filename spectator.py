@@ -0,0 +1,459 @@
+"""
+Spectator server: stream live game state to remote viewers
+
+An asyncio server runs beside the game loop and sends every client the
+state of each frame: the player, boss and projectile positions, score,
+wave, hearts and boss health. Positions are quantized to a quarter
+pixel. Most frames are deltas against the previous frame, and a full
+keyframe goes out periodically and to any client that fell behind. A
+client whose socket backs up misses frames instead of stalling the
+game; the report lists bandwidth, drops and ack latency per client.
+
+    CYBER_ATTACK_SPECTATE=0.0.0.0:8765 python "Cyber attack.py"
+    python spectator.py --serve 127.0.0.1:8765 --bot      # headless autopilot game
+    python spectator.py --watch 127.0.0.1:8765            # text viewer
+
+Clients connect over TCP and send MAGIC, or as WebSocket clients. After
+that, each message is a length-prefixed binary frame (or a binary
+WebSocket message). Clients ack each frame by sending its number back
+as a little-endian uint32.
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import socket
+import statistics
+import struct
+import sys
+import threading
+import time
+
+MAGIC = b"CASP"
+# Quarter-pixel positions as int16
+SCALE = 4
+INT16_MIN, INT16_MAX = -32768, 32767
+KINDS = ("player", "boss", "bullets", "enemies", "shield", "rapid", "slow", "boss_bullets")
+POWERUP_KINDS = {"Shield": "shield", "Rapid Fire": "rapid", "Slow time": "slow"}
+FLAGS = ("game_over", "paused", "in_boss_fight", "shield_active", "rapid_active", "slow_active")
+
+KEYFRAME, DELTA = 0, 1
+# Per-kind encodings inside a frame
+FULL, SAME, SHIFT, NUDGE = 0, 1, 2, 3
+HEADER = struct.Struct("<BIiIiiiB")
+ACK = struct.Struct("<I")
+WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def quantize(points):
+    return [(max(INT16_MIN, min(INT16_MAX, int(round(x * SCALE)))),
+             max(INT16_MIN, min(INT16_MAX, int(round(y * SCALE))))) for x, y in points]
+
+
+def capture(game):
+    """Quantized per-frame state of a game, cheap enough for the game thread"""
+    boss = game.boss
+    powerups = {kind: [] for kind in POWERUP_KINDS.values()}
+    for power in game.powerups:
+        powerups[POWERUP_KINDS[power["type"]]].append((power["pos"].x, power["pos"].y))
+    points = {
+        "player": quantize([game.player.pos.to_tuple()]),
+        "boss": quantize([boss.pos.to_tuple()] if boss else []),
+        "bullets": quantize(game.bullet_positions()),
+        "enemies": quantize(pos for pos, _ in game.enemy_sprites()),
+        "boss_bullets": quantize(boss.bullet_positions() if boss else []),
+    }
+    for kind, positions in powerups.items():
+        points[kind] = quantize(positions)
+    flags = sum(1 << i for i, name in enumerate(FLAGS) if getattr(game, name))
+    flags |= (game.state == "playing") << len(FLAGS)
+    scalars = (game.frames, game.score, game.wave, game.kills, game.player.hearts,
+               boss.health if boss else -1, flags)
+    return scalars, points
+
+
+def encode_points(out, points, base):
+    """Append one kind's points, as a delta against base when possible"""
+    count = len(points)
+    if base is not None and len(base) == count:
+        dx = [x - bx for (x, _), (bx, _) in zip(points, base)]
+        dy = [y - by for (_, y), (_, by) in zip(points, base)]
+        if not any(dx) and not any(dy):
+            out.append(struct.pack("<B", SAME))
+            return
+        if count and len(set(dx)) == 1 and len(set(dy)) == 1:
+            out.append(struct.pack("<BHhh", SHIFT, count, dx[0], dy[0]))
+            return
+        if min(dx + dy) >= -128 and max(dx + dy) <= 127:
+            out.append(struct.pack("<BH%db" % (2 * count), NUDGE, count,
+                                   *[d for pair in zip(dx, dy) for d in pair]))
+            return
+    out.append(struct.pack("<BH%dh" % (2 * count), FULL, count, *[v for point in points for v in point]))
+
+
+def encode(state, base=None):
+    """One frame message: a keyframe, or a delta when base (the previous state) is given"""
+    scalars, points = state
+    out = [HEADER.pack(KEYFRAME if base is None else DELTA, *scalars)]
+    for kind in KINDS:
+        encode_points(out, points[kind], None if base is None else base[1][kind])
+    return b"".join(out)
+
+
+# FrameDecoder class
+class FrameDecoder:
+    """Client side: rebuilds each frame's state from keyframes and deltas"""
+    def __init__(self):
+        self.state = None
+
+    def decode(self, message):
+        """
+        Apply one message; returns (scalars, {kind: [(x, y), ...]})
+        with positions still quantized (divide by SCALE for pixels)
+        """
+        fields = HEADER.unpack_from(message)
+        kind, scalars = fields[0], fields[1:]
+        if kind == DELTA and self.state is None:
+            raise ValueError("delta frame %d before any keyframe" % scalars[0])
+        offset = HEADER.size
+        points = {}
+        for name in KINDS:
+            mode, = struct.unpack_from("<B", message, offset)
+            offset += 1
+            if mode == SAME:
+                points[name] = self.state[1][name]
+                continue
+            count, = struct.unpack_from("<H", message, offset)
+            offset += 2
+            if mode == FULL:
+                values = struct.unpack_from("<%dh" % (2 * count), message, offset)
+                offset += 4 * count
+                points[name] = list(zip(values[::2], values[1::2]))
+            elif mode == SHIFT:
+                dx, dy = struct.unpack_from("<hh", message, offset)
+                offset += 4
+                points[name] = [(x + dx, y + dy) for x, y in self.state[1][name]]
+            else:
+                deltas = struct.unpack_from("<%db" % (2 * count), message, offset)
+                offset += 2 * count
+                points[name] = [(x + dx, y + dy) for (x, y), dx, dy
+                                in zip(self.state[1][name], deltas[::2], deltas[1::2])]
+        self.state = (tuple(scalars), points)
+        return self.state
+
+
+def websocket_frame(payload, opcode=0x2):
+    """Unmasked server-to-client WebSocket frame"""
+    length = len(payload)
+    if length < 126:
+        head = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 1 << 16:
+        head = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        head = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return head + payload
+
+
+async def read_websocket(reader):
+    """One client-to-server WebSocket message (opcode, unmasked payload)"""
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        length, = struct.unpack("!H", await reader.readexactly(2))
+    elif length == 127:
+        length, = struct.unpack("!Q", await reader.readexactly(8))
+    mask = await reader.readexactly(4) if second & 0x80 else b"\0\0\0\0"
+    payload = await reader.readexactly(length)
+    return first & 0x0F, bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+
+
+# Client class
+class Client:
+    """One connected viewer and its traffic counters"""
+    def __init__(self, writer, websocket):
+        self.writer = writer
+        self.websocket = websocket
+        self.address = "%s:%d" % writer.get_extra_info("peername")[:2]
+        self.connected = time.perf_counter()
+        self.stale = True
+        self.frames = self.keyframes = self.dropped = self.bytes = 0
+        # frame number -> send time, until acked
+        self.in_flight = {}
+        self.latencies = []
+
+    def send(self, frame, message):
+        if self.websocket:
+            data = websocket_frame(message)
+        else:
+            data = struct.pack("<I", len(message)) + message
+        self.writer.write(data)
+        self.bytes += len(data)
+        self.frames += 1
+        self.in_flight[frame] = time.perf_counter()
+        if len(self.in_flight) > 1024:
+            self.in_flight.pop(next(iter(self.in_flight)))
+
+    def ack(self, frame):
+        sent = self.in_flight.pop(frame, None)
+        if sent is not None:
+            self.latencies.append(time.perf_counter() - sent)
+            del self.latencies[:-1000]
+
+    def report(self):
+        elapsed = max(time.perf_counter() - self.connected, 1e-9)
+        ordered = sorted(self.latencies)
+        return {
+            "client": self.address,
+            "protocol": "websocket" if self.websocket else "tcp",
+            "frames": self.frames,
+            "keyframes": self.keyframes,
+            "dropped": self.dropped,
+            "bytes": self.bytes,
+            "kbit_s": self.bytes * 8 / 1000 / elapsed,
+            "bytes_per_frame": self.bytes / self.frames if self.frames else 0,
+            "latency_ms": statistics.mean(ordered) * 1000 if ordered else None,
+            "latency_p99_ms": ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))] * 1000 if ordered else None,
+        }
+
+
+# SpectatorServer class
+class SpectatorServer:
+    """
+    Streams frames to every connected client
+    publish() may be called from the game thread; the newest state is
+    handed to the event loop, so frames the loop had no time for are
+    skipped rather than queued
+    """
+    def __init__(self, host="127.0.0.1", port=8765, keyframe_every=60, max_buffer=64 * 1024):
+        """
+        Args:
+            keyframe_every: frames between keyframes sent to every client
+            max_buffer: a client with more unsent bytes than this
+                        misses frames until it catches up
+        """
+        self.host, self.port = host, port
+        self.keyframe_every = keyframe_every
+        self.max_buffer = max_buffer
+        self.clients = []
+        self.departed = []
+        self.loop = None
+        self.server = None
+        self.latest = None
+        self.lock = threading.Lock()
+        self.scheduled = False
+        self.previous = None
+        self.encoded = 0
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        self.server.close()
+        for client in self.clients:
+            client.writer.close()
+        await self.server.wait_closed()
+
+    @classmethod
+    def start_thread(cls, address, **options):
+        """
+        Run a server on its own event loop thread
+        Args:
+            address: "host:port"
+        Returns the server once it is listening
+        """
+        host, _, port = address.rpartition(":")
+        server = cls(host or "127.0.0.1", int(port), **options)
+        ready = threading.Event()
+
+        def run():
+            loop = asyncio.new_event_loop()
+            loop.run_until_complete(server.start())
+            ready.set()
+            loop.run_forever()
+
+        threading.Thread(target=run, name="spectator", daemon=True).start()
+        ready.wait()
+        return server
+
+    def publish(self, game):
+        """Hand the game's current frame to the server (thread-safe, never blocks on clients)"""
+        state = capture(game)
+        with self.lock:
+            self.latest = state
+            if self.scheduled:
+                return
+            self.scheduled = True
+        self.loop.call_soon_threadsafe(self.flush)
+
+    def flush(self):
+        """Send the newest published frame to every client"""
+        with self.lock:
+            state, self.latest, self.scheduled = self.latest, None, False
+        if state is None:
+            return
+        frame = state[0][0]
+        periodic = self.encoded % self.keyframe_every == 0
+        delta = None if periodic or self.previous is None else encode(state, self.previous)
+        keyframe = None
+        self.previous = state
+        self.encoded += 1
+        for client in self.clients:
+            if client.writer.transport.get_write_buffer_size() > self.max_buffer:
+                # Backpressure: skip this client and resync it with a keyframe later
+                client.dropped += 1
+                client.stale = True
+                continue
+            if delta is None or client.stale:
+                if keyframe is None:
+                    keyframe = encode(state)
+                client.send(frame, keyframe)
+                client.keyframes += 1
+                client.stale = False
+            else:
+                client.send(frame, delta)
+
+    async def handle(self, reader, writer):
+        try:
+            start = await reader.readexactly(4)
+            websocket = start == b"GET "
+            if websocket:
+                request = start + await reader.readuntil(b"\r\n\r\n")
+                key = [line.split(b":", 1)[1].strip() for line in request.split(b"\r\n")
+                       if line.lower().startswith(b"sec-websocket-key:")]
+                if not key:
+                    writer.close()
+                    return
+                accept = base64.b64encode(hashlib.sha1(key[0] + WS_GUID).digest())
+                writer.write(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+                             b"Connection: Upgrade\r\nSec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+            elif start != MAGIC:
+                writer.close()
+                return
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            writer.close()
+            return
+
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            # Keep the kernel's share of the backlog small, so a slow
+            # client shows up in the transport buffer within a few frames
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.max_buffer)
+        client = Client(writer, websocket)
+        self.clients.append(client)
+        try:
+            while True:
+                if websocket:
+                    opcode, payload = await read_websocket(reader)
+                    if opcode == 0x8:
+                        break
+                    if opcode != 0x2 or len(payload) != ACK.size:
+                        continue
+                else:
+                    payload = await reader.readexactly(ACK.size)
+                client.ack(ACK.unpack(payload)[0])
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.clients.remove(client)
+            self.departed.append(client)
+            writer.close()
+
+    def report(self):
+        """Per-client bandwidth, drop and latency stats (connected clients first)"""
+        return [client.report() for client in self.clients + self.departed]
+
+    def report_lines(self):
+        lines = ["%-21s %-9s %7s %6s %7s %9s %8s %9s" % (
+            "client", "protocol", "frames", "keys", "dropped", "kbit/s", "B/frame", "ack ms")]
+        for row in self.report():
+            lines.append("%-21s %-9s %7d %6d %7d %9.1f %8.1f %9s" % (
+                row["client"], row["protocol"], row["frames"], row["keyframes"], row["dropped"],
+                row["kbit_s"], row["bytes_per_frame"],
+                "%.2f" % row["latency_ms"] if row["latency_ms"] is not None else "-"))
+        return lines
+
+
+async def serve_bot(address, fps, report_every, arrays, seed):
+    """Play headless autopilot games at fps and stream them"""
+    import game_module
+    from sweep import autopilot
+    ca = game_module.load()
+    host, _, port = address.rpartition(":")
+    server = SpectatorServer(host or "127.0.0.1", int(port))
+    await server.start()
+    print("spectator server on %s:%d" % (server.host, server.port), flush=True)
+    game_cls = ca.ArrayGame if arrays else ca.Game
+    game = game_cls(headless=True, seed=seed)
+    game.start_game()
+    tick = 1 / fps
+    next_tick = next_report = time.perf_counter()
+    while True:
+        if game.game_over:
+            game.start_game()
+        game.move_direction = autopilot(game)
+        game.update()
+        server.publish(game)
+        now = time.perf_counter()
+        if report_every and now >= next_report + report_every:
+            next_report = now
+            print("\n".join(server.report_lines()), flush=True)
+        next_tick += tick
+        await asyncio.sleep(max(0, next_tick - time.perf_counter()))
+
+
+async def watch(address, seconds):
+    """Text viewer: decode the stream, ack every frame, print a line per second"""
+    host, _, port = address.rpartition(":")
+    reader, writer = await asyncio.open_connection(host or "127.0.0.1", int(port))
+    writer.write(MAGIC)
+    decoder = FrameDecoder()
+    start = last = time.perf_counter()
+    received = frames = 0
+    while not seconds or time.perf_counter() - start < seconds:
+        length, = struct.unpack("<I", await reader.readexactly(4))
+        message = await reader.readexactly(length)
+        received += length + 4
+        frames += 1
+        scalars, points = decoder.decode(message)
+        writer.write(ACK.pack(scalars[0]))
+        now = time.perf_counter()
+        if now - last >= 1:
+            frame, score, wave, kills, hearts, boss_health = scalars[:6]
+            print("frame %d  score %d  wave %d  hearts %d  boss %s  enemies %d  bullets %d  "
+                  "%d fps  %.1f kbit/s" % (
+                      frame, score, wave, hearts, boss_health if boss_health >= 0 else "-",
+                      len(points["enemies"]), len(points["bullets"]) + len(points["boss_bullets"]),
+                      frames / (now - last), received * 8 / 1000 / (now - last)))
+            last, received, frames = now, 0, 0
+    writer.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cyber Attack spectator server and viewer")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--serve", metavar="HOST:PORT", help="stream a headless autopilot game (with --bot)")
+    mode.add_argument("--watch", metavar="HOST:PORT", help="connect and print the stream")
+    parser.add_argument("--bot", action="store_true", help="play the autopilot from sweep.py")
+    parser.add_argument("--fps", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--arrays", action="store_true", help="serve an ArrayGame (needs numpy)")
+    parser.add_argument("--report-every", type=float, default=5, help="seconds between client reports (0: never)")
+    parser.add_argument("--seconds", type=float, default=0, help="stop watching after this long")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.watch:
+            asyncio.run(watch(args.watch, args.seconds))
+        elif args.bot:
+            asyncio.run(serve_bot(args.serve, args.fps, args.report_every, args.arrays, args.seed))
+        else:
+            parser.error("--serve needs --bot; to stream the GUI game set CYBER_ATTACK_SPECTATE")
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
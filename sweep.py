@@ -0,0 +1,207 @@
+"""
+Balance sweeps over Difficulty parameters
+
+Plays many headless games with a scripted bot over a grid of Difficulty
+values. The games are spread over a process pool on all cores, whose
+workers fork from a template that has already loaded the game (see
+game_module.pool_context). The results are summarised per grid point:
+survival wave, kills and boss time-to-kill. Each (params, seed) result
+is cached in a JSON-lines file, so growing the grid or the seed count
+only plays the new games.
+
+    python sweep.py --param enemy_speed_growth=1.05,1.1,1.15 \\
+                    --param boss_health_per_wave=2,3,4 --seeds 50
+
+Dict-valued parameters take a dotted name, e.g. boss_health.tank=30.
+"""
+import argparse
+import concurrent.futures
+import hashlib
+import itertools
+import json
+import os
+import statistics
+import sys
+import time
+
+import game_module
+
+ca = game_module.load()
+
+# Bump when autopilot() changes, so cached results are replayed
+BOT_VERSION = 1
+FPS = 60
+
+
+def autopilot(game):
+    """
+    Scripted bot: keep low on the screen, sit under the boss or the
+    lowest enemy, and sidestep boss projectiles that get close
+    """
+    player = game.player.pos
+    target_x = None
+    if game.boss is not None:
+        target_x = game.boss.pos.x
+    else:
+        enemies = [pos for pos, _ in game.enemy_sprites() if pos[1] < player.y - 60]
+        if enemies:
+            target_x = max(enemies, key=lambda pos: pos[1])[0]
+    if game.boss is not None:
+        for x, y in game.boss.bullet_positions():
+            if abs(x - player.x) < 60 and 0 < player.y - y < 160:
+                target_x = player.x + (120 if x <= player.x else -120)
+                break
+    move = {"up": player.y > ca.HEIGHT - 100, "down": player.y < ca.HEIGHT - 110,
+            "left": False, "right": False}
+    if target_x is not None:
+        move["left"] = player.x > target_x + 4
+        move["right"] = player.x < target_x - 4
+    return move
+
+
+def difficulty_for(params):
+    """Difficulty from a flat {name or name.key: value} dict"""
+    overrides = {}
+    for name, value in params.items():
+        if "." in name:
+            name, key = name.split(".", 1)
+            table = overrides.setdefault(name, dict(ca.Difficulty.DEFAULTS[name]))
+            table[key] = value
+        else:
+            overrides[name] = value
+    return ca.Difficulty(**overrides)
+
+
+def play(params, seed, max_frames):
+    """Play one game with the autopilot; returns its summary dict"""
+    game = ca.Game(headless=True, seed=seed, difficulty=difficulty_for(params))
+    game.start_game()
+    boss, boss_since, kill_times = None, 0, []
+    while not game.game_over and game.frames < max_frames:
+        game.move_direction = autopilot(game)
+        game.update()
+        if game.boss is not boss:
+            if boss is not None and game.boss is None and not game.in_boss_fight:
+                kill_times.append(game.frames - boss_since)
+            boss, boss_since = game.boss, game.frames
+    return {"wave": game.wave, "kills": game.kills, "frames": game.frames,
+            "survived": not game.game_over, "boss_kill_frames": kill_times}
+
+
+def game_digest():
+    """Hash of the game source, so rule changes invalidate the cache"""
+    with open(game_module.GAME_PATH, "rb") as source:
+        return hashlib.sha1(source.read()).hexdigest()[:12]
+
+
+def cache_key(params, seed, max_frames, digest):
+    return json.dumps({"params": params, "seed": seed, "frames": max_frames,
+                       "bot": BOT_VERSION, "game": digest}, sort_keys=True)
+
+
+def load_cache(path):
+    cache = {}
+    if os.path.exists(path):
+        with open(path) as source:
+            for line in source:
+                if line.strip():
+                    entry = json.loads(line)
+                    cache[entry["key"]] = entry["result"]
+    return cache
+
+
+def parse_value(text):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def parse_grid(specs):
+    """['name=v1,v2', ...] -> list of {name: value} dicts, one per grid point"""
+    axes = []
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        if name.split(".")[0] not in ca.Difficulty.DEFAULTS or not values:
+            raise SystemExit("bad --param %r (expected NAME=V1,V2,... with NAME a Difficulty parameter)" % spec)
+        axes.append([(name, parse_value(value)) for value in values.split(",")])
+    return [dict(point) for point in itertools.product(*axes)]
+
+
+def summarise(results):
+    """Aggregate one grid point's game results"""
+    waves = [result["wave"] for result in results]
+    kill_times = [t for result in results for t in result["boss_kill_frames"]]
+    return {
+        "games": len(results),
+        "wave_mean": statistics.mean(waves),
+        "wave_p50": statistics.median(waves),
+        "kills_mean": statistics.mean(result["kills"] for result in results),
+        "survived": sum(result["survived"] for result in results) / len(results),
+        "boss_kills": len(kill_times),
+        "boss_ttk_s": statistics.mean(kill_times) / FPS if kill_times else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cyber Attack balance sweep")
+    parser.add_argument("--param", action="append", default=[], metavar="NAME=V1,V2",
+                        help="Difficulty parameter values to sweep (repeatable)")
+    parser.add_argument("--seeds", type=int, default=20, help="games per grid point")
+    parser.add_argument("--first-seed", type=int, default=0)
+    parser.add_argument("--frames", type=int, default=36000, help="frame limit per game (default 10 minutes)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--cache", default="sweep_cache.jsonl", help="JSON-lines result cache")
+    parser.add_argument("--output", help="write the results table as JSON")
+    args = parser.parse_args(argv)
+
+    grid = parse_grid(args.param)
+    seeds = range(args.first_seed, args.first_seed + args.seeds)
+    digest = game_digest()
+    cache = load_cache(args.cache)
+    jobs = [(params, seed) for params in grid for seed in seeds
+            if cache_key(params, seed, args.frames, digest) not in cache]
+    print("%d grid points x %d seeds: %d cached, %d to play on %d workers" % (
+        len(grid), len(seeds), len(grid) * len(seeds) - len(jobs), len(jobs), args.workers))
+
+    start = time.perf_counter()
+    if jobs:
+        with open(args.cache, "a") as out, \
+                concurrent.futures.ProcessPoolExecutor(max_workers=args.workers,
+                                                       mp_context=game_module.pool_context([__name__])) as pool:
+            futures = {pool.submit(play, params, seed, args.frames): (params, seed) for params, seed in jobs}
+            for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+                params, seed = futures[future]
+                key = cache_key(params, seed, args.frames, digest)
+                cache[key] = future.result()
+                # One line per game, so an interrupted sweep keeps its progress
+                out.write(json.dumps({"key": key, "result": cache[key]}) + "\n")
+                out.flush()
+                if done % 100 == 0:
+                    print("  %d/%d games" % (done, len(jobs)), file=sys.stderr)
+        print("played %d games in %.1fs" % (len(jobs), time.perf_counter() - start))
+
+    rows = []
+    for params in grid:
+        results = [cache[cache_key(params, seed, args.frames, digest)] for seed in seeds]
+        rows.append({"params": params, **summarise(results)})
+
+    names = sorted({name for params in grid for name in params})
+    header = "".join("%-24s" % name for name in names)
+    print(header + "%6s %9s %8s %10s %8s %10s %11s" % (
+        "games", "wave avg", "wave p50", "kills avg", "survive", "boss kills", "boss ttk s"))
+    for row in rows:
+        ttk = "%.1f" % row["boss_ttk_s"] if row["boss_ttk_s"] is not None else "-"
+        print("".join("%-24s" % row["params"].get(name, "") for name in names)
+              + "%6d %9.2f %8.1f %10.1f %7.0f%% %10d %11s" % (
+                  row["games"], row["wave_mean"], row["wave_p50"], row["kills_mean"],
+                  row["survived"] * 100, row["boss_kills"], ttk))
+
+    if args.output:
+        with open(args.output, "w") as out:
+            json.dump(rows, out, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
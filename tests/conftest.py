@@ -0,0 +1,40 @@
+import os
+import sys
+
+import pytest
+
+# The tools import the game through game_module, from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import game_module  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def ca():
+    return game_module.load()
+
+
+@pytest.fixture(params=["Game", "ArrayGame"])
+def game_class(request, ca):
+    """Each game implementation; ArrayGame needs numpy"""
+    if request.param == "ArrayGame":
+        pytest.importorskip("numpy")
+    return getattr(ca, request.param)
+
+
+def patrol_inputs(n_frames, hold=64):
+    """
+    Fixed move_direction schedule sweeping the player left and right
+    across the screen, changing every hold frames; it fires into enough
+    enemies to reach boss fights
+    """
+    schedule = []
+    for frame in range(n_frames):
+        phase = frame // hold % 4
+        schedule.append({"up": False, "down": False, "left": phase in (0, 3), "right": phase in (1, 2)})
+    return schedule
+
+
+@pytest.fixture
+def patrol():
+    return patrol_inputs
@@ -0,0 +1,45 @@
+def new_game(ca, game_class, seed):
+    # Short waves and frequent bosses, so a run soon reaches a boss fight
+    game = game_class(headless=True, seed=seed, difficulty=ca.Difficulty(kills_per_wave=2, boss_every=2))
+    game.start_game()
+    game.player.hearts = 10 ** 6
+    return game
+
+
+def test_rollback_resimulates_bit_for_bit(ca, game_class, patrol):
+    game = new_game(ca, game_class, seed=3)
+    game.step(600, patrol(600))
+    saved = game.snapshot()
+    later = patrol(3000)
+    game.step(3000, later)
+    reference = game.snapshot()
+
+    # Roll the same game back, then restore into a fresh one
+    game.restore(saved)
+    game.step(3000, later)
+    assert game.snapshot() == reference
+
+    other = new_game(ca, game_class, seed=99)
+    other.step(40)
+    other.restore(saved)
+    other.step(3000, later)
+    assert other.snapshot() == reference
+
+
+def test_restore_mid_boss_fight(ca, game_class, patrol):
+    game = new_game(ca, game_class, seed=3)
+    for move in patrol(6000):
+        if game.boss is not None and game.boss.entered_screen:
+            break
+        game.step(1, move)
+    assert game.boss is not None
+    game.boss.health -= 1
+    saved = game.snapshot()
+    boss = (game.boss.boss_type, game.boss.health, game.boss.max_health)
+    game.step(1200, patrol(1200))
+    reference = game.snapshot()
+
+    game.restore(saved)
+    assert (game.boss.boss_type, game.boss.health, game.boss.max_health) == boss
+    game.step(1200, patrol(1200))
+    assert game.snapshot() == reference
@@ -0,0 +1,125 @@
+import asyncio
+import socket
+import struct
+
+import spectator
+
+
+def new_game(ca):
+    game = ca.Game(headless=True, seed=7)
+    game.start_game()
+    game.player.hearts = 10 ** 6
+    # Plenty of enemies, so frames are big enough to back a socket up
+    game.enemy_spawn_rate = 3
+    return game
+
+
+async def connect(port, receive_buffer=None):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    if receive_buffer:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer)
+    sock.setblocking(False)
+    await asyncio.get_running_loop().sock_connect(sock, ("127.0.0.1", port))
+    reader, writer = await asyncio.open_connection(sock=sock)
+    writer.write(spectator.MAGIC)
+    return reader, writer
+
+
+async def until(condition):
+    for _ in range(500):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("timed out")
+
+
+async def receive(reader, timeout=None):
+    """One length-prefixed frame message, or None if none arrives within timeout"""
+    try:
+        head = await asyncio.wait_for(reader.readexactly(4), timeout)
+    except asyncio.TimeoutError:
+        return None
+    length, = struct.unpack("<I", head)
+    return await reader.readexactly(length)
+
+
+def test_loopback_client_decodes_captured_frames(ca, patrol):
+    async def run():
+        server = spectator.SpectatorServer("127.0.0.1", 0, keyframe_every=25)
+        await server.start()
+        reader, writer = await connect(server.port)
+        await until(lambda: server.clients)
+
+        game = new_game(ca)
+        decoder = spectator.FrameDecoder()
+        kinds = []
+        for move in patrol(200):
+            game.step(1, move)
+            expected = spectator.capture(game)
+            server.publish(game)
+            message = await receive(reader)
+            kinds.append(message[0])
+            assert decoder.decode(message) == expected
+            writer.write(spectator.ACK.pack(expected[0][0]))
+
+        await until(lambda: server.clients[0].latencies)
+        report, = server.report()
+        assert report["frames"] == 200 and report["dropped"] == 0
+        assert kinds.count(spectator.KEYFRAME) == 8 and kinds[0] == spectator.KEYFRAME
+        writer.close()
+        await server.close()
+
+    asyncio.run(run())
+
+
+def test_stalled_client_drops_frames_and_resyncs(ca, patrol):
+    async def run():
+        server = spectator.SpectatorServer("127.0.0.1", 0, max_buffer=4096)
+        await server.start()
+        stalled_reader, stalled_writer = await connect(server.port, receive_buffer=4096)
+        await until(lambda: len(server.clients) == 1)
+        fast_reader, fast_writer = await connect(server.port)
+        await until(lambda: len(server.clients) == 2)
+        stalled, fast = server.clients
+
+        game = new_game(ca)
+        captured = {}
+        fast_decoder = spectator.FrameDecoder()
+        moves = iter(patrol(20000))
+
+        def publish():
+            game.step(1, next(moves))
+            state = spectator.capture(game)
+            captured[state[0][0]] = state
+            server.publish(game)
+            return state
+
+        # The stalled client reads nothing until frames are being dropped
+        while stalled.dropped < 20:
+            assert game.frames < 20000
+            state = publish()
+            assert fast_decoder.decode(await receive(fast_reader)) == state
+
+        # Once it reads again it is resynced with a keyframe, so every
+        # frame it is sent decodes to the captured state, up to the newest
+        decoder = spectator.FrameDecoder()
+        decoded = None
+        while True:
+            message = await receive(stalled_reader, timeout=0.05)
+            if message is not None:
+                decoded = decoder.decode(message)
+                assert decoded == captured[decoded[0][0]]
+                continue
+            if decoded is not None and decoded == state:
+                break
+            assert game.frames < 20000
+            state = publish()
+            assert fast_decoder.decode(await receive(fast_reader)) == state
+
+        assert stalled.dropped >= 20 and stalled.keyframes >= 2
+        assert fast.dropped == 0 and fast.frames == len(captured)
+        stalled_writer.close()
+        fast_writer.close()
+        await server.close()
+
+    asyncio.run(run())
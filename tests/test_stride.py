@@ -0,0 +1,30 @@
+def new_game(ca, game_class):
+    # Short waves and frequent bosses, so a run soon reaches a boss fight
+    game = game_class(headless=True, seed=3, difficulty=ca.Difficulty(kills_per_wave=2, boss_every=2))
+    game.start_game()
+    game.player.hearts = 10 ** 6
+    return game
+
+
+def test_stride_matches_single_frames(ca, game_class, patrol):
+    # The patrol holds each input for 64 frames, so none of these
+    # strides sees an input change part-way through an update
+    moves = patrol(6400)
+    game = new_game(ca, game_class)
+    reference, fights, boss = {}, 0, None
+    for frame, move in enumerate(moves, 1):
+        game.step(1, move)
+        if game.boss is not None and boss is None:
+            fights += 1
+        boss = game.boss
+        if frame % 64 == 0:
+            reference[frame] = game.snapshot()
+    # Waves went up, and at least one boss fight was fought to the end
+    assert game.wave > 2 and fights and game.boss is None
+
+    for stride in (2, 4, 8, 16, 64):
+        game = new_game(ca, game_class)
+        for frame in range(0, len(moves), stride):
+            game.step(1, moves[frame], stride=stride)
+            if (frame + stride) % 64 == 0:
+                assert game.snapshot() == reference[frame + stride], (stride, frame + stride)
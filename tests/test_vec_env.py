@@ -0,0 +1,85 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import vec_env  # noqa: E402
+
+KEYS = (("up", vec_env.ca.INPUT_UP), ("down", vec_env.ca.INPUT_DOWN),
+        ("left", vec_env.ca.INPUT_LEFT), ("right", vec_env.ca.INPUT_RIGHT))
+
+
+class SeededEnv(vec_env.VecEnv):
+    """VecEnv(1) drawing the same random.Random sequence as Game(seed=seed)"""
+    def __init__(self, seed, difficulty=None):
+        self.draws = random.Random(seed)
+        super().__init__(1, difficulty=difficulty)
+
+    def randint(self, low, high, mask):
+        return np.array([self.draws.randint(low, high) if mask[0] else 0])
+
+
+def wander(n_frames):
+    """Random held keys, changed every 15 frames"""
+    rng = random.Random(0)
+    moves = []
+    for frame in range(n_frames):
+        if frame % 15 == 0:
+            move = {key: rng.random() < 0.3 for key, _ in KEYS}
+        moves.append(move)
+    return moves
+
+
+def state(game):
+    """What both must agree on, read from a Game"""
+    boss = game.boss
+    counts = game.entity_counts()
+    return (game.score, game.kills, game.wave, game.player.hearts, game.player.pos.to_tuple(),
+            (boss.health, float(boss.pos.x), float(boss.pos.y)) if boss is not None else None,
+            counts["bullets"], counts["enemies"], counts["powerups"], counts["boss_bullets"])
+
+
+def env_state(env):
+    """state() of the VecEnv's only game"""
+    return (int(env.score[0]), int(env.kills[0]), int(env.wave[0]), int(env.hearts[0]),
+            (float(env.px[0]), float(env.py[0])),
+            (int(env.boss_health[0]), float(env.boss_x[0]), float(env.boss_y[0])) if env.boss_active[0] else None,
+            int(env.bullets.count()[0]), int(env.enemies.count()[0]),
+            int(env.powerups.count()[0]), int(env.boss_bullets.count()[0]))
+
+
+@pytest.mark.parametrize("seed, hearts, difficulty, moves", [
+    # Default rules until the player dies
+    (12, 3, {}, "wander"),
+    # Short waves and frequent bosses: these seeds beat an evader and a
+    # tank, then a shooter and an evader
+    (3, 10 ** 6, {"kills_per_wave": 3, "boss_every": 2}, "patrol"),
+    (35, 10 ** 6, {"kills_per_wave": 3, "boss_every": 2}, "wander"),
+])
+def test_vec_env_follows_game(ca, patrol, seed, hearts, difficulty, moves):
+    n_frames = 9000
+    moves = patrol(n_frames) if moves == "patrol" else wander(n_frames)
+    game = ca.Game(headless=True, seed=seed, difficulty=ca.Difficulty(**difficulty))
+    game.start_game()
+    game.player.hearts = hearts
+    env = SeededEnv(seed, ca.Difficulty(**difficulty))
+    env.hearts[:] = hearts
+
+    beaten, boss = 0, None
+    for frame, move in enumerate(moves):
+        game.move_direction = dict(move)
+        game.update()
+        _, _, done, info = env.step([sum(bit for key, bit in KEYS if move[key])])
+        if done[0]:
+            # The env restarts a finished game at once; compare its final score
+            assert game.game_over and info["final_score"][0] == game.score, frame
+            break
+        assert not game.game_over, frame
+        assert env_state(env) == state(game), frame
+        beaten += boss is not None and game.boss is None
+        boss = game.boss
+    if difficulty:
+        assert beaten >= 2, game.wave
+    else:
+        assert game.game_over
@@ -0,0 +1,596 @@
+"""
+Batched Cyber Attack environment for training and evaluating bots
+
+VecEnv advances N independent games per call. Every player, bullet,
+enemy, powerup and boss field lives in an (N,) or (N, capacity) numpy
+array, so one step costs a fixed number of array operations whatever N
+is. The rules follow Game.update and Boss.update frame for frame,
+including hit order: collisions are resolved in spawn order, and a game
+that ends mid-frame finishes that frame the way Game does.
+
+    env = VecEnv(1024, seed=0)
+    obs = env.reset()
+    obs, rewards, dones, info = env.step(actions)
+
+Actions are INPUT_UP | INPUT_DOWN | INPUT_LEFT | INPUT_RIGHT bitmasks,
+one per game. The reward is the score gained during the step. A game is
+done when its hearts run out; it is reset automatically and its final
+score and frame count are reported in info.
+"""
+import sys
+import time
+
+import numpy as np
+
+import game_module
+
+ca = game_module.load()
+
+WIDTH, HEIGHT = ca.WIDTH, ca.HEIGHT
+TANK, SHOOTER, EVADER = 0, 1, 2
+BOSS_TYPES = ("tank", "shooter", "evader")
+# Powerup tags index Game.powertype
+SHIELD, RAPID, SLOW = 0, 1, 2
+
+# The tank's and shooter's velocity tables, shared with Boss
+TANK_RING = np.array(ca.PATTERNS["ring"].velocities(), dtype=float)
+SHOOTER_SPREAD = np.array(ca.PATTERNS["spread"].velocities(), dtype=float)
+
+
+def out_of_bounds(x, y, margin):
+    """LifetimeManager's four-edge test"""
+    return (x < -margin) | (x > WIDTH + margin) | (y < -margin) | (y > HEIGHT + margin)
+
+
+def within(x, y, px, py, distance):
+    """check_collision_xy between (N, C) entities and one (N,) point per game"""
+    dist_sq = (x - px[:, None]) ** 2 + (y - py[:, None]) ** 2
+    return (dist_sq < distance * distance) & (np.sqrt(dist_sq) < distance)
+
+
+def passes(ax, ay, dx, dy, bx, by, distance):
+    """Interaction.passes_xy elementwise over arrays that broadcast together"""
+    length_sq = dx * dx + dy * dy
+    with np.errstate(divide="ignore", invalid="ignore"):
+        back = ((ax - bx) * dx + (ay - by) * dy) / length_sq
+    inside = (length_sq > 0) & (back > 0) & (back < 1)
+    back = np.where(inside, back, 0)
+    x, y = ax - dx * back - bx, ay - dy * back - by
+    return inside & (x * x + y * y < distance * distance)
+
+
+# EntityBatch class
+class EntityBatch:
+    """
+    One kind of entity across all games, as (n_envs, capacity) columns
+    Each row keeps its slots in spawn order. Dead slots are dropped by
+    compact() at the end of a frame, so spawn order equals list order
+    in Game and hit resolution can walk the slots left to right. Only
+    the first `width` columns (the fullest row) are ever touched.
+    """
+    def __init__(self, n_envs, capacity=16):
+        self.rows = np.arange(n_envs)[:, None]
+        self.used = np.zeros(n_envs, dtype=np.int64)
+        self.width = 0
+        self.x = np.zeros((n_envs, capacity))
+        self.y = np.zeros((n_envs, capacity))
+        self.vx = np.zeros((n_envs, capacity))
+        self.vy = np.zeros((n_envs, capacity))
+        self.tag = np.zeros((n_envs, capacity), dtype=np.int64)
+        self.alive = np.zeros((n_envs, capacity), dtype=bool)
+
+    COLUMNS = ("x", "y", "vx", "vy", "tag", "alive")
+
+    @property
+    def capacity(self):
+        return self.x.shape[1]
+
+    def _reserve(self, needed):
+        capacity = self.capacity
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in self.COLUMNS:
+            old = getattr(self, name)
+            new = np.zeros((old.shape[0], capacity), dtype=old.dtype)
+            new[:, :old.shape[1]] = old
+            setattr(self, name, new)
+
+    def cols(self, *names):
+        """Views of the named columns, cut to the occupied width"""
+        w = self.width
+        return [getattr(self, name)[:, :w] for name in names]
+
+    def spawn(self, mask, x, y, vx=0.0, vy=0.0, tag=0):
+        """
+        Append one entity to every game in mask
+        Args:
+            mask: (n_envs,) bool, games that spawn
+            x, y, vx, vy, tag: scalars or (n_envs,) arrays
+        """
+        rows = np.flatnonzero(mask)
+        if not len(rows):
+            return
+        self._reserve(int(self.used[rows].max()) + 1)
+        cols = self.used[rows]
+        for name, value in (("x", x), ("y", y), ("vx", vx), ("vy", vy), ("tag", tag)):
+            getattr(self, name)[rows, cols] = value[rows] if np.ndim(value) else value
+        self.alive[rows, cols] = True
+        self.used[rows] += 1
+        self.width = max(self.width, int(cols.max()) + 1)
+
+    def spawn_pattern(self, mask, x, y, velocities):
+        """Append len(velocities) entities at (x, y) to every game in mask"""
+        rows = np.flatnonzero(mask)
+        if not len(rows):
+            return
+        k = len(velocities)
+        self._reserve(int(self.used[rows].max()) + k)
+        cols = self.used[rows, None] + np.arange(k)
+        rows2 = rows[:, None]
+        self.x[rows2, cols] = x[rows, None]
+        self.y[rows2, cols] = y[rows, None]
+        self.vx[rows2, cols] = velocities[:, 0]
+        self.vy[rows2, cols] = velocities[:, 1]
+        self.tag[rows2, cols] = 0
+        self.alive[rows2, cols] = True
+        self.used[rows] += k
+        self.width = max(self.width, int(cols.max()) + 1)
+
+    def clear(self, mask):
+        """Drop every entity of the games in mask"""
+        self.alive[mask] = False
+        self.used[mask] = 0
+
+    def compact(self):
+        """Move live slots to the front of each row, keeping their order"""
+        w = self.width
+        alive = self.alive[:, :w]
+        count = alive.sum(axis=1)
+        if np.array_equal(count, self.used):
+            return
+        order = np.argsort(~alive, axis=1, kind="stable")
+        for name in self.COLUMNS:
+            column = getattr(self, name)
+            column[:, :w] = column[self.rows, order]
+        self.used = count
+        self.width = int(count.max())
+
+    def count(self):
+        return self.alive[:, :self.width].sum(axis=1)
+
+
+# VecEnv class
+class VecEnv:
+    """
+    N Cyber Attack games stepped together with Gym-style reset/step
+    Constants (speeds, rates, power-up duration) are read from a
+    headless Game so the two stay in step if the game is retuned.
+    """
+    def __init__(self, n_envs, seed=None, obs_enemies=8, obs_boss_bullets=8, difficulty=None):
+        """
+        Args:
+            n_envs: number of independent games
+            seed: seed for the shared numpy Generator
+            obs_enemies: nearest enemies included in each observation
+            obs_boss_bullets: nearest boss projectiles included
+            difficulty: Difficulty shared by every game (the game's
+                        defaults when None)
+        """
+        self.n_envs = n = n_envs
+        self.rng = np.random.default_rng(seed)
+        self.obs_enemies, self.obs_boss_bullets = obs_enemies, obs_boss_bullets
+        self.observation_size = 11 + 3 * obs_enemies + 5 * obs_boss_bullets + 6
+
+        rules = ca.Game(headless=True, seed=0, difficulty=difficulty)
+        self.difficulty = difficulty = rules.difficulty
+        self.boss_health_base = np.array([difficulty.boss_health[kind] for kind in BOSS_TYPES])
+        self.boss_speed_base = np.array([difficulty.boss_speed[kind] for kind in BOSS_TYPES])
+        self.boss_delay_base = np.array([difficulty.boss_fire_delay[kind] for kind in BOSS_TYPES])
+        self.player_speed, self.fire_rate = rules.speed, rules.fire_rate
+        self.enemy_spawn_rate, self.powerup_rate = rules.enemy_spawn_rate, rules.powerup_rate
+        self.powertime = rules.powertime
+        self.start_x, self.start_y = rules.player.pos.to_tuple()
+        self.start_hearts = rules.player.hearts
+        self.bullet_offset = rules.player.size.y / 2
+        # Edge culling as in LifetimeManager's default rules (no age limits or caps)
+        self.margin = {kind: rule.margin for kind, rule in rules.lifetimes.rules.items()}
+
+        int_fields = ("frames", "score", "kills", "wave", "hearts", "rapid_timer", "slow_timer",
+                      "shield_timer", "boss_type", "boss_health", "boss_dir", "boss_fire_timer",
+                      "boss_pattern_timer", "boss_fire_delay")
+        float_fields = ("px", "py", "enemy_speed", "boss_x", "boss_y", "boss_speed")
+        bool_fields = ("game_over", "rapid_active", "slow_active", "shield_active",
+                       "boss_active", "boss_entered")
+        for name in int_fields:
+            setattr(self, name, np.zeros(n, dtype=np.int64))
+        for name in float_fields:
+            setattr(self, name, np.zeros(n))
+        for name in bool_fields:
+            setattr(self, name, np.zeros(n, dtype=bool))
+
+        self.bullets = EntityBatch(n, 32)
+        self.enemies = EntityBatch(n, 16)
+        self.boss_bullets = EntityBatch(n, 32)
+        self.powerups = EntityBatch(n, 4)
+        self.reset_games(np.ones(n, dtype=bool))
+
+    def randint(self, low, high, mask):
+        """
+        Uniform ints in [low, high] for the games in mask (like
+        random.randint); the other games' entries are unused
+        """
+        return self.rng.integers(low, high + 1, size=self.n_envs)
+
+    def reset_games(self, mask):
+        """Put the games in mask back at the start of a new game"""
+        self.frames[mask] = self.score[mask] = self.kills[mask] = self.wave[mask] = 0
+        self.hearts[mask] = self.start_hearts
+        self.px[mask], self.py[mask] = self.start_x, self.start_y
+        self.enemy_speed[mask] = self.difficulty.enemy_speed
+        self.game_over[mask] = False
+        for name in ("rapid", "slow", "shield"):
+            getattr(self, name + "_active")[mask] = False
+            getattr(self, name + "_timer")[mask] = 0
+        self.boss_active[mask] = False
+        for batch in (self.bullets, self.enemies, self.boss_bullets, self.powerups):
+            batch.clear(mask)
+
+    def reset(self):
+        """Start every game over; returns the first observations"""
+        self.reset_games(np.ones(self.n_envs, dtype=bool))
+        return self.observe()
+
+    def step(self, actions):
+        """
+        Advance every game by one frame
+        Args:
+            actions: (n_envs,) INPUT_* movement bitmasks
+        Returns:
+            (observations, rewards, dones, info)
+        """
+        actions = np.asarray(actions)
+        score = self.score.copy()
+        self.frame(actions)
+        rewards = self.score - score
+        dones = self.game_over.copy()
+        info = {}
+        if dones.any():
+            info["final_score"] = np.where(dones, self.score, 0)
+            info["final_frames"] = np.where(dones, self.frames, 0)
+            self.reset_games(dones)
+        return self.observe(), rewards, dones, info
+
+    def frame(self, actions):
+        """One Game.update for every game, phase by phase"""
+        self.frames += 1
+        self.update_boss()
+
+        for name in ("rapid", "slow", "shield"):
+            active = getattr(self, name + "_active")
+            timer = getattr(self, name + "_timer")
+            timer -= active
+            active &= timer > 0
+
+        speed = self.player_speed
+        dx = np.where(actions & ca.INPUT_RIGHT, speed, 0) - np.where(actions & ca.INPUT_LEFT, speed, 0)
+        dy = np.where(actions & ca.INPUT_DOWN, speed, 0) - np.where(actions & ca.INPUT_UP, speed, 0)
+        px, py = self.px.copy(), self.py.copy()
+        np.clip(self.px + dx, 0, WIDTH, out=self.px)
+        np.clip(self.py + dy, 0, HEIGHT, out=self.py)
+        # The player's step after clamping, as Player.step
+        dx, dy = self.px - px, self.py - py
+
+        # Boss projectiles the player's step passed clean through
+        x, y, alive = self.boss_bullets.cols("x", "y", "alive")
+        px, py = self.px[:, None], self.py[:, None]
+        hit = (alive & self.boss_active[:, None] & passes(px, py, dx[:, None], dy[:, None], x, y, 30)
+               & ~within(x, y, self.px, self.py, 30))
+        alive &= ~self.damage_player(hit)
+
+        bullets, enemies = self.bullets, self.enemies
+        x, y, alive = bullets.cols("x", "y", "alive")
+        y -= 7
+        alive &= ~out_of_bounds(x, y, self.margin["bullets"])
+        # Player bullets whose climb passed clean through the boss
+        bx, by = self.boss_x[:, None], self.boss_y[:, None]
+        self.hit_boss(alive & self.boss_active[:, None] & passes(x, y, 0, -7, bx, by, 80)
+                      & ~within(x, y, self.boss_x, self.boss_y, 80))
+
+        fall = np.where(self.slow_active, self.enemy_speed * 0.5, self.enemy_speed)
+        x, y, alive = enemies.cols("x", "y", "alive")
+        y += fall[:, None]
+        alive &= ~out_of_bounds(x, y, self.margin["enemies"])
+
+        self.collide_bullets_enemies(fall)
+        x, y, alive = enemies.cols("x", "y", "alive")
+        hit = alive & (within(x, y, self.px, self.py, 50)
+                       | passes(px, py, dx[:, None], (dy - fall)[:, None], x, y, 50))
+        alive &= ~self.damage_player(hit)
+        self.collect_powerups(dx, dy)
+
+        spawn = ~self.boss_active & (self.frames % self.enemy_spawn_rate == 0)
+        if spawn.any():
+            tag = self.randint(0, 3, spawn)
+            enemies.spawn(spawn, self.randint(0, WIDTH, spawn), 0.0, tag=tag)
+        spawn = self.frames % self.powerup_rate == 0
+        if spawn.any():
+            x = self.randint(50, WIDTH - 50, spawn)
+            y = self.randint(50, HEIGHT - 50, spawn)
+            self.powerups.spawn(spawn, x, y, tag=self.randint(0, 2, spawn))
+        shoot = self.frames % np.where(self.rapid_active, 4, self.fire_rate) == 0
+        bullets.spawn(shoot, self.px, self.py - self.bullet_offset)
+
+        for batch in (bullets, enemies, self.boss_bullets, self.powerups):
+            batch.compact()
+
+    def update_boss(self):
+        """Boss.update, then hits in both directions (Game.update_boss)"""
+        fight = self.boss_active
+        if not fight.any():
+            return
+        bullets, shots = self.bullets, self.boss_bullets
+        start_x, start_y = self.boss_x.copy(), self.boss_y.copy()
+        entering = fight & ~self.boss_entered
+        self.boss_y[entering] += self.boss_speed[entering]
+        self.boss_entered |= entering & (self.boss_y >= 150)
+
+        act = fight & ~entering
+        self.boss_x[act] += self.boss_dir[act] * 3
+        self.boss_dir[act & ((self.boss_x < 100) | (self.boss_x > WIDTH - 100))] *= -1
+
+        # The boss's step, as Boss.step; dodges and teleports are jumps and do not count
+        step_x, step_y = self.boss_x - start_x, self.boss_y - start_y
+
+        evader = act & (self.boss_type == EVADER)
+        if evader.any():
+            x, y, alive = bullets.cols("x", "y", "alive")
+            lined_up = (alive & (np.abs(y - self.boss_y[:, None]) < 150)
+                        & (np.abs(x - self.boss_x[:, None]) < 60)).any(axis=1)
+            dodge = evader & lined_up
+            if dodge.any():
+                self.boss_x[dodge] += (self.randint(0, 1, dodge) * 40 - 20)[dodge]
+                step_x[dodge] = step_y[dodge] = 0
+
+        self.boss_fire_timer[act] += 1
+        self.boss_pattern_timer[act] += 1
+        tank = act & (self.boss_type == TANK) & (self.boss_pattern_timer % 180 == 0)
+        shots.spawn_pattern(tank, self.boss_x, self.boss_y, TANK_RING)
+        shooter = act & (self.boss_type == SHOOTER) & (self.boss_fire_timer >= self.boss_fire_delay)
+        self.boss_fire_timer[shooter] = 0
+        shots.spawn_pattern(shooter, self.boss_x, self.boss_y + 50, SHOOTER_SPREAD)
+        teleport = evader & (self.boss_pattern_timer % 240 == 0)
+        if teleport.any():
+            x = self.randint(100, WIDTH - 100, teleport)
+            y = self.randint(-50, 50, teleport)
+            self.boss_x[teleport] = x[teleport]
+            self.boss_y[teleport] = 150 + y[teleport]
+            step_x[teleport] = step_y[teleport] = 0
+
+        x, y, vx, vy, alive = shots.cols("x", "y", "vx", "vy", "alive")
+        moving = act[:, None]
+        x += vx * moving
+        y += vy * moving
+        alive &= ~out_of_bounds(x, y, self.margin["boss_bullets"])
+
+        # Player bullets the boss touched during its step
+        x, y, alive = bullets.cols("x", "y", "alive")
+        bx, by = self.boss_x[:, None], self.boss_y[:, None]
+        self.hit_boss(alive & fight[:, None] & (within(x, y, self.boss_x, self.boss_y, 80)
+                                                | passes(bx, by, step_x[:, None], step_y[:, None], x, y, 80)))
+
+        # Boss projectiles that touched the player during their step
+        x, y, vx, vy, alive = shots.cols("x", "y", "vx", "vy", "alive")
+        hit = alive & self.boss_active[:, None] & (within(x, y, self.px, self.py, 30)
+                                                   | passes(x, y, vx * moving, vy * moving,
+                                                            self.px[:, None], self.py[:, None], 30))
+        alive &= ~self.damage_player(hit)
+
+    def hit_boss(self, hit):
+        """
+        Game.damage_boss: player bullet hits, in firing order, until the
+        boss runs out of health
+        Args:
+            hit: (n_envs, width) bool of player bullets hitting the boss
+        """
+        taken = hit & (np.cumsum(hit, axis=1) <= self.boss_health[:, None])
+        self.bullets.alive[:, :self.bullets.width] &= ~taken
+        self.boss_health -= taken.sum(axis=1)
+        killed = self.boss_active & (self.boss_health <= 0)
+        if killed.any():
+            self.boss_active[killed] = False
+            self.enemy_speed[killed] *= self.difficulty.enemy_speed_growth
+            self.boss_bullets.clear(killed)
+
+    def damage_player(self, hit):
+        """
+        Game.damage_player for each hit, in slot order, stopping at the
+        hit that ends the game
+        Args:
+            hit: (n_envs, width) bool of entities touching the player
+        Returns:
+            the hits that were consumed (and so removed)
+        """
+        # One more hit is taken after the game is already over, as in Game
+        allowed = np.where(self.game_over, 1, np.where(self.shield_active, hit.shape[1], self.hearts))
+        taken = hit & (np.cumsum(hit, axis=1) <= allowed[:, None])
+        self.hearts -= taken.sum(axis=1) * ~self.shield_active
+        self.game_over |= taken.any(axis=1) & (self.hearts <= 0)
+        return taken
+
+    def collide_bullets_enemies(self, fall):
+        """
+        Each enemy, in spawn order, takes the earliest unused bullet that
+        came within 30px over the frame
+        Args:
+            fall: (n_envs,) how far each game's enemies fell
+        """
+        bullets, enemies = self.bullets, self.enemies
+        if not (bullets.width and enemies.width):
+            return
+        hit = self.pair_hits(enemies, bullets, 30, -7 - fall)
+        rows = np.flatnonzero(hit.any(axis=(1, 2)))
+        if not len(rows):
+            return
+        hit = hit[rows]
+        used = np.zeros((len(rows), bullets.width), dtype=bool)
+        killed = np.zeros((len(rows), enemies.width), dtype=bool)
+        for e in np.flatnonzero(hit.any(axis=(0, 2))):
+            free = hit[:, e, :] & ~used
+            has = free.any(axis=1)
+            first = free.argmax(axis=1)
+            sel = np.flatnonzero(has)
+            used[sel, first[sel]] = True
+            killed[sel, e] = True
+        bullets.alive[rows, :bullets.width] &= ~used
+        enemies.alive[rows, :enemies.width] &= ~killed
+        counts = np.zeros(self.n_envs, dtype=np.int64)
+        counts[rows] = killed.sum(axis=1)
+        self.register_kills(counts)
+
+    @staticmethod
+    def pair_hits(a, b, distance, rise):
+        """
+        (n_envs, a.width, b.width) bool of live a-b pairs that came within
+        distance over the frame
+        Args:
+            rise: (n_envs,) b's vertical step relative to a (the only way
+                  either moves)
+        """
+        ax, ay, a_alive = a.cols("x", "y", "alive")
+        bx, by, b_alive = b.cols("x", "y", "alive")
+        ax, ay, bx, by = ax[:, :, None], ay[:, :, None], bx[:, None, :], by[:, None, :]
+        dist_sq = (ax - bx) ** 2 + (ay - by) ** 2
+        return (a_alive[:, :, None] & b_alive[:, None, :]
+                & (((dist_sq < distance * distance) & (np.sqrt(dist_sq) < distance))
+                   | passes(bx, by, 0, rise[:, None, None], ax, ay, distance)))
+
+    def register_kills(self, counts):
+        """Game.register_kill, once per kill, so wave and boss changes land in order"""
+        difficulty = self.difficulty
+        remaining = counts.copy()
+        while remaining.any():
+            kill = remaining > 0
+            remaining -= kill
+            self.score += kill
+            self.kills += kill
+            wave_up = kill & (self.kills % difficulty.kills_per_wave == 0)
+            if not wave_up.any():
+                continue
+            self.wave += wave_up
+            boss = wave_up & (self.wave % difficulty.boss_every == 0)
+            self.enemy_speed[wave_up & ~boss] *= difficulty.enemy_speed_growth
+            if boss.any():
+                self.spawn_boss(boss)
+
+    def spawn_boss(self, mask):
+        """Boss.__init__ for the games in mask, replacing any current boss"""
+        difficulty = self.difficulty
+        kind = self.randint(0, 2, mask)[mask]
+        wave = self.wave[mask]
+        self.boss_type[mask] = kind
+        self.boss_x[mask], self.boss_y[mask] = WIDTH // 2, -100
+        self.boss_health[mask] = self.boss_health_base[kind] + (wave - 1) * difficulty.boss_health_per_wave
+        self.boss_speed[mask] = np.minimum(self.boss_speed_base[kind] + wave * difficulty.boss_speed_per_wave,
+                                           difficulty.boss_speed_cap)
+        self.boss_fire_delay[mask] = np.maximum(self.boss_delay_base[kind] - wave * difficulty.boss_fire_delay_per_wave,
+                                                difficulty.boss_fire_delay_min)
+        self.boss_entered[mask] = False
+        self.boss_dir[mask] = 1
+        self.boss_fire_timer[mask] = self.boss_pattern_timer[mask] = 0
+        self.boss_active[mask] = True
+        self.boss_bullets.clear(mask)
+
+    def collect_powerups(self, dx, dy):
+        """
+        Every powerup the player touched during its step is taken and
+        (re)starts its timer
+        Args:
+            dx, dy: (n_envs,) the player's step
+        """
+        x, y, tags, alive = self.powerups.cols("x", "y", "tag", "alive")
+        hit = alive & (within(x, y, self.px, self.py, 30)
+                       | passes(self.px[:, None], self.py[:, None], dx[:, None], dy[:, None], x, y, 30))
+        if not hit.any():
+            return
+        for tag, name in ((SHIELD, "shield"), (RAPID, "rapid"), (SLOW, "slow")):
+            got = (hit & (tags == tag)).any(axis=1)
+            getattr(self, name + "_active")[got] = True
+            getattr(self, name + "_timer")[got] = self.powertime
+        alive &= ~hit
+
+    def nearest(self, batch, k, fields):
+        """
+        The named columns of the k nearest live entities per game, nearest
+        first, each as an (n_envs, k) array, plus a bool array of which
+        of the k slots hold an entity
+        """
+        x, y, alive = batch.cols("x", "y", "alive")
+        dist_sq = np.where(alive, (x - self.px[:, None]) ** 2 + (y - self.py[:, None]) ** 2, np.inf)
+        rows = batch.rows
+        if batch.width > k:
+            idx = np.argpartition(dist_sq, k - 1, axis=1)[:, :k]
+            dist_sq = dist_sq[rows, idx]
+        else:
+            idx = np.broadcast_to(np.arange(batch.width), dist_sq.shape)
+        order = np.argsort(dist_sq, axis=1)
+        idx = idx[rows, order]
+        present = np.zeros((self.n_envs, k), dtype=bool)
+        present[:, :idx.shape[1]] = np.isfinite(dist_sq[rows, order])
+        columns = []
+        for name in fields:
+            column = np.zeros((self.n_envs, k))
+            column[:, :idx.shape[1]] = getattr(batch, name)[rows, idx]
+            columns.append(column * present)
+        return columns, present
+
+    def observe(self):
+        """
+        (n_envs, observation_size) float32 observations, scaled to about [-1, 1]:
+        player x, y and hearts, the three power-up timers, enemy speed,
+        boss (present, dx, dy, health), the nearest enemies (dx, dy,
+        present), the nearest boss projectiles (dx, dy, vx, vy, present)
+        and the nearest powerup (dx, dy, one-hot type, present)
+        """
+        n = self.n_envs
+        px, py = self.px[:, None], self.py[:, None]
+        boss = self.boss_active[:, None]
+        parts = [px / WIDTH, py / HEIGHT, self.hearts[:, None] / self.start_hearts,
+                 self.rapid_timer[:, None] / self.powertime, self.slow_timer[:, None] / self.powertime,
+                 self.shield_timer[:, None] / self.powertime, self.enemy_speed[:, None] / 10,
+                 boss, (self.boss_x[:, None] - px) / WIDTH * boss,
+                 (self.boss_y[:, None] - py) / HEIGHT * boss, self.boss_health[:, None] / 100 * boss]
+
+        (x, y), present = self.nearest(self.enemies, self.obs_enemies, ("x", "y"))
+        parts.append(np.stack([(x - px * present) / WIDTH, (y - py * present) / HEIGHT, present],
+                              axis=2).reshape(n, -1))
+        (x, y, vx, vy), present = self.nearest(self.boss_bullets, self.obs_boss_bullets, ("x", "y", "vx", "vy"))
+        parts.append(np.stack([(x - px * present) / WIDTH, (y - py * present) / HEIGHT, vx / 5, vy / 5, present],
+                              axis=2).reshape(n, -1))
+        (x, y, tag), present = self.nearest(self.powerups, 1, ("x", "y", "tag"))
+        parts += [(x - px * present) / WIDTH, (y - py * present) / HEIGHT,
+                  present & (tag == SHIELD), present & (tag == RAPID), present & (tag == SLOW), present]
+        return np.concatenate([np.asarray(part, dtype=np.float32) for part in parts], axis=1)
+
+def main(argv=None):
+    """Time random-policy steps: python vec_env.py [n_envs] [steps]"""
+    argv = sys.argv[1:] if argv is None else argv
+    n_envs = int(argv[0]) if argv else 4096
+    steps = int(argv[1]) if len(argv) > 1 else 500
+    env = VecEnv(n_envs, seed=0)
+    env.reset()
+    rng = np.random.default_rng(1)
+    actions = rng.integers(0, 16, size=(steps, n_envs))
+    done = 0
+    start = time.perf_counter()
+    for t in range(steps):
+        _, _, dones, _ = env.step(actions[t])
+        done += int(dones.sum())
+    elapsed = time.perf_counter() - start
+    print("%d envs x %d steps in %.2fs: %.0f env-steps/s, %d games finished" % (
+        n_envs, steps, elapsed, n_envs * steps / elapsed, done))
+
+
+if __name__ == "__main__":
+    main()